@@ -0,0 +1,288 @@
+import argparse
+import codecs
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from ui.highlighter import create_highlighter
+from utils.document import Document
+from utils.file_operations import read_file, write_file
+from utils.search import MatchList, compile_pattern
+
+# Benchmarks for the editor's hot operations over generated files. Every
+# corpus is built from a fixed seed, so two runs on the same machine see
+# the same bytes. Results are written as JSON and can be compared with a
+# saved baseline:
+#
+#   python benchmarks/run.py --output baseline.json
+#   python benchmarks/run.py --baseline baseline.json
+#
+# Nothing here touches the network. The add_tab benchmark needs wxPython
+# and a display and is skipped without them.
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+SHAPES = {
+    # Line length ranges, in characters.
+    'short': (10, 80),
+    'long': (2000, 20000),
+}
+WORDS = ["alpha", "beta", "gamma", "delta", "needle", "café", "naïve", "def", "return",
+         "class", "self", "value", "0x1F", "42", "'text'", "# note", "(", ")", ":", "="]
+BLOCK_SIZE = 1024 * 1024
+
+def parse_size(text):
+    unit = text[-1].upper()
+    if unit in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[unit])
+    return int(text)
+
+def size_label(size):
+    for unit in ('G', 'M', 'K'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+def generate_lines(shape, seed=0):
+    rng = random.Random(seed)
+    low, high = SHAPES[shape]
+    while True:
+        length = rng.randint(low, high)
+        words = []
+        total = 0
+        while total < length:
+            word = rng.choice(WORDS)
+            words.append(word)
+            total += len(word) + 1
+        yield " ".join(words) + "\n"
+
+def generate_corpus(path, size, shape, encoding):
+    # Writes about size bytes of encoded text in blocks, so even a 1 GB
+    # corpus never sits in memory whole.
+    encoder = codecs.getincrementalencoder(encoding)()
+    written = 0
+    lines = generate_lines(shape)
+    with open(path, 'wb') as file:
+        while written < size:
+            block = []
+            block_chars = 0
+            while block_chars < min(BLOCK_SIZE, size - written):
+                line = next(lines)
+                block.append(line)
+                block_chars += len(line)
+            data = encoder.encode("".join(block))
+            file.write(data)
+            written += len(data)
+
+def corpus_path(corpus_dir, size, shape, encoding):
+    path = os.path.join(corpus_dir, f"{shape}-{encoding}-{size_label(size)}.txt")
+    if not os.path.exists(path):
+        generate_corpus(path, size, shape, encoding)
+    return path
+
+def measure(func, repeat):
+    # Median wall time over repeat runs, then one extra traced run for the
+    # peak of Python allocations (tracing slows code down too much to time
+    # it at the same time).
+    times = []
+    for _ in range(repeat):
+        state = func.setup() if hasattr(func, 'setup') else None
+        start = time.perf_counter()
+        func(state)
+        times.append(time.perf_counter() - start)
+    state = func.setup() if hasattr(func, 'setup') else None
+    tracemalloc.start()
+    try:
+        func(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': statistics.median(times), 'runs': times, 'peak_bytes': peak}
+
+def with_setup(setup):
+    def decorate(func):
+        func.setup = setup
+        return func
+    return decorate
+
+def file_benchmarks(path, encoding):
+    def read(_):
+        read_file(path)
+
+    text = read_file(path)
+    target = path + '.out'
+
+    def write(_):
+        write_file(target, text, encoding)
+
+    return {'read_file': read, 'write_file': write}, lambda: os.path.exists(target) and os.unlink(target)
+
+def document_benchmarks(text):
+    pattern = compile_pattern("needle")
+
+    @with_setup(lambda: Document(text))
+    def find_next(document):
+        # The first F3 scans; the rest step through the match list.
+        matches = MatchList(pattern)
+        matches.scan(document.get_bytes())
+        pos = 0
+        for _ in range(1000):
+            index, wrapped = matches.next_from(pos)
+            if index is None:
+                break
+            pos = matches.span(index)[1]
+
+    @with_setup(lambda: Document(text))
+    def replace_all(document):
+        document.replace_all("needle", "pin")
+
+    @with_setup(lambda: Document(text))
+    def undo_burst(document):
+        # 2000 keystrokes in the middle of the document, then undo and
+        # redo all of them.
+        pos = len(document) // 2
+        for i in range(2000):
+            document.insert(pos + i, "x")
+        while document.history.can_undo():
+            document.undo()
+        while document.history.can_redo():
+            document.redo()
+
+    return {'find_next': find_next, 'replace_all': replace_all, 'undo_burst': undo_burst}
+
+def highlight_benchmark(text):
+    @with_setup(lambda: create_highlighter("corpus.py"))
+    def highlight(highlighter):
+        highlighter._lex_lines(text, 0, text.count('\n') + 1, ('root',), text.isascii())
+
+    return highlight
+
+def add_tab_benchmark(path):
+    if not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+        return None
+    try:
+        import wx
+        from editor import Editor
+    except ImportError:
+        return None
+    editor = Editor()
+
+    def add_tab(_):
+        # Open, stream the file in and paint the first screen.
+        text_ctrl = editor.ui.add_tab(path)
+        while getattr(text_ctrl, 'loader', None):
+            wx.SafeYield()
+        text_ctrl.Update()
+        editor.ui.notebook.DeletePage(editor.ui.notebook.FindPage(text_ctrl))
+
+    return add_tab
+
+def run(args):
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix='matx-bench-')
+    os.makedirs(corpus_dir, exist_ok=True)
+    try:
+        results = run_all(args, corpus_dir)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        'results': results,
+    }
+
+def run_all(args, corpus_dir):
+    results = {}
+
+    def record(name, func):
+        if args.filter and args.filter not in name:
+            return
+        result = measure(func, args.repeat)
+        results[name] = result
+        print(f"{name:<48}{result['seconds'] * 1e3:>12.2f} ms{result['peak_bytes'] / 1024 ** 2:>10.1f} MB",
+              flush=True)
+
+    for size in map(parse_size, args.sizes.split(',')):
+        for shape in args.shapes.split(','):
+            for encoding in args.encodings.split(','):
+                path = corpus_path(corpus_dir, size, shape, encoding)
+                corpus = os.path.basename(path)[:-4]
+                benchmarks, cleanup = file_benchmarks(path, encoding)
+                for name, func in benchmarks.items():
+                    record(f"{name}/{corpus}", func)
+                cleanup()
+
+                if encoding != 'utf-8' or size > parse_size(args.max_document_size):
+                    continue
+                text = read_file(path)
+                for name, func in document_benchmarks(text).items():
+                    record(f"{name}/{corpus}", func)
+                record(f"highlight/{corpus}", highlight_benchmark(text))
+                add_tab = add_tab_benchmark(path) if args.ui else None
+                if add_tab is not None:
+                    record(f"add_tab/{corpus}", add_tab)
+    return results
+
+def compare(current, baseline, tolerance, min_delta=0.001):
+    # Returns [(name, baseline seconds, current seconds, ratio, regressed)]
+    # for every benchmark present in both. A slowdown smaller than
+    # min_delta seconds is timer noise and never counts.
+    rows = []
+    for name, result in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        regressed = ratio > 1 + tolerance and result['seconds'] - before['seconds'] > min_delta
+        rows.append((name, before['seconds'], result['seconds'], ratio, regressed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MATX editor operations.")
+    parser.add_argument('--sizes', default='1K,1M,16M', help="corpus sizes, e.g. 1K,1M,1G")
+    parser.add_argument('--shapes', default='short,long', help="line shapes: short,long")
+    parser.add_argument('--encodings', default='utf-8,utf-16,cp1252')
+    parser.add_argument('--max-document-size', default='64M',
+                        help="largest corpus for the in-memory document benchmarks")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('--corpus-dir', help="where to keep generated corpora between runs")
+    parser.add_argument('--ui', action='store_true', help="also time add_tab (needs a display)")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown allowed before a benchmark counts as regressed")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(current, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        rows = compare(current, baseline, args.tolerance)
+        for name, before, after, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{name:<48}{before * 1e3:>10.2f} ->{after * 1e3:>10.2f} ms{ratio:>8.2f}x{flag}")
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,116 @@
 import wx
-from utils.file_operations import get_file_path, read_file, write_file
+from utils.file_operations import get_file_path
+import functools
+import logging
+import os
 from ui.wx_ui import WXUI
+from utils.instrumentation import startup
+from utils.single_instance import InstanceServer
+
+logger = logging.getLogger(__name__)
 
 class Editor:
     def __init__(self):
-        print("Initializing wx.App")
         self.app = wx.App()
+        self.instance_server = None
+        startup.mark("wx.App")
         self.ui = WXUI(self)
         self.app.SetTopWindow(self.ui)
-        print("wx.App initialized")
+        startup.mark("main window")
 
         # Add menu items for find and replace
         edit_menu = wx.Menu()
         edit_menu.Append(wx.ID_FIND, "&Find\tCtrl+F")
         edit_menu.Append(wx.ID_REPLACE, "&Replace\tCtrl+H")
+        edit_menu.Append(self.ui.find_next_id, "Find &Next\tF3")
+        edit_menu.Append(self.ui.find_previous_id, "Find &Previous\tShift+F3")
+        edit_menu.AppendCheckItem(self.ui.regex_search_id, "Regular E&xpressions")
+        edit_menu.Append(self.ui.find_in_files_id, "Find in F&iles...\tCtrl+Shift+F")
+        edit_menu.Append(self.ui.goto_line_id, "&Go to Line...\tCtrl+G")
+        edit_menu.Append(self.ui.goto_symbol_id, "Go to &Symbol...\tCtrl+Shift+O")
+        edit_menu.Append(self.ui.goto_definition_id, "Go to &Definition\tF12")
         
+        tools_menu = wx.Menu()
+        tools_menu.Append(self.ui.outline_id, "&Outline\tCtrl+Shift+L")
+        tools_menu.AppendCheckItem(self.ui.record_timings_id, "Record &Timings")
+        tools_menu.Append(self.ui.timing_report_id, "Timing &Report...")
+        tools_menu.Check(self.ui.record_timings_id, self.ui.timings_enabled())
+
         menu_bar = wx.MenuBar()
         menu_bar.Append(edit_menu, "&Edit")
+        menu_bar.Append(tools_menu, "&Tools")
         self.ui.SetMenuBar(menu_bar)
+        startup.mark("menus")
 
     def new_file(self):
-        print("Creating new file")
         wx.CallAfter(self.ui.add_tab, "Untitled", "")
 
     def open_file(self):
-        print("Opening file")
-        file_path = get_file_path('open')
-        if file_path:
-            content = read_file(file_path)
-            self.ui.add_tab(file_path, content)
+        self.ui.open_files(get_file_path('open', multiple=True))
+
+    def open_paths(self, paths):
+        # Files named on the command line, here or by a later launch that
+        # handed them over. An empty list only brings the window forward.
+        self.ui.open_files(paths)
+        if self.ui.IsIconized():
+            self.ui.Iconize(False)
+        self.ui.Raise()
+
+    def listen_for_instances(self):
+        # Later launches forward their files here instead of starting a
+        # second editor.
+        try:
+            self.instance_server = InstanceServer(functools.partial(wx.CallAfter, self.open_paths))
+        except OSError as e:
+            logger.warning("Not accepting files from other launches: %s", e)
+            return
+        self.instance_server.start()
 
     def save_file(self):
-        print("Saving file")
-        file_path = get_file_path('save')
+        if self.ui.is_current_read_only():
+            wx.MessageBox("This tab is read-only", "Save File", wx.OK | wx.ICON_INFORMATION)
+            return
+        text_ctrl = self.ui.current_text_ctrl()
+        file_path = text_ctrl.file_path
+        if not os.path.isfile(file_path):
+            file_path = get_file_path('save')
         if file_path:
-            content = self.ui.get_current_content()
-            write_file(file_path, content)
-            wx.CallAfter(self.ui.update_current_tab_name, file_path)
+            return self.ui.save_tab(text_ctrl, file_path)
 
     def undo(self):
-        print("Undoing last action")
         self.ui.on_undo(None)
 
     def redo(self):
-        print("Redoing last undone action")
         self.ui.on_redo(None)
 
+    def goto_line(self):
+        self.ui.on_goto_line(None)
+
     def find(self):
-        print("Finding text")
         self.ui.on_find(None)
 
     def replace(self):
-        print("Replacing text")
         self.ui.on_replace(None)
 
-    def run(self):
-        print("Running editor")
+    def run(self, on_started=None, paths=()):
+        # on_started(editor) is called once the window is up and the event
+        # loop has gone idle for the first time. The last session and then
+        # paths are opened after the window is shown.
         self.ui.Show()
-        self.app.MainLoop()
+        startup.mark("show")
+        wx.CallAfter(self.ui.restore_session)
+        wx.CallAfter(self.ui.offer_recovery)
+        if paths:
+            wx.CallAfter(self.open_paths, paths)
+        if on_started is not None:
+            def on_idle(event):
+                event.Skip()
+                self.ui.Unbind(wx.EVT_IDLE, handler=on_idle)
+                startup.mark("first idle")
+                on_started(self)
+            self.ui.Bind(wx.EVT_IDLE, on_idle)
+        try:
+            self.app.MainLoop()
+        finally:
+            if self.instance_server is not None:
+                self.instance_server.close()
@@ -1,5 +1,62 @@
-from editor import Editor
-
 if __name__ == "__main__":
+    import time
+    started = time.perf_counter()
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="MATX text editor")
+    parser.add_argument('files', nargs='*', help="files to open, or with --find, files or globs to search")
+    parser.add_argument('--new-instance', action='store_true',
+                        help="start a new editor even if one is already running")
+    batch = parser.add_argument_group("batch mode", "find or replace across files without opening the editor")
+    batch.add_argument('--find', metavar='QUERY', help="print every match of QUERY in the files")
+    batch.add_argument('--replace', metavar='TEXT', help="with --find, replace every match with TEXT")
+    batch.add_argument('--match-case', action='store_true')
+    batch.add_argument('--whole-word', action='store_true')
+    batch.add_argument('--regex', action='store_true', help="QUERY is a regular expression")
+    batch.add_argument('--dry-run', action='store_true',
+                       help="with --replace, print a diff of the changes instead of saving them")
+    batch.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long each startup phase took, then exit")
+    parser.add_argument('--startup-budget', type=float, metavar='MS',
+                        help="with --profile-startup, exit with status 1 if startup took longer")
+    args = parser.parse_args()
+
+    if args.find is not None:
+        # Headless: nothing from here on imports wx.
+        from utils.batch import run_cli
+        sys.exit(run_cli(args))
+    if args.replace is not None:
+        parser.error("--replace needs --find")
+
+    # Hand the files to an editor that's already running, if there is one,
+    # before paying for importing wx.
+    from utils import single_instance
+    single = single_instance.is_supported() and not (args.new_instance or args.profile_startup)
+    if single and single_instance.forward_paths(args.files):
+        sys.exit(0)
+
+    from utils.instrumentation import configure_from_environment, startup
+    startup.start = started
+    configure_from_environment()
+    # Imported under the guard: worker processes started with 'spawn'
+    # re-import this module and should not pull in wx.
+    from editor import Editor
+    startup.mark("imports")
     editor = Editor()
-    editor.run()
+    if single:
+        editor.listen_for_instances()
+
+    def report_and_close(editor):
+        print(startup.report(), file=sys.stderr)
+        editor.ui.Close()
+
+    editor.run(report_and_close if args.profile_startup else None, args.files)
+
+    if args.profile_startup and args.startup_budget is not None:
+        total_ms = startup.total() * 1e3
+        if total_ms > args.startup_budget:
+            print(f"Startup took {total_ms:.0f} ms, over the {args.startup_budget:.0f} ms budget",
+                  file=sys.stderr)
+            sys.exit(1)
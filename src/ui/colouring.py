@@ -0,0 +1,49 @@
+import time
+import wx
+from utils.instrumentation import metrics
+
+class ColouringScheduler:
+    # Finishes syntax colouring in the background. EVT_STC_STYLENEEDED
+    # styles only what's on screen; documents with text left unstyled
+    # after it are queued here and styled a slice at a time from EVT_IDLE,
+    # the current tab first. What's unstyled is tracked by the control
+    # itself: everything from GetEndStyled() on, which edits move back.
+    SLICE_LINES = 500
+    SLICE_SECONDS = 0.02
+
+    def __init__(self, window, current_page):
+        self.current_page = current_page
+        self.pending = []
+        window.Bind(wx.EVT_IDLE, self.on_idle)
+
+    def schedule(self, text_ctrl):
+        highlighter = getattr(text_ctrl, 'highlighter', None)
+        if highlighter is None:
+            return
+        if text_ctrl not in self.pending and not highlighter.is_styled(text_ctrl):
+            self.pending.append(text_ctrl)
+
+    @metrics.timed('colouring.idle')
+    def on_idle(self, event):
+        event.Skip()
+        self.pending = [text_ctrl for text_ctrl in self.pending if text_ctrl]
+        if not self.pending:
+            return
+        current = self.current_page()
+        text_ctrl = current if current in self.pending else self.pending[0]
+        if getattr(text_ctrl, 'loader', None):
+            # Still streaming in; on_load_done schedules it again.
+            self.pending.remove(text_ctrl)
+            return
+
+        highlighter = text_ctrl.highlighter
+        deadline = time.perf_counter() + self.SLICE_SECONDS
+        while not highlighter.is_styled(text_ctrl):
+            if time.perf_counter() >= deadline:
+                event.RequestMore()
+                return
+            line = text_ctrl.LineFromPosition(text_ctrl.GetEndStyled())
+            highlighter.style_lines(text_ctrl, line + self.SLICE_LINES)
+        self.pending.remove(text_ctrl)
+        if self.pending:
+            event.RequestMore()
@@ -0,0 +1,44 @@
+from utils.document import newline_offsets
+
+class ControlText:
+    # Stands in for a tab document's piece table, reading the text straight
+    # from the StyledTextCtrl that shows it, so the tab holds one copy of
+    # its text rather than two. Edits are never applied here: the control
+    # gets every one through the document's listener, after this has been
+    # asked for the text being removed. Positions and lines are the
+    # control's own.
+    def __init__(self, text_ctrl):
+        self.text_ctrl = text_ctrl
+
+    def __len__(self):
+        return self.text_ctrl.GetLength()
+
+    def get_bytes(self, start=0, end=None):
+        end = len(self) if end is None else min(end, len(self))
+        if start >= end:
+            return b''
+        return bytes(self.text_ctrl.GetRangePointer(start, end - start))
+
+    def insert(self, pos, data):
+        pass
+
+    def delete(self, pos, length):
+        return self.get_bytes(pos, pos + length)
+
+    def original_newlines(self):
+        # Worked out when asked rather than kept; whether the text is still
+        # what was loaded is for the caller to know.
+        return newline_offsets(self.get_bytes())
+
+    def line_count(self):
+        return self.text_ctrl.GetLineCount()
+
+    def line_from_offset(self, pos):
+        return self.text_ctrl.LineFromPosition(pos)
+
+    def line_start(self, line):
+        if line <= 0:
+            return 0
+        if line >= self.line_count():
+            raise IndexError(line)
+        return self.text_ctrl.PositionFromLine(line)
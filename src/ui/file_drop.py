@@ -0,0 +1,12 @@
+import wx
+
+class FileDropTarget(wx.FileDropTarget):
+    # Hands files dropped on a window to on_drop(paths).
+    def __init__(self, on_drop):
+        super().__init__()
+        self.on_drop = on_drop
+
+    def OnDropFiles(self, x, y, filenames):
+        # Opened once the drag is over, so the source isn't left waiting.
+        wx.CallAfter(self.on_drop, list(filenames))
+        return True
@@ -0,0 +1,146 @@
+import threading
+import wx
+from utils.file_operations import encode_chunks, read_file_chunks, sniff_file, write_file_atomic
+from utils.file_watcher import line_hunks
+from utils.instrumentation import metrics
+from utils.session import file_stat
+from utils.symbols import SymbolIndex
+from utils.word_index import count_words
+
+class FileLoader(threading.Thread):
+    # Decoded chunks allowed to sit in the GUI event queue at once. Keeping
+    # this small stops a fast disk from queueing the whole file as strings
+    # while the GUI thread is still busy appending earlier chunks.
+    MAX_PENDING_CHUNKS = 2
+
+    def __init__(self, file_path, on_chunk, on_done, file_format=None):
+        # file_format, if known from an earlier open of the unchanged file,
+        # saves sniffing it again.
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.file_format = file_format
+        self.stat = file_stat(file_path)
+        self.total = self.stat[1]
+        self.loaded = 0
+        self.cancelled = threading.Event()
+        self._pending = threading.Semaphore(self.MAX_PENDING_CHUNKS)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @metrics.timed('file.load')
+    def run(self):
+        error = None
+        try:
+            # Sniff once up front so the file is decoded a single time with
+            # the right codec instead of being retried on failure.
+            if self.file_format is None:
+                self.file_format = sniff_file(self.file_path)
+            for size, text in read_file_chunks(self.file_path, self.file_format.encoding,
+                                               bom=self.file_format.bom):
+                if not self._wait_for_slot():
+                    break
+                self.loaded += size
+                metrics.count('file.load.bytes', size)
+                wx.CallAfter(self._deliver, text, self.loaded)
+        except (OSError, LookupError) as e:
+            error = e
+        wx.CallAfter(self.on_done, self, error)
+
+    def _wait_for_slot(self):
+        while not self._pending.acquire(timeout=0.1):
+            if self.cancelled.is_set():
+                return False
+        return not self.cancelled.is_set()
+
+    def _deliver(self, text, loaded):
+        try:
+            if not self.cancelled.is_set():
+                self.on_chunk(self, text, loaded)
+        finally:
+            self._pending.release()
+
+class FileSaver(threading.Thread):
+    # Not a daemon thread: the interpreter waits for a save in progress to
+    # finish instead of killing it halfway through on exit.
+    def __init__(self, file_path, data, on_done, encoding='utf-8', bom=False):
+        super().__init__()
+        self.file_path = file_path
+        self.data = data
+        self.on_done = on_done
+        self.encoding = encoding
+        self.bom = bom
+
+    @metrics.timed('file.save')
+    def run(self):
+        error = None
+        metrics.count('file.save.bytes', len(self.data))
+        try:
+            write_file_atomic(self.file_path, encode_chunks(self.data, self.encoding, bom=self.bom))
+        except (OSError, UnicodeError, LookupError) as e:
+            error = e
+        finally:
+            self.data = None
+        wx.CallAfter(self.on_done, self, error)
+
+class FileReloader(threading.Thread):
+    # Rereads a file that changed on disk and works out which lines differ
+    # from the tab's text, given as UTF-8, so only those are replaced.
+    def __init__(self, file_path, text, on_done):
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        self.text = text
+        self.on_done = on_done
+        self.stat = None
+        self.file_format = None
+        self.hunks = None
+
+    @metrics.timed('file.reload')
+    def run(self):
+        error = None
+        try:
+            self.stat = file_stat(self.file_path)
+            self.file_format = sniff_file(self.file_path)
+            new_text = "".join(text for _, text in read_file_chunks(
+                self.file_path, self.file_format.encoding, bom=self.file_format.bom))
+            self.hunks = line_hunks(self.text, new_text.encode('utf-8'))
+        except (OSError, LookupError) as e:
+            error = e
+        finally:
+            self.text = None
+        wx.CallAfter(self.on_done, self, error)
+
+class SymbolIndexer(threading.Thread):
+    # Builds a tab's SymbolIndex from its text, given as UTF-8. Edits made
+    # meanwhile aren't seen; the tab checks whether it has changed since.
+    def __init__(self, text, language, on_done):
+        super().__init__(daemon=True)
+        self.text = text
+        self.index = SymbolIndex(language)
+        self.on_done = on_done
+
+    @metrics.timed('symbols.build')
+    def run(self):
+        try:
+            self.index.build(self.text.decode('utf-8', errors='replace').split('\n'))
+        finally:
+            self.text = None
+        wx.CallAfter(self.on_done, self)
+
+class WordCounter(threading.Thread):
+    # Counts the words in a tab's text, given as UTF-8, for the word index.
+    def __init__(self, text, on_done):
+        super().__init__(daemon=True)
+        self.text = text
+        self.on_done = on_done
+        self.counts = None
+
+    @metrics.timed('words.count')
+    def run(self):
+        try:
+            self.counts = count_words(self.text.decode('utf-8', errors='replace'))
+        finally:
+            self.text = None
+        wx.CallAfter(self.on_done, self)
@@ -0,0 +1,133 @@
+import os
+import wx
+
+class FindInFilesDialog(wx.Dialog):
+    def __init__(self, parent, initial_dir):
+        super().__init__(parent, title="Find in Files")
+        sizer = wx.BoxSizer(wx.VERTICAL)
+
+        sizer.Add(wx.StaticText(self, label="Find what:"), 0, wx.LEFT | wx.RIGHT | wx.TOP, 10)
+        self.query = wx.TextCtrl(self, size=(400, -1))
+        sizer.Add(self.query, 0, wx.EXPAND | wx.ALL, 10)
+
+        sizer.Add(wx.StaticText(self, label="In folder:"), 0, wx.LEFT | wx.RIGHT, 10)
+        self.folder = wx.DirPickerCtrl(self, path=initial_dir)
+        sizer.Add(self.folder, 0, wx.EXPAND | wx.ALL, 10)
+
+        self.match_case = wx.CheckBox(self, label="Match case")
+        self.whole_word = wx.CheckBox(self, label="Whole word")
+        self.regex = wx.CheckBox(self, label="Regular expression")
+        for check_box in (self.match_case, self.whole_word, self.regex):
+            sizer.Add(check_box, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        sizer.Add(self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL), 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizerAndFit(sizer)
+        self.query.SetFocus()
+
+class ResultsList(wx.ListCtrl):
+    # Virtual list: rows are only formatted when they're drawn, so a search
+    # with hundreds of thousands of hits doesn't build that many widgets.
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        self.InsertColumn(0, "File", width=250)
+        self.InsertColumn(1, "Line", width=60)
+        self.InsertColumn(2, "Text", width=600)
+        self.root = ""
+        self.items = []
+
+    def clear(self, root):
+        self.root = root
+        self.items = []
+        self.SetItemCount(0)
+
+    def add(self, file_path, results):
+        for line_number, column, text in results:
+            self.items.append((file_path, line_number, column, text))
+
+    def sync(self):
+        if self.GetItemCount() != len(self.items):
+            self.SetItemCount(len(self.items))
+
+    def OnGetItemText(self, item, column):
+        file_path, line_number, _, text = self.items[item]
+        if column == 0:
+            return os.path.relpath(file_path, self.root)
+        if column == 1:
+            return str(line_number)
+        return text.strip()
+
+class FindInFilesPanel(wx.Panel):
+    def __init__(self, parent, ui):
+        super().__init__(parent, size=(-1, 200))
+        self.ui = ui
+        self.search = None
+        self.searching = False
+
+        self.status = wx.StaticText(self, label="")
+        self.stop_button = wx.Button(self, label="Stop")
+        close_button = wx.Button(self, label="Close")
+        self.results = ResultsList(self)
+
+        header = wx.BoxSizer(wx.HORIZONTAL)
+        header.Add(self.status, 1, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 5)
+        header.Add(self.stop_button, 0, wx.ALL, 2)
+        header.Add(close_button, 0, wx.ALL, 2)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(header, 0, wx.EXPAND)
+        sizer.Add(self.results, 1, wx.EXPAND)
+        self.SetSizer(sizer)
+
+        self.stop_button.Bind(wx.EVT_BUTTON, self.on_stop)
+        close_button.Bind(wx.EVT_BUTTON, self.on_close)
+        self.results.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_item_activated)
+
+    def start(self, search):
+        self.stop()
+        self.search = search
+        self.results.clear(search.root)
+        self.searching = True
+        self.status.SetLabel(f"Searching {search.root} for \"{search.query}\"...")
+        self.stop_button.Enable()
+        search.start()
+
+    def stop(self):
+        if self.search is not None:
+            self.search.cancel()
+
+    def add_results(self, search, file_path, results):
+        # Results can arrive for many files per frame; the list and label
+        # are brought up to date once per frame rather than per file.
+        if search is self.search and self:
+            self.results.add(file_path, results)
+            self.ui.ui_updates.request(self, self.refresh)
+
+    def refresh(self):
+        if self and self.searching:
+            self.results.sync()
+            self.status.SetLabel(
+                f"Searching... {self.search.matches} matches in {self.search.files_searched} files")
+
+    def search_done(self, search, error):
+        if search is not self.search or not self:
+            return
+        self.searching = False
+        self.results.sync()
+        self.stop_button.Disable()
+        if error is not None:
+            self.status.SetLabel(f"Search failed: {error}")
+        elif search.cancelled.is_set():
+            self.status.SetLabel(f"Stopped: {search.matches} matches")
+        else:
+            self.status.SetLabel(f"{search.matches} matches in {search.files_searched} files")
+
+    def on_stop(self, event):
+        self.stop()
+
+    def on_close(self, event):
+        self.stop()
+        self.ui.show_find_in_files_panel(False)
+
+    def on_item_activated(self, event):
+        file_path, line_number, column, _ = self.results.items[event.GetIndex()]
+        self.ui.open_at(file_path, line_number)
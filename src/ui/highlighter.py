@@ -0,0 +1,280 @@
+import bisect
+import collections
+from pygments.lexer import RegexLexer
+from pygments.lexers import get_lexer_for_filename
+from pygments.lexers.special import TextLexer
+from pygments.token import Comment, Error, Generic, Keyword, Name, Number, Operator, String, _TokenType
+from pygments.util import ClassNotFound
+
+STYLE_DEFAULT = 0
+STYLE_ERROR = 14
+
+# (Pygments token type, Scintilla style number, foreground colour). A token
+# uses the entry of its closest listed ancestor, so order doesn't matter.
+TOKEN_STYLES = [
+    (Comment, 1, "#6A9955"),
+    (Number, 2, "#B5CEA8"),
+    (String, 3, "#CE9178"),
+    (Keyword, 4, "#569CD6"),
+    (Name.Class, 5, "#4EC9B0"),
+    (Name.Function, 6, "#DCDCAA"),
+    (Operator, 7, "#D4D4D4"),
+    (Name.Tag, 8, "#569CD6"),
+    (Name.Attribute, 9, "#9CDCFE"),
+    (Name.Builtin, 10, "#4EC9B0"),
+    (Name.Decorator, 11, "#DCDCAA"),
+    (Name.Variable, 12, "#9CDCFE"),
+    (Generic.Heading, 13, "#569CD6"),
+    (Generic.Subheading, 13, "#569CD6"),
+    (Error, STYLE_ERROR, "#F44747"),
+]
+
+_styles = {token: style for token, style, _ in TOKEN_STYLES}
+
+def style_for(token):
+    style = _styles.get(token)
+    if style is None:
+        parent = token
+        while parent is not None and parent not in _styles:
+            parent = parent.parent
+        style = _styles[token] = _styles[parent] if parent is not None else STYLE_DEFAULT
+    return style
+
+def create_highlighter(file_path):
+    try:
+        lexer = get_lexer_for_filename(file_path, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+    if isinstance(lexer, TextLexer):
+        return None
+    return PygmentsHighlighter(lexer)
+
+class PygmentsHighlighter:
+    # Styles a StyledTextCtrl set to STC_LEX_CONTAINER from
+    # EVT_STC_STYLENEEDED, lexing only from the last styled line to the
+    # visible end plus a margin.
+    #
+    # For plain RegexLexers the lexer's state stack is saved at line starts
+    # as a checkpoint, so lexing resumes from the nearest checkpoint rather
+    # than the top of the file. An edit only drops the checkpoints after
+    # its line. Style runs are cached per line keyed by the line text and
+    # the state the line starts in, so an unchanged line is not lexed
+    # again. Other lexers can't be resumed part way, so they restart in
+    # the root state CONTEXT_LINES above the first unstyled line: a
+    # construct opened further up than that may be coloured wrongly until
+    # it's edited, but each call costs the same wherever it is.
+    MARGIN_LINES = 100
+    CONTEXT_LINES = 50
+    CACHE_SIZE = 20000
+    # Lines between the checkpoints kept for the next session.
+    SAVED_CHECKPOINT_SPACING = 200
+
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.name = lexer.name
+        self.incremental = (isinstance(lexer, RegexLexer) and
+                            type(lexer).get_tokens_unprocessed is RegexLexer.get_tokens_unprocessed)
+        self.lines = [0]
+        self.stacks = [('root',)]
+        # Checkpoints from an earlier session, for the same unchanged file.
+        self.restored_lines = []
+        self.restored_stacks = []
+        self._interned = {}
+        self.cache = collections.OrderedDict()
+
+    def invalidate(self, line):
+        index = max(1, bisect.bisect_right(self.lines, line))
+        del self.lines[index:]
+        del self.stacks[index:]
+        index = bisect.bisect_right(self.restored_lines, line)
+        del self.restored_lines[index:]
+        del self.restored_stacks[index:]
+
+    def saved_checkpoints(self):
+        # A thinned-out list of (line, stack) checkpoints, to be restored
+        # when the same file is next opened unchanged.
+        checkpoints = list(zip(self.lines, self.stacks))
+        checkpoints.extend((line, stack) for line, stack in zip(self.restored_lines, self.restored_stacks)
+                           if line > self.lines[-1])
+        saved = []
+        for line, stack in checkpoints:
+            if not saved or line - saved[-1][0] >= self.SAVED_CHECKPOINT_SPACING:
+                saved.append((line, stack))
+        return saved
+
+    def restore_checkpoints(self, checkpoints):
+        self.restored_lines = []
+        self.restored_stacks = []
+        for line, stack in checkpoints:
+            if line > 0 and (not self.restored_lines or line > self.restored_lines[-1]):
+                self.restored_lines.append(line)
+                self.restored_stacks.append(self._interned.setdefault(stack, stack))
+
+    def _checkpoint(self, line, stack):
+        if self.lines[-1] >= line:
+            index = bisect.bisect_left(self.lines, line)
+            del self.lines[index:]
+            del self.stacks[index:]
+        self.lines.append(line)
+        self.stacks.append(self._interned.setdefault(stack, stack))
+
+    def style_needed(self, text_ctrl, end_pos):
+        stop_line = text_ctrl.LineFromPosition(end_pos) + 1
+        checkpoint = self._restored_checkpoint(text_ctrl)
+        if checkpoint is None:
+            self.style_lines(text_ctrl, stop_line)
+            return
+        # Style the screen from a restored checkpoint near it, then put the
+        # end of the styled text back where it was so the lines before are
+        # still styled in order by the background pass.
+        end_styled = text_ctrl.GetEndStyled()
+        self.style_lines(text_ctrl, stop_line, checkpoint)
+        text_ctrl.StartStyling(end_styled)
+
+    def _restored_checkpoint(self, text_ctrl):
+        # The restored checkpoint nearest above the first visible line, if
+        # it's well past the styled text.
+        first_line = text_ctrl.DocLineFromVisible(text_ctrl.GetFirstVisibleLine())
+        index = bisect.bisect_right(self.restored_lines, first_line) - 1
+        if index < 0:
+            return None
+        styled_line = text_ctrl.LineFromPosition(text_ctrl.GetEndStyled())
+        if self.restored_lines[index] - styled_line <= self.MARGIN_LINES:
+            return None
+        return self.restored_lines[index], self.restored_stacks[index]
+
+    def is_styled(self, text_ctrl):
+        return text_ctrl.GetEndStyled() >= text_ctrl.GetLength()
+
+    def style_lines(self, text_ctrl, stop_line, checkpoint=None):
+        # Styles from the first unstyled line, or from a (line, stack)
+        # checkpoint, up to stop_line. A margin of lines past it is read as
+        # lookahead context for the lexer.
+        line_count = text_ctrl.GetLineCount()
+        start_line = text_ctrl.LineFromPosition(text_ctrl.GetEndStyled())
+        stop_line = min(stop_line, line_count)
+        if checkpoint is not None:
+            line, stack = checkpoint
+        elif self.incremental:
+            index = bisect.bisect_right(self.lines, start_line) - 1
+            line, stack = self.lines[index], self.stacks[index]
+        else:
+            line, stack = max(0, start_line - self.CONTEXT_LINES), ('root',)
+
+        start = text_ctrl.PositionFromLine(line)
+        margin_line = stop_line + self.MARGIN_LINES
+        end = text_ctrl.PositionFromLine(margin_line) if margin_line < line_count else text_ctrl.GetLength()
+        text = text_ctrl.GetTextRange(start, end)
+        is_ascii = text.isascii()
+
+        if self.incremental:
+            runs = self._lex_lines(text, line, stop_line, stack, is_ascii)
+        else:
+            # The context lines are only lexed, not styled again.
+            context = len(text_ctrl.GetTextRange(start, text_ctrl.PositionFromLine(start_line)))
+            spans = [(index, index + len(value), style_for(token))
+                     for index, token, value in self.lexer.get_tokens_unprocessed(text)]
+            runs = self._runs(text, context, len(text), spans, is_ascii)
+            start = text_ctrl.PositionFromLine(start_line)
+
+        text_ctrl.StartStyling(start)
+        for length, style in runs:
+            text_ctrl.SetStyling(length, style)
+
+    def _lex_lines(self, text, line, stop_line, stack, is_ascii):
+        runs = []
+        pos = 0
+        while line < stop_line and pos < len(text):
+            line_end = text.find('\n', pos) + 1 or len(text)
+            key = (text[pos:line_end], stack)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                group_runs, stack = cached
+                new_pos = line_end
+            else:
+                group_runs, new_pos, stack = self._lex_group(text, pos, key[1], is_ascii)
+                if text[new_pos - 1] == '\n' and new_pos == line_end:
+                    self.cache[key] = (group_runs, stack)
+                    if len(self.cache) > self.CACHE_SIZE:
+                        self.cache.popitem(last=False)
+            runs.extend(group_runs)
+            line += text.count('\n', pos, new_pos)
+            pos = new_pos
+            if text[pos - 1] == '\n':
+                self._checkpoint(line, stack)
+        return runs
+
+    def _lex_group(self, text, pos, stack, is_ascii):
+        # RegexLexer.get_tokens_unprocessed, stopped at the first line start
+        # that falls between tokens so the state there can be recorded.
+        lexer = self.lexer
+        tokendefs = lexer._tokens
+        statestack = list(stack)
+        statetokens = tokendefs[statestack[-1]]
+        start = pos
+        spans = []
+        while pos < len(text):
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if m:
+                    if action is not None:
+                        if type(action) is _TokenType:
+                            spans.append((pos, m.end(), style_for(action)))
+                        else:
+                            for index, token, value in action(lexer, m):
+                                spans.append((index, index + len(value), style_for(token)))
+                    pos = m.end()
+                    if new_state is not None:
+                        if isinstance(new_state, tuple):
+                            for state in new_state:
+                                if state == '#pop':
+                                    if len(statestack) > 1:
+                                        statestack.pop()
+                                elif state == '#push':
+                                    statestack.append(statestack[-1])
+                                else:
+                                    statestack.append(state)
+                        elif isinstance(new_state, int):
+                            if abs(new_state) >= len(statestack):
+                                del statestack[1:]
+                            else:
+                                del statestack[new_state:]
+                        elif new_state == '#push':
+                            statestack.append(statestack[-1])
+                        statetokens = tokendefs[statestack[-1]]
+                    break
+            else:
+                if text[pos] == '\n':
+                    statestack = ['root']
+                    statetokens = tokendefs['root']
+                    spans.append((pos, pos + 1, STYLE_DEFAULT))
+                else:
+                    spans.append((pos, pos + 1, STYLE_ERROR))
+                pos += 1
+            if pos > start and text[pos - 1] == '\n':
+                break
+        return self._runs(text, start, pos, spans, is_ascii), pos, tuple(statestack)
+
+    def _runs(self, text, start, end, spans, is_ascii):
+        # Turns character spans into (byte length, style) runs covering
+        # [start, end); gaps a callback didn't emit get the default style.
+        def length(a, b):
+            return b - a if is_ascii else len(text[a:b].encode('utf-8'))
+
+        runs = []
+        cursor = start
+        for a, b, style in spans:
+            if b <= cursor:
+                continue
+            if a > cursor:
+                runs.append((length(cursor, a), STYLE_DEFAULT))
+            a = max(a, cursor)
+            if runs and runs[-1][1] == style:
+                runs[-1] = (runs[-1][0] + length(a, b), style)
+            else:
+                runs.append((length(a, b), style))
+            cursor = b
+        if cursor < end:
+            runs.append((length(cursor, end), STYLE_DEFAULT))
+        return runs
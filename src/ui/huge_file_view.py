@@ -0,0 +1,268 @@
+import functools
+import os
+import threading
+import time
+import wx
+import wx.stc as stc
+from utils.line_index import LineIndex
+from utils.search import block_search, compile_pattern, max_match_length
+
+class HugeFileView(wx.Panel):
+    # Read-only viewer for files too big to hand to a StyledTextCtrl. The
+    # file stays memory-mapped and only the lines in the visible window are
+    # decoded and shown, so memory use doesn't depend on the file size.
+    MAX_LINE_BYTES = 64 * 1024
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, parent, file_path, encoding='utf-8', offsets=None):
+        # offsets are the line start offsets of an earlier index of the same
+        # unchanged file, if there is one.
+        super().__init__(parent)
+        self.file_path = file_path
+        self.encoding = encoding
+        self.index = LineIndex(file_path)
+        if offsets is not None:
+            self.index.use_offsets(offsets)
+        self.top_line = 0
+        self.cancelled = threading.Event()
+        self.on_progress = None
+        self.search_offset = 0
+        self.match_start = 0
+        # The running search's cancel event and thread, and a match found
+        # past the end of the index so far, shown once it gets there.
+        self.search_cancelled = None
+        self.search_thread = None
+        self.pending_match = None
+
+        self.text_ctrl = stc.StyledTextCtrl(self)
+        self.text_ctrl.SetUseVerticalScrollBar(False)
+        self.text_ctrl.SetMarginType(1, stc.STC_MARGIN_TEXT)
+        self.text_ctrl.SetMarginWidth(1, 80)
+        self.text_ctrl.SetReadOnly(True)
+        self.scroll_bar = wx.ScrollBar(self, style=wx.SB_VERTICAL)
+
+        sizer = wx.BoxSizer(wx.HORIZONTAL)
+        sizer.Add(self.text_ctrl, 1, wx.EXPAND)
+        sizer.Add(self.scroll_bar, 0, wx.EXPAND)
+        self.SetSizer(sizer)
+
+        self.text_ctrl.Bind(wx.EVT_MOUSEWHEEL, self.on_mouse_wheel)
+        self.text_ctrl.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+        self.scroll_bar.Bind(wx.EVT_SCROLL, self.on_scroll)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+        self._last_progress = 0
+        self.index_thread = None
+        self.render()
+        if self.index.complete:
+            self.update_scroll_bar()
+        else:
+            self.index_thread = threading.Thread(target=self._build_index, daemon=True)
+            self.index_thread.start()
+
+    def _build_index(self):
+        self.index.build(cancelled=self.cancelled.is_set, progress=self._index_progress)
+        wx.CallAfter(self._index_updated)
+
+    def _index_progress(self, index):
+        now = time.monotonic()
+        if now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_progress = now
+            wx.CallAfter(self._index_updated)
+
+    def _index_updated(self):
+        if not self:
+            return
+        self.update_scroll_bar()
+        if self.top_line + self.lines_on_screen() >= self.index.line_count() - 1:
+            self.render()
+        if self.pending_match is not None and (self.index.complete
+                                               or self.pending_match[0][0] < self.index.indexed):
+            (start, end), done = self.pending_match
+            self.pending_match = None
+            self.show_match(start, end)
+            done(True)
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    def close(self):
+        # Stops the worker threads before the mapping they read from goes.
+        self.cancelled.set()
+        self.cancel_search()
+        for thread in (self.index_thread, self.search_thread):
+            if thread is not None:
+                thread.join()
+        self.index.close()
+
+    def on_destroy(self, event):
+        event.Skip()
+        if event.GetEventObject() is self:
+            self.close()
+
+    def lines_on_screen(self):
+        return max(1, self.text_ctrl.LinesOnScreen())
+
+    def line_count(self):
+        return self.index.line_count()
+
+    def max_top_line(self):
+        return max(0, self.line_count() - self.lines_on_screen())
+
+    def update_scroll_bar(self):
+        page = self.lines_on_screen()
+        self.scroll_bar.SetScrollbar(self.top_line, page, max(self.line_count(), page), page)
+
+    def render(self):
+        if not self:
+            return
+        count = min(self.lines_on_screen() + 1, self.line_count() - self.top_line)
+        lines = []
+        for line in range(self.top_line, self.top_line + count):
+            data, truncated = self.index.read_line(line, self.MAX_LINE_BYTES)
+            text = data.decode(self.encoding, errors='replace')
+            lines.append(text + " …" if truncated else text)
+
+        self.text_ctrl.SetReadOnly(False)
+        self.text_ctrl.SetText("\n".join(lines))
+        self.text_ctrl.SetReadOnly(True)
+        for i in range(count):
+            self.text_ctrl.MarginSetText(i, str(self.top_line + i + 1))
+        self.update_scroll_bar()
+
+    def scroll_to(self, line):
+        line = max(0, min(line, self.max_top_line()))
+        if line != self.top_line:
+            self.top_line = line
+            self.render()
+
+    def goto_line(self, line):
+        # Lines are 1-based here, to match what the user typed in.
+        line = max(0, min(line - 1, self.line_count() - 1))
+        self.scroll_to(line - self.lines_on_screen() // 2)
+        local_line = line - self.top_line
+        pos = self.text_ctrl.PositionFromLine(local_line)
+        self.text_ctrl.SetSelection(pos, pos)
+        self.search_offset = self.match_start = self.index.line_start(line)
+
+    def current_line(self):
+        return self.top_line + self.text_ctrl.LineFromPosition(self.text_ctrl.GetCurrentPos())
+
+    def find(self, find_string, match_case=False, whole_word=False, forward=True, regex=False, done=None):
+        # Searches on a worker thread, replacing any search still running,
+        # and calls done(found) once the match is shown or there is none.
+        # Raises re.error for an invalid regular expression.
+        pattern = compile_pattern(find_string, match_case, whole_word, regex, self.encoding)
+        overlap = max_match_length(find_string, regex)
+        self.cancel_search()
+        if self.search_thread is not None:
+            # Stops within a block of being cancelled.
+            self.search_thread.join()
+        cancelled = self.search_cancelled = threading.Event()
+        self.search_thread = threading.Thread(
+            target=self._search, args=(pattern, overlap, forward, self.search_offset, self.match_start,
+                                       cancelled, done or (lambda found: None)),
+            daemon=True)
+        self.search_thread.start()
+
+    def cancel_search(self):
+        if self.search_cancelled is not None:
+            self.search_cancelled.set()
+            self.search_cancelled = None
+        self.pending_match = None
+
+    def searching(self):
+        return self.search_cancelled is not None or self.pending_match is not None
+
+    def _search(self, pattern, overlap, forward, search_offset, match_start, cancelled, done):
+        # Searching back from the current match keeps to the blocks just
+        # above the caret before wrapping.
+        data = self.index.data
+        search = functools.partial(block_search, pattern, data, forward=forward, overlap=overlap,
+                                   cancelled=cancelled.is_set)
+        if forward:
+            match = search(search_offset, len(data)) or search(0, search_offset)
+        else:
+            match = search(0, match_start) or search(match_start, len(data))
+        span = (match.start(), match.end()) if match is not None else None
+        wx.CallAfter(self._search_done, cancelled, span, done)
+
+    def _search_done(self, cancelled, span, done):
+        if not self or cancelled.is_set():
+            return
+        self.search_cancelled = None
+        if span is None:
+            done(False)
+        elif not self.index.complete and span[0] >= self.index.indexed:
+            # Its line isn't known yet.
+            self.pending_match = (span, done)
+            if self.on_progress is not None:
+                self.on_progress(self)
+        else:
+            self.show_match(*span)
+            done(True)
+
+    def show_match(self, start, end):
+        line = self.index.line_from_offset(start)
+        self.scroll_to(line - self.lines_on_screen() // 3)
+        local_line = line - self.top_line
+        column = start - self.index.line_start(line)
+        if column + (end - start) <= self.MAX_LINE_BYTES:
+            line_pos = self.text_ctrl.PositionFromLine(local_line)
+            self.text_ctrl.SetSelection(line_pos + column, line_pos + column + (end - start))
+        self.match_start = start
+        self.search_offset = end
+
+    def status_text(self):
+        text = f"Ln {self.current_line() + 1} of {self.line_count()}"
+        if not self.index.complete:
+            percent = self.index.indexed * 100 // self.index.size if self.index.size else 100
+            text += f" (indexing {percent}%)"
+        if self.searching():
+            text += " (searching, Esc to cancel)"
+        return text
+
+    def on_scroll(self, event):
+        self.scroll_to(event.GetPosition())
+
+    def on_size(self, event):
+        event.Skip()
+        wx.CallAfter(self.render)
+
+    def on_mouse_wheel(self, event):
+        lines = event.GetWheelRotation() // max(1, event.GetWheelDelta()) * event.GetLinesPerAction()
+        self.scroll_to(self.top_line - lines)
+
+    def on_key_down(self, event):
+        key = event.GetKeyCode()
+        page = self.lines_on_screen()
+        if key == wx.WXK_UP:
+            self.scroll_to(self.top_line - 1)
+        elif key == wx.WXK_DOWN:
+            self.scroll_to(self.top_line + 1)
+        elif key == wx.WXK_PAGEUP:
+            self.scroll_to(self.top_line - page)
+        elif key == wx.WXK_PAGEDOWN:
+            self.scroll_to(self.top_line + page)
+        elif key == wx.WXK_HOME and event.ControlDown():
+            self.scroll_to(0)
+        elif key == wx.WXK_END and event.ControlDown():
+            self.scroll_to(self.max_top_line())
+        elif key == wx.WXK_ESCAPE and self.searching():
+            self.cancel_search()
+        else:
+            event.Skip()
+            return
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+def can_view_encoding(encoding):
+    # The line index splits on b'\n', which only works for encodings that
+    # keep ASCII bytes as they are.
+    return not encoding.startswith(('utf-16', 'utf-32'))
+
+def is_huge_file(file_path, threshold):
+    try:
+        return os.path.getsize(file_path) >= threshold
+    except OSError:
+        return False
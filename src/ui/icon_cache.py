@@ -0,0 +1,30 @@
+import os
+import wx
+from utils.file_operations import user_cache_dir
+
+ICON_DIR = os.path.join(os.path.dirname(__file__), "icons")
+
+def load_icon(name, size):
+    # The bundled PNGs are 64-128 px. Scaling one down costs a decode, a
+    # resample and a re-encode, so the scaled copy is kept in the user
+    # cache and later launches load that directly. The cached file is
+    # rebuilt whenever the bundled icon is newer.
+    source = os.path.join(ICON_DIR, f"{name}.png")
+    cached = os.path.join(user_cache_dir(), "icons", f"{name}-{size[0]}x{size[1]}.png")
+    try:
+        if os.path.getmtime(cached) >= os.path.getmtime(source):
+            bitmap = wx.Bitmap(cached, wx.BITMAP_TYPE_PNG)
+            if bitmap.IsOk():
+                return bitmap
+    except OSError:
+        pass
+
+    image = wx.Image(source, wx.BITMAP_TYPE_PNG).Scale(*size)
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        temp_path = f"{cached}.{os.getpid()}.tmp"
+        if image.SaveFile(temp_path, wx.BITMAP_TYPE_PNG):
+            os.replace(temp_path, cached)
+    except OSError:
+        pass
+    return image.ConvertToBitmap()
@@ -0,0 +1,116 @@
+import wx
+
+class SymbolList(wx.ListCtrl):
+    # Virtual list of symbols, indented by depth; rows are only formatted
+    # when they're drawn.
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL | wx.LC_NO_HEADER)
+        self.InsertColumn(0, "Symbol", width=220)
+        self.InsertColumn(1, "Line", width=60)
+        self.symbols = []
+
+    def set_symbols(self, symbols):
+        self.symbols = symbols
+        self.SetItemCount(len(symbols))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        symbol = self.symbols[item]
+        if column == 0:
+            return "    " * symbol.depth + symbol.name
+        return str(symbol.line + 1)
+
+    def selected_symbol(self):
+        item = self.GetFirstSelected()
+        return self.symbols[item] if item != -1 else None
+
+class OutlinePanel(wx.Panel):
+    # The definitions in the current tab, beside the notebook.
+    def __init__(self, parent, ui):
+        super().__init__(parent, size=(260, -1))
+        self.ui = ui
+        self.page = None
+        self.status = wx.StaticText(self, label="")
+        close_button = wx.Button(self, label="Close", style=wx.BU_EXACTFIT)
+        self.symbols = SymbolList(self)
+
+        header = wx.BoxSizer(wx.HORIZONTAL)
+        header.Add(self.status, 1, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 5)
+        header.Add(close_button, 0, wx.ALL, 2)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(header, 0, wx.EXPAND)
+        sizer.Add(self.symbols, 1, wx.EXPAND)
+        self.SetSizer(sizer)
+
+        close_button.Bind(wx.EVT_BUTTON, self.on_close)
+        self.symbols.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_item_activated)
+
+    def show_page(self, page, index):
+        # index is the page's SymbolIndex, or None if there isn't one yet.
+        self.page = page
+        if index is None:
+            self.symbols.set_symbols([])
+            self.status.SetLabel("Indexing..." if getattr(page, 'symbol_indexer', None) else "No outline")
+            return
+        self.symbols.set_symbols(index.symbols)
+        self.status.SetLabel(f"{len(index.symbols)} symbols")
+
+    def on_close(self, event):
+        self.ui.show_outline_panel(False)
+
+    def on_item_activated(self, event):
+        symbol = self.symbols.symbols[event.GetIndex()]
+        if self.page:
+            self.ui.goto_line(self.page, symbol.line + 1)
+
+class GoToSymbolDialog(wx.Dialog):
+    # Lists the symbols matching what's typed, best first, as it's typed.
+    MAX_RESULTS = 200
+
+    def __init__(self, parent, index):
+        super().__init__(parent, title="Go to Symbol", style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.index = index
+        self.query = wx.TextCtrl(self, size=(400, -1), style=wx.TE_PROCESS_ENTER)
+        self.results = SymbolList(self)
+        self.results.SetMinSize((400, 300))
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.query, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.results, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.SetSizerAndFit(sizer)
+
+        self.query.Bind(wx.EVT_TEXT, self.on_text)
+        self.query.Bind(wx.EVT_TEXT_ENTER, self.on_enter)
+        self.query.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+        self.results.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_enter)
+        self.on_text(None)
+        self.query.SetFocus()
+
+    def on_text(self, event):
+        query = self.query.GetValue().strip()
+        if query:
+            symbols = self.index.search(query, self.MAX_RESULTS)
+        else:
+            symbols = self.index.symbols[:self.MAX_RESULTS]
+        self.results.set_symbols(symbols)
+        if symbols:
+            self.results.Select(0)
+
+    def on_key_down(self, event):
+        # Up and down move through the results without leaving the box.
+        key = event.GetKeyCode()
+        if key not in (wx.WXK_UP, wx.WXK_DOWN) or not self.results.symbols:
+            event.Skip()
+            return
+        item = self.results.GetFirstSelected()
+        item = max(0, min(len(self.results.symbols) - 1, item + (1 if key == wx.WXK_DOWN else -1)))
+        self.results.Select(item)
+        self.results.EnsureVisible(item)
+
+    def on_enter(self, event):
+        if self.results.selected_symbol() is not None:
+            self.EndModal(wx.ID_OK)
+
+    def selected_symbol(self):
+        return self.results.selected_symbol()
@@ -0,0 +1,57 @@
+class ReplaceAll:
+    # Replaces every match in a StyledTextCtrl through the target API, a
+    # batch at a time, so the document is never copied out and rebuilt.
+    # Matches are processed from the end of the document backwards, which
+    # keeps the offsets of the ones still to do valid without adjusting.
+    BATCH_SIZE = 2000
+
+    def __init__(self, text_ctrl, matches, replace_string, regex=False):
+        self.text_ctrl = text_ctrl
+        self.pattern = matches.pattern
+        self.starts = matches.starts
+        self.ends = matches.ends
+        self.total = len(matches)
+        self.remaining = self.total
+        self.replaced = 0
+        self.replace_string = replace_string
+        self.template = replace_string.encode('utf-8') if regex else None
+        self.cancelled = False
+        self.first_visible_line = text_ctrl.GetFirstVisibleLine()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def done(self):
+        return self.cancelled or self.remaining == 0
+
+    def step(self):
+        first = max(0, self.remaining - self.BATCH_SIZE)
+        indices = range(self.remaining - 1, first - 1, -1)
+        replacements = self._replacements(indices)
+
+        text_ctrl = self.text_ctrl
+        text_ctrl.SetReadOnly(False)
+        for i, replacement in zip(indices, replacements):
+            if replacement is None:
+                continue
+            text_ctrl.SetTargetStart(self.starts[i])
+            text_ctrl.SetTargetEnd(self.ends[i])
+            text_ctrl.ReplaceTarget(replacement)
+            self.replaced += 1
+        text_ctrl.SetReadOnly(True)
+        self.remaining = first
+
+    def _replacements(self, indices):
+        if self.template is None:
+            return [self.replace_string] * len(indices)
+        # Expand group references up front, in a separate call from the
+        # edits: the buffer view is only valid until the document changes.
+        buffer = self.text_ctrl.GetCharacterPointer()
+        replacements = []
+        for i in indices:
+            match = self.pattern.match(buffer, self.starts[i])
+            if match is None or match.end() != self.ends[i]:
+                replacements.append(None)
+            else:
+                replacements.append(match.expand(self.template).decode('utf-8', errors='replace'))
+        return replacements
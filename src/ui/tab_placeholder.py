@@ -0,0 +1,32 @@
+import zlib
+import wx
+
+class TabPlaceholder(wx.Window):
+    # Stands in for a tab's StyledTextCtrl until the tab is first shown, or
+    # after it has gone unseen for a while. It is a bare window holding only
+    # what's needed to build the control again: the path, the contents as
+    # UTF-8 (zlib-compressed past a size where that's worth it), and for a
+    # released tab its format, undo history, highlighter and view position.
+    COMPRESS_THRESHOLD = 64 * 1024
+    COMPRESS_LEVEL = 1
+
+    def __init__(self, parent, file_path, data=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.file_format = None
+        self.undo_history = None
+        self.highlighter = None
+        self.read_only = False
+        self.file_stat = None
+        self.disk_stat = None
+        self.journal = None
+        self.words_indexed = False
+        self.view = None
+        self.set_data(data)
+
+    def set_data(self, data):
+        self.compressed = data is not None and len(data) >= self.COMPRESS_THRESHOLD
+        self.data = zlib.compress(data, self.COMPRESS_LEVEL) if self.compressed else data
+
+    def get_data(self):
+        return zlib.decompress(self.data) if self.compressed else self.data
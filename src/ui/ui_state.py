@@ -0,0 +1,39 @@
+import wx
+
+class UpdateScheduler:
+    # Coalesces UI refreshes. Handlers that fire in bursts (caret moves,
+    # scrolls, search results arriving) request a refresh by key instead
+    # of redrawing; every refresh requested within a frame then runs once
+    # from a single one-shot timer.
+    FRAME_MS = 16
+
+    def __init__(self, owner):
+        self.pending = {}
+        self.timer = wx.Timer(owner)
+        owner.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+
+    def request(self, key, callback):
+        self.pending[key] = callback
+        if not self.timer.IsRunning():
+            self.timer.StartOnce(self.FRAME_MS)
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+    def on_timer(self, event):
+        self.flush()
+
+class CachedStatusBar(wx.StatusBar):
+    # Remembers what each field shows and only redraws fields whose text
+    # actually changed.
+    def __init__(self, parent, fields):
+        super().__init__(parent)
+        self.SetFieldsCount(fields)
+        self.rendered = [""] * fields
+
+    def SetStatusText(self, text, i=0):
+        if self.rendered[i] != text:
+            self.rendered[i] = text
+            super().SetStatusText(text, i)
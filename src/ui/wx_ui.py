@@ -1,22 +1,97 @@
 import wx
 import wx.stc as stc
-from utils.file_operations import get_file_path, read_file
+from ui.file_tasks import FileLoader, FileReloader, FileSaver, SymbolIndexer, WordCounter
+from ui.colouring import ColouringScheduler
+from ui.control_text import ControlText
+from ui.file_drop import FileDropTarget
+from ui.icon_cache import load_icon
+from ui.replace_all import ReplaceAll
+from ui.tab_placeholder import TabPlaceholder
+from ui.ui_state import CachedStatusBar, UpdateScheduler
+from ui.huge_file_view import HugeFileView, can_view_encoding, is_huge_file
+from utils.file_operations import FileFormat, decode_complete, default_eol, sniff_file
+from utils.instrumentation import metrics
+from utils.search import MatchList, compile_pattern
+from utils.symbols import language_for
+from utils.word_index import WordIndex
+from utils.document import Document, utf8_length
+from utils.session import CacheEntry, FileCache, TabState, file_stat, load_session, save_session
+from utils.file_watcher import FileChange, FileWatcher
+from utils.parallel_read import ParallelReader
+from utils.recovery import JournalWriter, RecoveryJournal, discard_journal, find_recoverable, replay
+from utils.undo import UndoHistory
 import os
+import functools
+import logging
 import re
-import keyword
+import time
+
+logger = logging.getLogger(__name__)
+
+# Pygments lexers that can't resume part way through a file, for which
+# Scintilla has a built-in lexer that colours as fast as typing.
+NATIVE_LEXERS = {
+    'C': stc.STC_LEX_CPP,
+    'C++': stc.STC_LEX_CPP,
+}
+
+CPP_KEYWORDS = (
+    "alignas alignof asm auto bool break case catch char char16_t char32_t class const constexpr "
+    "const_cast continue decltype default delete do double dynamic_cast else enum explicit export "
+    "extern false float for friend goto if inline int long mutable namespace new noexcept nullptr "
+    "operator private protected public register reinterpret_cast return short signed sizeof static "
+    "static_assert static_cast struct switch template this thread_local throw true try typedef "
+    "typeid typename union unsigned using virtual void volatile wchar_t while")
+
+EOL_MODES = {
+    'CRLF': stc.STC_EOL_CRLF,
+    'LF': stc.STC_EOL_LF,
+    'CR': stc.STC_EOL_CR,
+}
 
 class WXUI(wx.Frame):
-    UNDO_LIMIT = 64 
+    UNDO_BYTE_LIMIT = 4 * 1024 * 1024
     UNDO_CHUNK_SIZE = 12
+    # Files at least this big open in the read-only memory-mapped viewer.
+    HUGE_FILE_THRESHOLD = 512 * 1024 * 1024
+    # Files up to this size are read whole on a thread pool when opened from
+    # the dialog, the command line or a drop; bigger ones stream in.
+    PARALLEL_READ_LIMIT = 8 * 1024 * 1024
+    # Tabs bigger than this don't add their words to the completion index.
+    WORD_INDEX_LIMIT = 16 * 1024 * 1024
+    WORD_CONTEXT = 256
+    MAX_COMPLETIONS = 100
+    # Tabs left unseen this many seconds give up their control for a
+    # placeholder; None keeps every control alive.
+    TAB_RELEASE_AFTER = 15 * 60
+    TAB_RELEASE_INTERVAL_MS = 60 * 1000
 
     def __init__(self, editor):
         super().__init__(parent=None, title="MATX Editor", style=wx.DEFAULT_FRAME_STYLE)
         self.editor = editor
         self.SetSize(800, 600)
-        self.undo_stack = []
-        self.redo_stack = []
-        self.current_chunk = ""
-        self.current_chunk_start = 0
+        self.goto_line_id = wx.NewIdRef()
+        self.find_next_id = wx.NewIdRef()
+        self.find_previous_id = wx.NewIdRef()
+        self.regex_search_id = wx.NewIdRef()
+        self.find_in_files_id = wx.NewIdRef()
+        self.record_timings_id = wx.NewIdRef()
+        self.timing_report_id = wx.NewIdRef()
+        self.goto_symbol_id = wx.NewIdRef()
+        self.goto_definition_id = wx.NewIdRef()
+        self.outline_id = wx.NewIdRef()
+        self.find_regex = False
+        self.last_find = None
+        self.replacing_page = False
+        self.file_cache = FileCache()
+        # Started with the first edit.
+        self.journal_writer = None
+        # Started with the first file opened.
+        self.file_watcher = None
+        # ParallelReaders still opening files.
+        self.readers = set()
+        # Words of all the tabs, for completion.
+        self.word_index = WordIndex()
         
         panel = wx.Panel(self)
         sizer = wx.BoxSizer(wx.VERTICAL)
@@ -24,38 +99,33 @@ class WXUI(wx.Frame):
         toolbar = wx.ToolBar(panel, style=wx.TB_FLAT | wx.TB_HORIZONTAL)
         toolbar.SetBackgroundColour(wx.Colour(45, 45, 45))
 
-        icon_path = os.path.join(os.path.dirname(__file__), "icons")
         icon_size = (24, 24)
 
-        new_bmp = wx.Bitmap(os.path.join(icon_path, "new.png"))
-        new_bmp = new_bmp.ConvertToImage().Scale(*icon_size).ConvertToBitmap()
-        new_tool = toolbar.AddTool(wx.ID_NEW, "New", new_bmp)
-
-        open_bmp = wx.Bitmap(os.path.join(icon_path, "open.png"))
-        open_bmp = open_bmp.ConvertToImage().Scale(*icon_size).ConvertToBitmap()
-        open_tool = toolbar.AddTool(wx.ID_OPEN, "Open", open_bmp)
-
-        save_bmp = wx.Bitmap(os.path.join(icon_path, "save.png"))
-        save_bmp = save_bmp.ConvertToImage().Scale(*icon_size).ConvertToBitmap()
-        save_tool = toolbar.AddTool(wx.ID_SAVE, "Save", save_bmp)
+        new_tool = toolbar.AddTool(wx.ID_NEW, "New", load_icon("new", icon_size))
+        open_tool = toolbar.AddTool(wx.ID_OPEN, "Open", load_icon("open", icon_size))
+        save_tool = toolbar.AddTool(wx.ID_SAVE, "Save", load_icon("save", icon_size))
 
         toolbar.AddSeparator()
 
-        undo_bmp = wx.Bitmap(os.path.join(icon_path, "undo.png"))
-        undo_bmp = undo_bmp.ConvertToImage().Scale(*icon_size).ConvertToBitmap()
-        undo_tool = toolbar.AddTool(wx.ID_UNDO, "Undo", undo_bmp)
-
-        redo_bmp = wx.Bitmap(os.path.join(icon_path, "redo.png"))
-        redo_bmp = redo_bmp.ConvertToImage().Scale(*icon_size).ConvertToBitmap()
-        redo_tool = toolbar.AddTool(wx.ID_REDO, "Redo", redo_bmp)
+        undo_tool = toolbar.AddTool(wx.ID_UNDO, "Undo", load_icon("undo", icon_size))
+        redo_tool = toolbar.AddTool(wx.ID_REDO, "Redo", load_icon("redo", icon_size))
 
         toolbar.Realize()
         sizer.Add(toolbar, 0, wx.EXPAND)
 
         self.notebook = wx.Notebook(panel)
-        sizer.Add(self.notebook, 1, wx.EXPAND | wx.ALL, 5)
+        self.colouring = ColouringScheduler(self, self.notebook.GetCurrentPage)
+        self.ui_updates = UpdateScheduler(self)
+        self.content_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.content_sizer.Add(self.notebook, 1, wx.EXPAND)
+        sizer.Add(self.content_sizer, 1, wx.EXPAND | wx.ALL, 5)
+
+        # Created on first use, below the notebook and beside it.
+        self.find_in_files_panel = None
+        self.outline_panel = None
 
         panel.SetSizer(sizer)
+        self.main_panel = panel
 
         self.Bind(wx.EVT_TOOL, self.on_new, new_tool)
         self.Bind(wx.EVT_TOOL, self.on_open, open_tool)
@@ -67,7 +137,25 @@ class WXUI(wx.Frame):
         self.create_status_bar()
         self.Bind(wx.EVT_MENU, self.on_find, id=wx.ID_FIND)
         self.Bind(wx.EVT_MENU, self.on_replace, id=wx.ID_REPLACE)
+        self.Bind(wx.EVT_MENU, self.on_goto_line, id=self.goto_line_id)
+        self.Bind(wx.EVT_MENU, self.on_find_next, id=self.find_next_id)
+        self.Bind(wx.EVT_MENU, self.on_find_previous, id=self.find_previous_id)
+        self.Bind(wx.EVT_MENU, self.on_toggle_regex, id=self.regex_search_id)
+        self.Bind(wx.EVT_MENU, self.on_find_in_files, id=self.find_in_files_id)
+        self.Bind(wx.EVT_MENU, self.on_toggle_timings, id=self.record_timings_id)
+        self.Bind(wx.EVT_MENU, self.on_timing_report, id=self.timing_report_id)
+        self.Bind(wx.EVT_MENU, self.on_goto_symbol, id=self.goto_symbol_id)
+        self.Bind(wx.EVT_MENU, self.on_goto_definition, id=self.goto_definition_id)
+        self.Bind(wx.EVT_MENU, self.on_toggle_outline, id=self.outline_id)
         self.notebook.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self.on_tab_change)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        self.SetDropTarget(FileDropTarget(self.open_files))
+        self.notebook.SetDropTarget(FileDropTarget(self.open_files))
+
+        self.release_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_release_timer, self.release_timer)
+        if self.TAB_RELEASE_AFTER is not None:
+            self.release_timer.Start(self.TAB_RELEASE_INTERVAL_MS)
 
     def apply_dark_theme(self):
         dark_bg = wx.Colour(30, 30, 30)
@@ -105,201 +193,760 @@ class WXUI(wx.Frame):
         
         event.Skip()
 
-    def add_tab(self, file_path, content):
-        text_ctrl = stc.StyledTextCtrl(self.notebook)
-        text_ctrl.SetReadOnly(False)
-        
-        lexer = self.set_lexer(text_ctrl, file_path)
-        self.set_style(text_ctrl, lexer)
-        
-        text_ctrl.SetText(content)
-        text_ctrl.Colourise(0, -1)
-        
-        text_ctrl.lexer = lexer
-        
-        text_ctrl.SetMarginType(1, stc.STC_MARGIN_NUMBER)
-        text_ctrl.SetMarginWidth(1, 30)
+    def set_lexer(self, text_ctrl, file_path):
+        # Pygments takes a noticeable part of startup to import, so it is
+        # only loaded when the first tab needs a lexer.
+        from ui.highlighter import create_highlighter
+        # Any language Pygments knows is styled by us through container
+        # lexing, except that C and C++ use Scintilla's own lexer since
+        # Pygments can't resume them part way; everything else is plain
+        # text.
+        highlighter = create_highlighter(file_path)
+        text_ctrl.lexer_name = highlighter.name if highlighter else "Plain Text"
+        if highlighter is not None and not highlighter.incremental and highlighter.name in NATIVE_LEXERS:
+            text_ctrl.highlighter = None
+            lexer = NATIVE_LEXERS[highlighter.name]
+        else:
+            text_ctrl.highlighter = highlighter
+            lexer = stc.STC_LEX_CONTAINER if highlighter else stc.STC_LEX_NULL
 
-        text_ctrl.SetUndoCollection(True)
-        text_ctrl.EmptyUndoBuffer()
+        text_ctrl.SetLexer(lexer)
+        logger.debug("Lexer for %s: %s", file_path, lexer)
+        return lexer
 
-        text_ctrl.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
-        text_ctrl.Bind(wx.stc.EVT_STC_MODIFIED, self.on_text_modified)
-        text_ctrl.Bind(wx.stc.EVT_STC_UPDATEUI, self.on_update_ui)
+    @metrics.timed('add_tab')
+    def add_tab(self, file_path, content=None, select=True):
+        if content is None and is_huge_file(file_path, self.HUGE_FILE_THRESHOLD):
+            entry = self.file_cache.get(file_path)
+            file_format = entry.file_format if entry else sniff_file(file_path)
+            if can_view_encoding(file_format.encoding):
+                return self.add_huge_file_tab(file_path, file_format, entry, select)
+
+        if not select:
+            # The control is only built once the tab is first selected.
+            data = content.encode('utf-8') if content is not None else None
+            placeholder = TabPlaceholder(self.notebook, file_path, data)
+            self.notebook.AddPage(placeholder, os.path.basename(file_path))
+            return placeholder
+
+        text_ctrl = self.create_text_ctrl(file_path)
+        if content is not None:
+            text_ctrl.SetText(content)
+            self.index_words(text_ctrl)
 
         self.notebook.AddPage(text_ctrl, os.path.basename(file_path))
         self.notebook.SetSelection(self.notebook.GetPageCount() - 1)
-        
-        print(f"Debug: Tab added for {file_path} with lexer {lexer}")
+        self.colouring.schedule(text_ctrl)
+        logger.debug("Tab added for %s with lexer %s", file_path, text_ctrl.lexer)
 
-    def set_lexer(self, text_ctrl, file_path):
-        file_extension = file_path.split('.')[-1].lower() if '.' in file_path else ''
-        lexer = stc.STC_LEX_NULL  # Default to plain text
-
-        if file_extension in ['py', 'pyw']:
-            lexer = stc.STC_LEX_PYTHON
-        elif file_extension in ['cpp', 'cxx', 'h', 'hpp']:
-            lexer = stc.STC_LEX_CPP
-        elif file_extension == 'html':
-            lexer = stc.STC_LEX_HTML
-        elif file_extension == 'css':
-            lexer = stc.STC_LEX_CSS
+        if content is None:
+            self.load_file(text_ctrl, file_path)
+        return text_ctrl
 
-        text_ctrl.SetLexer(lexer)
-        print(f"Setting lexer for {file_path}: {lexer}")
-        return lexer
-
-    def add_tab(self, file_path, content):
+    def create_text_ctrl(self, file_path):
         text_ctrl = stc.StyledTextCtrl(self.notebook)
         text_ctrl.SetReadOnly(False)  # Ensure it's not read-only
+        text_ctrl.file_path = file_path
+        self.apply_file_format(text_ctrl, FileFormat('utf-8', False, default_eol()))
+        text_ctrl.loader = None
+        text_ctrl.saver = None
+        # The control is a view of the document: edits typed into it are
+        # passed to the document, and edits made to the document (undo,
+        # scripts) are applied to the control. The document reads its text
+        # from the control rather than keeping a copy of its own.
+        text_ctrl.document = Document(
+            history=UndoHistory(self.UNDO_BYTE_LIMIT, self.UNDO_CHUNK_SIZE, utf8_length))
+        text_ctrl.document.attach(ControlText(text_ctrl))
+        text_ctrl.document.subscribe(functools.partial(self.on_document_edit, text_ctrl))
+        text_ctrl.syncing = False
+        text_ctrl.matches = None
+        text_ctrl.replacer = None
+        text_ctrl.pending_line = None
+        text_ctrl.pending_view = None
+        # (mtime_ns, size) of the file while the text is still what was
+        # loaded from it, for the file cache; None once edited.
+        text_ctrl.file_stat = None
+        text_ctrl.cache_entry = None
+        # Crash-recovery journal, started by the first edit and dropped once
+        # the edits are saved.
+        text_ctrl.journal = None
+        text_ctrl.edit_count = 0
+        text_ctrl.saved_edit_count = None
+        # (mtime_ns, size) of the version on disk the tab last loaded, saved
+        # or reloaded, whether or not it has been edited since.
+        text_ctrl.disk_stat = None
+        text_ctrl.reloader = None
+        text_ctrl.reloading = False
+        # (disk_stat, bytes) of a character the followed file has only been
+        # partly written with so far, kept out of the tab until the rest
+        # arrives.
+        text_ctrl.held_back = None
+        # SymbolIndex built on first use and then kept up to date by edits.
+        text_ctrl.symbols = None
+        text_ctrl.symbol_indexer = None
+        # Whether the tab's words are in self.word_index, which edits then
+        # keep up to date.
+        text_ctrl.words_indexed = False
+        text_ctrl.word_counter = None
         
         lexer = self.set_lexer(text_ctrl, file_path)
         self.set_style(text_ctrl, lexer)
-        
-        text_ctrl.SetText(content)
-        text_ctrl.Colourise(0, -1)
-        
+        text_ctrl.Bind(wx.stc.EVT_STC_STYLENEEDED, self.on_style_needed)
         text_ctrl.lexer = lexer
         
-        dark_bg = wx.Colour(30, 30, 30)
-        light_text = wx.Colour(212, 212, 212)
-        
-        text_ctrl.StyleSetSpec(stc.STC_STYLE_DEFAULT, f"face:Consolas,size:10,back:{dark_bg.GetAsString(wx.C2S_HTML_SYNTAX)},fore:{light_text.GetAsString(wx.C2S_HTML_SYNTAX)}")
-        text_ctrl.StyleClearAll()
-        
         text_ctrl.SetMarginType(1, stc.STC_MARGIN_NUMBER)
         text_ctrl.SetMarginWidth(1, 30)
         text_ctrl.StyleSetSpec(stc.STC_STYLE_LINENUMBER, f"back:#252526,fore:#858585")
 
-        text_ctrl.SetUndoCollection(True)
+        # Undo is handled by text_ctrl.document; don't keep a second copy.
+        text_ctrl.SetUndoCollection(False)
         text_ctrl.EmptyUndoBuffer()
 
         text_ctrl.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
         text_ctrl.Bind(wx.stc.EVT_STC_MODIFIED, self.on_text_modified)
         text_ctrl.Bind(wx.stc.EVT_STC_UPDATEUI, self.on_update_ui)
+        text_ctrl.Bind(wx.stc.EVT_STC_CHARADDED, self.on_char_added)
+        text_ctrl.AutoCompSetMaxHeight(10)
+        text_ctrl.AutoCompSetCancelAtStart(False)
+        return text_ctrl
 
-        self.notebook.AddPage(text_ctrl, os.path.basename(file_path))
-        self.notebook.SetSelection(self.notebook.GetPageCount() - 1)
-        
-        print(f"Debug: Tab added for {file_path} with lexer {lexer}")
-        text_ctrl.Colourise(0, -1) 
+    def replace_page(self, old_page, new_page):
+        # Swap a tab's window in place without the swap itself counting
+        # as a tab change.
+        index = self.notebook.FindPage(old_page)
+        selected = self.notebook.GetSelection() == index
+        self.replacing_page = True
+        try:
+            self.notebook.InsertPage(index, new_page, self.notebook.GetPageText(index))
+            self.notebook.RemovePage(index + 1)
+            if selected:
+                self.notebook.ChangeSelection(index)
+        finally:
+            self.replacing_page = False
+        old_page.Destroy()
+
+    @metrics.timed('materialize_tab')
+    def materialize_tab(self, page):
+        if not page or not isinstance(page, TabPlaceholder):
+            return page
+        text_ctrl = self.create_text_ctrl(page.file_path)
+        data = page.get_data()
+        if data is not None:
+            text_ctrl.syncing = True
+            text_ctrl.SetTextRaw(data)
+            text_ctrl.syncing = False
+        if page.file_format is not None:
+            self.apply_file_format(text_ctrl, page.file_format)
+        if page.undo_history is not None:
+            # A released tab: its history and lexer checkpoints still
+            # match the text, so they carry straight over.
+            text_ctrl.document.history = page.undo_history
+            if page.highlighter is not None:
+                text_ctrl.highlighter = page.highlighter
+            text_ctrl.SetReadOnly(page.read_only)
+            text_ctrl.file_stat = page.file_stat
+            text_ctrl.disk_stat = page.disk_stat
+            text_ctrl.journal = page.journal
+            text_ctrl.words_indexed = page.words_indexed
+        self.replace_page(page, text_ctrl)
+        if page.view is not None:
+            if data is None:
+                text_ctrl.pending_view = page.view
+            else:
+                self.set_view(text_ctrl, page.view)
+        self.colouring.schedule(text_ctrl)
+        if data is None:
+            self.load_file(text_ctrl, text_ctrl.file_path)
+        else:
+            self.index_words(text_ctrl)
+            if text_ctrl.disk_stat is not None:
+                # Released tabs don't follow the file; catch up now.
+                self.check_file(text_ctrl)
+        if self.notebook.GetCurrentPage() is text_ctrl:
+            self.refresh_status_bar()
+            self.refresh_outline()
+        return text_ctrl
+
+    def release_tab(self, text_ctrl):
+        if (not isinstance(text_ctrl, stc.StyledTextCtrl) or text_ctrl.loader or text_ctrl.saver
+                or text_ctrl.replacer or text_ctrl.reloader or text_ctrl.symbol_indexer
+                or text_ctrl.word_counter or self.held_back(text_ctrl)):
+            return
+        placeholder = TabPlaceholder(self.notebook, text_ctrl.file_path, text_ctrl.GetTextRaw())
+        placeholder.file_format = FileFormat(text_ctrl.encoding, text_ctrl.bom, text_ctrl.eol)
+        placeholder.undo_history = text_ctrl.document.history
+        placeholder.highlighter = text_ctrl.highlighter
+        placeholder.read_only = text_ctrl.GetReadOnly()
+        placeholder.file_stat = text_ctrl.file_stat
+        placeholder.disk_stat = text_ctrl.disk_stat
+        placeholder.journal = text_ctrl.journal
+        placeholder.words_indexed = text_ctrl.words_indexed
+        placeholder.view = self.get_view(text_ctrl)
+        placeholder.last_shown = text_ctrl.last_shown
+        self.replace_page(text_ctrl, placeholder)
+
+    def get_view(self, text_ctrl):
+        return (text_ctrl.GetAnchor(), text_ctrl.GetCurrentPos(),
+                text_ctrl.GetFirstVisibleLine(), text_ctrl.GetXOffset())
+
+    def set_view(self, text_ctrl, view):
+        anchor, caret, first_line, x_offset = view
+        text_ctrl.SetSelection(anchor, caret)
+        text_ctrl.SetFirstVisibleLine(first_line)
+        text_ctrl.SetXOffset(x_offset)
+
+    def on_release_timer(self, event):
+        now = time.monotonic()
+        current = self.notebook.GetCurrentPage()
+        for index in range(self.notebook.GetPageCount()):
+            page = self.notebook.GetPage(index)
+            if page is current or not isinstance(page, stc.StyledTextCtrl):
+                continue
+            last_shown = getattr(page, 'last_shown', None)
+            if last_shown is None:
+                page.last_shown = now
+            elif now - last_shown >= self.TAB_RELEASE_AFTER:
+                self.release_tab(page)
+
+    def apply_file_format(self, text_ctrl, file_format):
+        text_ctrl.encoding = file_format.encoding
+        text_ctrl.bom = file_format.bom
+        text_ctrl.eol = file_format.eol
+        text_ctrl.SetEOLMode(EOL_MODES[file_format.eol])
+
+    def get_encoding_name(self, encoding, bom):
+        name = encoding.upper().replace('-LE', ' LE').replace('-BE', ' BE')
+        return f"{name} BOM" if bom else name
+
+    def add_huge_file_tab(self, file_path, file_format, entry=None, select=True):
+        # entry is the file's cache entry, whose line index saves building
+        # it again.
+        try:
+            stat = entry.stat if entry else file_stat(file_path)
+            view = HugeFileView(self.notebook, file_path, file_format.encoding,
+                                entry.offsets if entry else None)
+        except OSError as e:
+            wx.MessageBox(f"Could not open {file_path}:\n{e}", "Open File", wx.OK | wx.ICON_ERROR)
+            return None
+        view.file_format = file_format
+        view.file_stat = stat
+        view.on_progress = self.refresh_huge_file_status
+        self.notebook.AddPage(view, f"{os.path.basename(file_path)} (read-only)")
+        if select:
+            self.notebook.SetSelection(self.notebook.GetPageCount() - 1)
+        logger.debug("Opened %s in large file mode", file_path)
+        return view
+
+    def refresh_huge_file_status(self, view):
+        if self.notebook.GetCurrentPage() is view:
+            self.status_bar.SetStatusText(view.status_text(), 0)
+            self.status_bar.SetStatusText(self.get_encoding_name(view.encoding, False), 1)
+            self.status_bar.SetStatusText("Plain Text (read-only)", 2)
+            self.status_bar.SetStatusText("", 3)
+
+    def open_files(self, file_paths):
+        # Opens files in new tabs, selecting the first. Tabs already open
+        # are selected instead. Files small enough are read concurrently and
+        # their tabs added as each is ready, in the order given.
+        to_read = []
+        for index, file_path in enumerate(file_paths):
+            tab = self.find_tab(file_path)
+            if tab != wx.NOT_FOUND:
+                if index == 0:
+                    self.notebook.SetSelection(tab)
+                continue
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0    # reported when it fails to read
+            if size > self.PARALLEL_READ_LIMIT:
+                self.add_tab(file_path, select=index == 0)
+            elif file_path not in to_read:
+                to_read.append(file_path)
+        if not to_read:
+            return
+        reader = ParallelReader(to_read, None, self.file_cache)
+        reader.on_ready = functools.partial(wx.CallAfter, self.on_file_read, reader)
+        reader.select = to_read[0] if to_read[0] == file_paths[0] else None
+        reader.pages = [None] * len(to_read)
+        reader.errors = []
+        self.readers.add(reader)
+        self.status_bar.SetStatusText(f"Opening {len(to_read)} files..." if len(to_read) > 1 else
+                                      f"Loading {os.path.basename(to_read[0])}...", 0)
+        reader.start()
+
+    def on_file_read(self, reader, read):
+        if reader.cancelled.is_set():
+            return
+        try:
+            if read.error is not None:
+                reader.errors.append(f"{read.file_path}: {read.error}")
+            elif self.find_tab(read.file_path) == wx.NOT_FOUND:
+                position = reader.file_paths.index(read.file_path)
+                reader.pages[position] = self.add_read_tab(reader, position, read)
+        finally:
+            reader.done()
+        if reader.remaining:
+            return
+        self.readers.discard(reader)
+        opened = sum(1 for page in reader.pages if page)
+        self.status_bar.SetStatusText(f"Opened {opened} files" if opened != 1 else
+                                      f"Loaded {os.path.basename(reader.file_paths[0])}", 0)
+        if reader.errors:
+            wx.MessageBox("Could not open:\n" + "\n".join(reader.errors), "Open File", wx.OK | wx.ICON_ERROR)
+
+    def add_read_tab(self, reader, position, read):
+        text_ctrl = self.create_text_ctrl(read.file_path)
+        text_ctrl.syncing = True
+        text_ctrl.SetTextRaw(read.data)
+        text_ctrl.syncing = False
+        self.finish_load(text_ctrl, read.stat, read.file_format, read.entry)
+        # Before the tab of the next file named, if that's already in.
+        index = self.notebook.GetPageCount()
+        later = [page for page in reader.pages[position + 1:] if page]
+        if later and self.notebook.FindPage(later[0]) != wx.NOT_FOUND:
+            index = self.notebook.FindPage(later[0])
+        self.notebook.InsertPage(index, text_ctrl, os.path.basename(read.file_path),
+                                 read.file_path == reader.select)
+        self.colouring.schedule(text_ctrl)
+        return text_ctrl
+
+    def finish_load(self, text_ctrl, stat, file_format, entry):
+        # The tab now holds the file as it was on disk at stat; entry is
+        # the file's cache entry if that matches it.
+        self.apply_file_format(text_ctrl, file_format)
+        text_ctrl.SetReadOnly(False)
+        text_ctrl.SetSavePoint()
+        text_ctrl.file_stat = text_ctrl.disk_stat = stat
+        self.watch_file(text_ctrl.file_path, stat)
+        highlighter = text_ctrl.highlighter
+        if entry and highlighter is not None and highlighter.incremental and entry.lexer == highlighter.name:
+            highlighter.restore_checkpoints(entry.checkpoints)
+        self.index_words(text_ctrl)
+
+    def load_file(self, text_ctrl, file_path):
+        # Stream the file in on a worker thread; the tab stays read-only and
+        # outside undo until the last chunk has been appended.
+        text_ctrl.SetReadOnly(True)
+        entry = text_ctrl.cache_entry = self.file_cache.get(file_path)
+        try:
+            loader = FileLoader(file_path,
+                                functools.partial(self.on_load_chunk, text_ctrl),
+                                functools.partial(self.on_load_done, text_ctrl),
+                                entry.file_format if entry else None)
+        except OSError as e:
+            self.on_load_done(text_ctrl, None, e)
+            return
+        text_ctrl.loader = loader
+        self.status_bar.SetStatusText(f"Loading {os.path.basename(file_path)}...", 0)
+        loader.start()
+
+    def on_load_chunk(self, text_ctrl, loader, text, loaded):
+        if not text_ctrl:
+            loader.cancel()
+            return
+        if text_ctrl.GetLength() == 0:
+            self.apply_file_format(text_ctrl, loader.file_format)
+            if self.notebook.GetCurrentPage() is text_ctrl:
+                self.refresh_status_bar()
+        text_ctrl.SetReadOnly(False)
+        text_ctrl.AppendText(text)
+        text_ctrl.SetReadOnly(True)
+        percent = loaded * 100 // loader.total if loader.total else 100
+        self.status_bar.SetStatusText(
+            f"Loading {os.path.basename(loader.file_path)}... {percent}% (Esc to cancel)", 0)
+
+    def on_load_done(self, text_ctrl, loader, error):
+        if not text_ctrl:
+            return
+        text_ctrl.loader = None
+        entry = text_ctrl.cache_entry
+        text_ctrl.cache_entry = None
+        if error is not None or loader.cancelled.is_set() or (entry and entry.stat != loader.stat):
+            entry = None
+        name = os.path.basename(text_ctrl.file_path)
+        if error is not None:
+            self.status_bar.SetStatusText(f"Failed to load {name}", 0)
+            wx.MessageBox(f"Could not open {text_ctrl.file_path}:\n{error}", "Open File",
+                          wx.OK | wx.ICON_ERROR)
+        elif loader.cancelled.is_set():
+            # Leave a partial buffer read-only so it can't be saved over the file.
+            self.set_page_text(text_ctrl, f"{name} (partial)")
+            self.status_bar.SetStatusText(f"Loading {name} cancelled", 0)
+        else:
+            self.finish_load(text_ctrl, loader.stat, loader.file_format, entry)
+            self.status_bar.SetStatusText(f"Loaded {name}", 0)
+        if text_ctrl.pending_view is not None:
+            self.set_view(text_ctrl, text_ctrl.pending_view)
+            text_ctrl.pending_view = None
+        self.colouring.schedule(text_ctrl)
+        if text_ctrl.pending_line is not None:
+            self.goto_line(text_ctrl, text_ctrl.pending_line)
+            text_ctrl.pending_line = None
+
+    def save_tab(self, text_ctrl, file_path):
+        if text_ctrl.saver is not None:
+            self.status_bar.SetStatusText("A save is already in progress", 0)
+            return text_ctrl.saver
+        # GetTextRaw hands back the control's UTF-8 buffer as one bytes
+        # object; that snapshot is the only full copy made for the save.
+        text_ctrl.saved_edit_count = text_ctrl.edit_count
+        saver = FileSaver(file_path, text_ctrl.GetTextRaw(),
+                          functools.partial(self.on_save_done, text_ctrl),
+                          text_ctrl.encoding, text_ctrl.bom)
+        text_ctrl.saver = saver
+        self.status_bar.SetStatusText(f"Saving {os.path.basename(file_path)}...", 0)
+        saver.start()
+        return saver
+
+    def on_save_done(self, text_ctrl, saver, error):
+        name = os.path.basename(saver.file_path)
+        if not text_ctrl:
+            return
+        text_ctrl.saver = None
+        if error is not None:
+            self.status_bar.SetStatusText(f"Failed to save {name}", 0)
+            wx.MessageBox(f"Could not save {saver.file_path}:\n{error}", "Save File",
+                          wx.OK | wx.ICON_ERROR)
+            return
+        text_ctrl.file_path = saver.file_path
+        self.set_page_text(text_ctrl, name)
+        self.status_bar.SetStatusText(f"Saved {name}", 0)
+        try:
+            text_ctrl.disk_stat = file_stat(saver.file_path)
+        except OSError:
+            text_ctrl.disk_stat = None
+        else:
+            self.watch_file(saver.file_path, text_ctrl.disk_stat)
+        if text_ctrl.edit_count == text_ctrl.saved_edit_count:
+            # Nothing left to recover: the file on disk is the text.
+            text_ctrl.file_stat = text_ctrl.disk_stat
+            if text_ctrl.journal is not None:
+                text_ctrl.journal.close(discard=True)
+                text_ctrl.journal = None
+        elif text_ctrl.journal is not None:
+            # Edited while saving; the journal may have been based on the
+            # file just overwritten, so move it onto a snapshot.
+            text_ctrl.journal.compact(text_ctrl.document)
+
+    def watch_file(self, file_path, stat):
+        if self.file_watcher is None:
+            self.file_watcher = FileWatcher(functools.partial(wx.CallAfter, self.on_file_changed))
+            self.file_watcher.start()
+        self.file_watcher.watch(file_path, stat)
+
+    def check_file(self, text_ctrl):
+        # For changes made while the tab wasn't following them.
+        try:
+            stat = file_stat(text_ctrl.file_path)
+        except OSError:
+            return
+        if text_ctrl.disk_stat is not None and stat != text_ctrl.disk_stat:
+            self.on_file_changed(FileChange(os.path.abspath(text_ctrl.file_path), text_ctrl.disk_stat,
+                                            stat, None))
+
+    def on_file_changed(self, change):
+        index = self.find_tab(change.path)
+        if index == wx.NOT_FOUND:
+            if self.file_watcher is not None:
+                self.file_watcher.unwatch(change.path)
+            return
+        text_ctrl = self.notebook.GetPage(index)
+        # A tab busy loading, saving or reloading checks the file itself
+        # when it's done.
+        if (not isinstance(text_ctrl, stc.StyledTextCtrl) or change.stat == text_ctrl.disk_stat
+                or text_ctrl.loader or text_ctrl.saver or text_ctrl.replacer or text_ctrl.reloader):
+            return
+        if text_ctrl.file_stat is None and not self.held_back(text_ctrl):
+            # Edited here as well; reloading would throw those edits away.
+            self.status_bar.SetStatusText(f"{os.path.basename(change.path)} has changed on disk", 0)
+            return
+        if change.appended is not None and change.old_stat == text_ctrl.disk_stat:
+            self.append_to_tab(text_ctrl, change)
+        else:
+            self.reload_tab(text_ctrl)
+
+    def held_back(self, text_ctrl):
+        # The start of a character split between two writes to the file the
+        # tab follows, while nothing else has changed the tab since.
+        held = text_ctrl.held_back
+        if held is None or text_ctrl.file_stat is not None or held[0] != text_ctrl.disk_stat:
+            return b''
+        return held[1]
+
+    def append_to_tab(self, text_ctrl, change):
+        # Following a growing file: the new bytes go on the end, outside
+        # undo, and a caret at the end stays at the end. A writer can flush
+        # part way through a character; its bytes so far wait for the rest
+        # rather than going in as U+FFFD, and meanwhile the tab doesn't
+        # count as matching the file, for the cache and recovery journal.
+        text, held = decode_complete(self.held_back(text_ctrl) + change.appended, text_ctrl.encoding)
+        follow = text_ctrl.GetCurrentPos() == text_ctrl.GetLength()
+        history = text_ctrl.document.history
+        history.recording = False
+        text_ctrl.reloading = True
+        try:
+            text_ctrl.document.insert(len(text_ctrl.document), text)
+        finally:
+            history.recording = True
+            text_ctrl.reloading = False
+        text_ctrl.disk_stat = change.stat
+        text_ctrl.file_stat = None if held else change.stat
+        text_ctrl.held_back = (change.stat, held) if held else None
+        if follow:
+            text_ctrl.DocumentEnd()
+
+    def reload_tab(self, text_ctrl):
+        reloader = FileReloader(text_ctrl.file_path, text_ctrl.document.get_bytes(),
+                                functools.partial(self.on_reload_done, text_ctrl, text_ctrl.edit_count))
+        text_ctrl.reloader = reloader
+        reloader.start()
+
+    def on_reload_done(self, text_ctrl, edit_count, reloader, error):
+        if not text_ctrl:
+            return
+        text_ctrl.reloader = None
+        name = os.path.basename(text_ctrl.file_path)
+        if error is not None:
+            self.status_bar.SetStatusText(f"Could not reload {name}: {error}", 0)
+            return
+        if (text_ctrl.edit_count != edit_count
+                or (text_ctrl.file_stat is None and not self.held_back(text_ctrl))):
+            self.status_bar.SetStatusText(f"{name} has changed on disk", 0)
+            return
+        # Only the changed lines are replaced, as one undo step, so the
+        # caret, the scroll position and the undo history all carry on.
+        first_line = text_ctrl.GetFirstVisibleLine()
+        shift = sum(hunk.line_delta for hunk in reloader.hunks if hunk.line < first_line)
+        text_ctrl.reloading = True
+        try:
+            with text_ctrl.document.transaction():
+                for hunk in reversed(reloader.hunks):
+                    text_ctrl.document.replace(hunk.pos, hunk.length, hunk.text.decode('utf-8'))
+        finally:
+            text_ctrl.reloading = False
+        text_ctrl.SetFirstVisibleLine(max(0, first_line + shift))
+        self.apply_file_format(text_ctrl, reloader.file_format)
+        text_ctrl.file_stat = text_ctrl.disk_stat = reloader.stat
+        self.status_bar.SetStatusText(f"Reloaded {name}", 0)
+        if self.notebook.GetCurrentPage() is text_ctrl:
+            self.refresh_status_bar()
+        self.check_file(text_ctrl)
+
+    def find_tab(self, file_path):
+        file_path = os.path.abspath(file_path)
+        for index in range(self.notebook.GetPageCount()):
+            page = self.notebook.GetPage(index)
+            if os.path.abspath(getattr(page, 'file_path', '')) == file_path:
+                return index
+        return wx.NOT_FOUND
+
+    def open_at(self, file_path, line):
+        # Select the file's tab, opening it first if needed, and jump to a
+        # 1-based line once its contents are there.
+        index = self.find_tab(file_path)
+        if index != wx.NOT_FOUND:
+            self.notebook.SetSelection(index)
+            page = self.materialize_tab(self.notebook.GetPage(index))
+        else:
+            page = self.add_tab(file_path)
+        if page is None:
+            return
+        if getattr(page, 'loader', None):
+            page.pending_line = line
+        else:
+            self.goto_line(page, line)
+
+    def goto_line(self, page, line):
+        if isinstance(page, HugeFileView):
+            page.goto_line(line)
+            self.refresh_huge_file_status(page)
+        else:
+            page.GotoLine(line - 1)
+            page.EnsureCaretVisible()
+        page.SetFocus()
+
+    def cancel_load(self, text_ctrl):
+        if text_ctrl is not None and getattr(text_ctrl, 'loader', None):
+            text_ctrl.loader.cancel()
+
+    def set_page_text(self, text_ctrl, text):
+        index = self.notebook.FindPage(text_ctrl)
+        if index != wx.NOT_FOUND:
+            self.notebook.SetPageText(index, text)
 
     def set_style(self, text_ctrl, lexer):
-        print(f"Debug: Setting style for lexer {lexer}")
         default_bg = wx.Colour(30, 30, 30)
         default_fg = wx.Colour(212, 212, 212)
-        text_ctrl.StyleSetForeground(stc.STC_STYLE_DEFAULT, default_fg)
-        text_ctrl.StyleSetBackground(stc.STC_STYLE_DEFAULT, default_bg)
+        text_ctrl.StyleSetSpec(stc.STC_STYLE_DEFAULT, f"face:Consolas,size:10,back:{default_bg.GetAsString(wx.C2S_HTML_SYNTAX)},fore:{default_fg.GetAsString(wx.C2S_HTML_SYNTAX)}")
         text_ctrl.StyleClearAll()
 
-        if lexer == stc.STC_LEX_PYTHON:
-            print("Debug: Applying Python styles")
-            text_ctrl.SetKeyWords(0, " ".join(keyword.kwlist))
-            self.set_style_color(text_ctrl, stc.STC_P_DEFAULT, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_COMMENTLINE, "#6A9955", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_NUMBER, "#B5CEA8", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_STRING, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_CHARACTER, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_WORD, "#569CD6", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_TRIPLE, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_TRIPLEDOUBLE, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_CLASSNAME, "#4EC9B0", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_DEFNAME, "#DCDCAA", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_OPERATOR, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_P_IDENTIFIER, "#D4D4D4", default_bg)
+        if lexer == stc.STC_LEX_CONTAINER:
+            from ui.highlighter import TOKEN_STYLES
+            for _, style, colour in TOKEN_STYLES:
+                self.set_style_color(text_ctrl, style, colour, default_bg)
         elif lexer == stc.STC_LEX_CPP:
-            print("Debug: Applying C++ styles")
-            self.set_style_color(text_ctrl, stc.STC_C_DEFAULT, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_COMMENT, "#6A9955", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_COMMENTLINE, "#6A9955", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_NUMBER, "#B5CEA8", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_STRING, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_CHARACTER, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_WORD, "#569CD6", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_C_OPERATOR, "#D4D4D4", default_bg)
-        elif lexer == stc.STC_LEX_HTML:
-            print("Debug: Applying HTML styles")
-            self.set_style_color(text_ctrl, stc.STC_H_DEFAULT, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_TAG, "#569CD6", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_TAGUNKNOWN, "#569CD6", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_ATTRIBUTE, "#9CDCFE", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_ATTRIBUTEUNKNOWN, "#9CDCFE", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_DOUBLESTRING, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_H_SINGLESTRING, "#CE9178", default_bg)
-        elif lexer == stc.STC_LEX_CSS:
-            print("Debug: Applying CSS styles")
-            self.set_style_color(text_ctrl, stc.STC_CSS_DEFAULT, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_TAG, "#D7BA7D", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_CLASS, "#D7BA7D", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_PSEUDOCLASS, "#D7BA7D", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_UNKNOWN_PSEUDOCLASS, "#D7BA7D", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_OPERATOR, "#D4D4D4", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_IDENTIFIER, "#9CDCFE", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_UNKNOWN_IDENTIFIER, "#9CDCFE", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_VALUE, "#CE9178", default_bg)
-            self.set_style_color(text_ctrl, stc.STC_CSS_COMMENT, "#6A9955", default_bg)
-        else:
-            print(f"Debug: No specific styles for lexer {lexer}")
+            text_ctrl.SetKeyWords(0, CPP_KEYWORDS)
+            for style, colour in [
+                    (stc.STC_C_DEFAULT, "#D4D4D4"),
+                    (stc.STC_C_COMMENT, "#6A9955"),
+                    (stc.STC_C_COMMENTLINE, "#6A9955"),
+                    (stc.STC_C_COMMENTDOC, "#6A9955"),
+                    (stc.STC_C_NUMBER, "#B5CEA8"),
+                    (stc.STC_C_STRING, "#CE9178"),
+                    (stc.STC_C_CHARACTER, "#CE9178"),
+                    (stc.STC_C_WORD, "#569CD6"),
+                    (stc.STC_C_PREPROCESSOR, "#C586C0"),
+                    (stc.STC_C_OPERATOR, "#D4D4D4")]:
+                self.set_style_color(text_ctrl, style, colour, default_bg)
 
-        text_ctrl.Colourise(0, -1)
-        print("Debug: Styles applied and text colourised")
+    @metrics.timed('on_style_needed')
+    def on_style_needed(self, event):
+        text_ctrl = event.GetEventObject()
+        text_ctrl.highlighter.style_needed(text_ctrl, event.GetPosition())
+        self.colouring.schedule(text_ctrl)
 
     def set_style_color(self, text_ctrl, style, fg, bg):
         text_ctrl.StyleSetForeground(style, wx.Colour(fg))
         text_ctrl.StyleSetBackground(style, bg) 
 
     def create_status_bar(self):
-        self.status_bar = self.CreateStatusBar(3)
-        self.status_bar.SetStatusWidths([-2, -1, -1])
+        self.status_bar = CachedStatusBar(self, 4)
+        self.status_bar.SetStatusWidths([-2, -1, -1, -1])
+        self.SetStatusBar(self.status_bar)
+        # Menu help would write to the bar behind the cache's back; none
+        # of the menu items have any.
+        self.SetStatusBarPane(-1)
 
+    @metrics.timed('on_update_ui')
     def on_update_ui(self, event):
-        current_page = self.notebook.GetSelection()
-        text_ctrl = self.notebook.GetPage(current_page)
-        
-        pos = text_ctrl.GetCurrentPos()
-        line = text_ctrl.LineFromPosition(pos)
-        col = text_ctrl.GetColumn(pos)
-        
-        status_text = f"Ln {line + 1}, Col {col + 1}"
-        self.status_bar.SetStatusText(status_text, 0)
-        
-        self.status_bar.SetStatusText("UTF-8", 1)
-        
-        lexer = text_ctrl.GetLexer()
-        lexer_name = self.get_lexer_name(lexer)
-        print(f"Current tab lexer: {lexer}, Lexer name: {lexer_name}")
-        self.status_bar.SetStatusText(lexer_name, 2)
+        # Scrolling alone changes nothing the status bar shows.
+        if event.GetUpdated() & (stc.STC_UPDATE_CONTENT | stc.STC_UPDATE_SELECTION):
+            self.refresh_status_bar()
 
     def refresh_status_bar(self):
-        current_page = self.notebook.GetSelection()
-        if current_page != -1:
-            text_ctrl = self.notebook.GetPage(current_page)
-            lexer = text_ctrl.GetLexer()
-            lexer_name = self.get_lexer_name(lexer)
-            self.status_bar.SetStatusText(lexer_name, 2)
-            print(f"Refreshed status bar: {lexer_name}")
-            text_ctrl.Colourise(0, -1)  
+        self.ui_updates.request('status', self.update_status)
+
+    @metrics.timed('update_status')
+    def update_status(self):
+        text_ctrl = self.notebook.GetCurrentPage()
+        if text_ctrl is None or isinstance(text_ctrl, TabPlaceholder):
+            return
+        if isinstance(text_ctrl, HugeFileView):
+            self.refresh_huge_file_status(text_ctrl)
+            return
+        if not text_ctrl.loader:
+            pos = text_ctrl.GetCurrentPos()
+            line = text_ctrl.LineFromPosition(pos)
+            col = text_ctrl.GetColumn(pos)
+            self.status_bar.SetStatusText(f"Ln {line + 1}, Col {col + 1}", 0)
+        self.status_bar.SetStatusText(self.get_encoding_name(text_ctrl.encoding, text_ctrl.bom), 1)
+        self.status_bar.SetStatusText(self.get_lexer_name(text_ctrl), 2)
+        self.status_bar.SetStatusText(text_ctrl.eol, 3)
 
     def on_tab_change(self, event):
+        event.Skip()
+        if self.replacing_page:
+            return
+        old_selection = event.GetOldSelection()
+        if old_selection != wx.NOT_FOUND and old_selection < self.notebook.GetPageCount():
+            self.notebook.GetPage(old_selection).last_shown = time.monotonic()
+        page = self.notebook.GetPage(event.GetSelection())
+        if isinstance(page, TabPlaceholder):
+            # Build the control once the notebook has finished switching.
+            wx.CallAfter(self.materialize_tab, page)
         self.refresh_status_bar()
+        self.refresh_outline()
+
+    def on_close(self, event):
+        try:
+            self.save_session()
+        except OSError as e:
+            logger.warning("Could not save the session: %s", e)
+        self.close_journals()
+        for reader in self.readers:
+            reader.cancel()
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
         event.Skip()
 
-    def get_lexer_name(self, lexer):
-        if lexer == stc.STC_LEX_PYTHON:
-            return "Python"
-        elif lexer == stc.STC_LEX_CPP:
-            return "C++"
-        elif lexer == stc.STC_LEX_HTML:
-            return "HTML"
-        elif lexer == stc.STC_LEX_CSS:
-            return "CSS"
-        else:
-            return "Plain Text"
+    def save_session(self):
+        # Records the open files and where each was left, and caches what
+        # was worked out about each file that's still unchanged on disk.
+        tabs = []
+        selected = None
+        current = self.notebook.GetCurrentPage()
+        for index in range(self.notebook.GetPageCount()):
+            page = self.notebook.GetPage(index)
+            file_path = getattr(page, 'file_path', '')
+            if not os.path.isfile(file_path):
+                continue
+            if page is current:
+                selected = len(tabs)
+            if isinstance(page, HugeFileView):
+                view = (0, 0, page.top_line, 0)
+            elif isinstance(page, TabPlaceholder):
+                view = page.view
+            else:
+                view = self.get_view(page)
+            tabs.append(TabState(os.path.abspath(file_path), *(view or (0, 0, 0, 0))))
+            self.cache_page(page)
+        save_session(tabs, selected)
+        self.file_cache.prune()
+
+    def cache_page(self, page):
+        if isinstance(page, HugeFileView):
+            if page.index.complete:
+                self.file_cache.put(page.file_path,
+                                    CacheEntry(page.file_stat, page.file_format, page.index.offsets, None, []))
+            return
+        if not isinstance(page, stc.StyledTextCtrl) or page.file_stat is None or page.loader:
+            return
+        offsets = page.document.original_newlines()
+        if offsets is None:
+            return
+        highlighter = page.highlighter
+        checkpoints = highlighter.saved_checkpoints() if highlighter and highlighter.incremental else []
+        self.file_cache.put(page.file_path, CacheEntry(
+            page.file_stat, FileFormat(page.encoding, page.bom, page.eol), offsets,
+            highlighter.name if highlighter else None, checkpoints))
+
+    def restore_session(self):
+        # Reopens the last session's files as placeholders, so only the
+        # selected one is read now.
+        tabs, selected = load_session()
+        selected_page = None
+        for index, state in enumerate(tabs):
+            if not os.path.isfile(state.file_path) or self.find_tab(state.file_path) != wx.NOT_FOUND:
+                continue
+            page = self.add_tab(state.file_path, select=False)
+            if isinstance(page, TabPlaceholder):
+                page.view = (state.anchor, state.caret, state.first_line, state.x_offset)
+            elif isinstance(page, HugeFileView):
+                page.scroll_to(state.first_line)
+            if index == selected:
+                selected_page = page
+        if selected_page:
+            self.notebook.SetSelection(self.notebook.FindPage(selected_page))
+            self.materialize_tab(selected_page)
+
+    def get_lexer_name(self, text_ctrl):
+        return getattr(text_ctrl, 'lexer_name', "Plain Text")
+
+    def current_text_ctrl(self):
+        page = self.notebook.GetCurrentPage()
+        return page if isinstance(page, stc.StyledTextCtrl) else None
+
+    def is_current_read_only(self):
+        text_ctrl = self.current_text_ctrl()
+        return text_ctrl is None or text_ctrl.GetReadOnly()
 
     def get_current_content(self):
         current_page = self.notebook.GetSelection()
         if current_page != -1:
-            return self.notebook.GetPage(current_page).GetText()
+            page = self.notebook.GetPage(current_page)
+            if isinstance(page, stc.StyledTextCtrl):
+                return page.GetText()
         return ""
 
     def update_current_tab_name(self, file_path):
@@ -311,142 +958,531 @@ class WXUI(wx.Frame):
         self.editor.new_file()
 
     def on_open(self, event):
-        file_path = get_file_path('open')
-        if file_path:
-            content = read_file(file_path)
-            wx.CallAfter(self.add_tab, file_path, content)
+        self.editor.open_file()
 
     def on_save(self, event):
         self.editor.save_file()
 
+    @metrics.timed('on_text_modified')
     def on_text_modified(self, event):
         if event.GetModificationType() & (wx.stc.STC_MOD_INSERTTEXT | wx.stc.STC_MOD_DELETETEXT):
             text_ctrl = event.GetEventObject()
-            pos = event.GetPosition()
-            length = event.GetLength()
-            
-            if event.GetModificationType() & wx.stc.STC_MOD_INSERTTEXT:
-                text = text_ctrl.GetTextRange(pos, pos + length)
-                action = ('insert', pos, text)
-            else:  # Delete text
-                text = text_ctrl.GetTextRange(pos, pos + length)
-                action = ('delete', pos, text)
-            
-            self.undo_stack.append(action)
-            if len(self.undo_stack) > self.UNDO_LIMIT:
-                self.undo_stack.pop(0)
-            self.redo_stack.clear()
-            
-            print(f"Debug: Modified at position {pos}, length {length}, action: {action}")
+            if getattr(text_ctrl, 'loader', None) or text_ctrl.syncing:
+                return
+            # Typed into the control: record it in the document. For
+            # deletions the text is already gone from the control, so it's
+            # taken from the event.
+            text_ctrl.syncing = True
+            try:
+                if event.GetModificationType() & wx.stc.STC_MOD_INSERTTEXT:
+                    text_ctrl.document.replaced(event.GetPosition(), '', event.GetText())
+                else:
+                    text_ctrl.document.replaced(event.GetPosition(), event.GetText(), '')
+            finally:
+                text_ctrl.syncing = False
+
+    def on_document_edit(self, text_ctrl, edit):
+        text_ctrl.edit_count += 1
+        # A change from disk leaves the tab in step with the file, so
+        # there's nothing to recover.
+        if not text_ctrl.reloading:
+            self.journal_edit(text_ctrl, edit)
+        text_ctrl.file_stat = None
+        if not text_ctrl.reloading:
+            text_ctrl.held_back = None
+        removed = utf8_length(edit.removed)
+        inserted = utf8_length(edit.inserted)
+        if not text_ctrl.syncing:
+            text_ctrl.syncing = True
+            try:
+                text_ctrl.SetTargetStart(edit.pos)
+                text_ctrl.SetTargetEnd(edit.pos + removed)
+                text_ctrl.ReplaceTarget(edit.inserted)
+            finally:
+                text_ctrl.syncing = False
+        if text_ctrl.highlighter is not None:
+            text_ctrl.highlighter.invalidate(text_ctrl.LineFromPosition(edit.pos))
+            self.colouring.schedule(text_ctrl)
+        if text_ctrl.matches is not None:
+            self.update_matches(text_ctrl, edit.pos, removed, inserted)
+        if text_ctrl.symbols is not None:
+            self.update_symbols(text_ctrl, edit)
+        if text_ctrl.words_indexed:
+            self.update_words(text_ctrl, edit.pos, edit.removed, edit.inserted, inserted)
+        metrics.count('text_modified.bytes', removed + inserted)
+
+    def index_words(self, text_ctrl):
+        # Counts the tab's words on a worker thread and adds them to the
+        # word index.
+        if (text_ctrl.words_indexed or text_ctrl.word_counter
+                or text_ctrl.GetLength() > self.WORD_INDEX_LIMIT):
+            return
+        text_ctrl.word_counter = WordCounter(
+            text_ctrl.GetTextRaw(), functools.partial(self.on_words_counted, text_ctrl, text_ctrl.edit_count))
+        text_ctrl.word_counter.start()
+
+    def on_words_counted(self, text_ctrl, edit_count, counter):
+        if not text_ctrl:
+            return
+        text_ctrl.word_counter = None
+        if text_ctrl.edit_count != edit_count:
+            # Edited meanwhile; the edits weren't tracked.
+            self.index_words(text_ctrl)
+            return
+        self.word_index.update(counter.counts)
+        text_ctrl.words_indexed = True
+
+    def update_words(self, text_ctrl, pos, removed, inserted, inserted_length):
+        # A word touching the edit can only reach so far either side of it;
+        # the text there is counted before and after the edit, and the
+        # difference applied to the index. A word cut off at the edge of
+        # that context is the same both times, so it cancels out.
+        document = text_ctrl.document
+        end = pos + inserted_length
+        prefix = document.get_text(max(0, pos - self.WORD_CONTEXT), pos)
+        suffix = document.get_text(end, min(len(document), end + self.WORD_CONTEXT))
+        self.word_index.replace_text(prefix + removed + suffix, prefix + inserted + suffix)
+
+    def on_char_added(self, event):
+        # Offers the words starting with the one being typed, from all tabs.
+        event.Skip()
+        text_ctrl = event.GetEventObject()
+        pos = text_ctrl.GetCurrentPos()
+        start = text_ctrl.WordStartPosition(pos, True)
+        if pos - start < 2:
+            if text_ctrl.AutoCompActive():
+                text_ctrl.AutoCompCancel()
+            return
+        prefix = text_ctrl.GetTextRange(start, pos)
+        words = self.word_index.complete(prefix, self.MAX_COMPLETIONS)
+        if words:
+            text_ctrl.AutoCompShow(pos - start, " ".join(words))
+        elif text_ctrl.AutoCompActive():
+            text_ctrl.AutoCompCancel()
+
+    def journal_edit(self, text_ctrl, edit):
+        if text_ctrl.journal is not None:
+            text_ctrl.journal.record(edit, text_ctrl.document)
+            return
+        if self.journal_writer is None:
+            self.journal_writer = JournalWriter()
+            self.journal_writer.start()
+        if text_ctrl.file_stat is not None:
+            # Until now the text was the file on disk, which can serve as
+            # the journal's starting point.
+            text_ctrl.journal = RecoveryJournal(self.journal_writer, text_ctrl.file_path,
+                                                file_stat=text_ctrl.file_stat,
+                                                encoding=text_ctrl.encoding, bom=text_ctrl.bom)
+            text_ctrl.journal.record(edit, text_ctrl.document)
+        else:
+            text_ctrl.journal = RecoveryJournal(self.journal_writer, text_ctrl.file_path,
+                                                snapshot=text_ctrl.document.get_bytes())
+
+    def offer_recovery(self):
+        # Journals left by an editor that exited without saving its edits.
+        journals = find_recoverable()
+        if not journals:
+            return
+        names = "\n".join(journal.file_path for journal in journals)
+        answer = wx.MessageBox(f"Unsaved changes from an earlier session were found for:\n\n{names}\n\n"
+                               "Recover them? They open in new tabs.",
+                               "Recover Unsaved Changes", wx.YES_NO | wx.ICON_QUESTION)
+        failed = []
+        for journal in journals:
+            if answer == wx.YES:
+                try:
+                    text = replay(journal)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.warning("Could not recover %s: %s", journal.file_path, e)
+                    failed.append(f"{journal.file_path}: {e}")
+                else:
+                    text_ctrl = self.add_tab(journal.file_path, text)
+                    self.set_page_text(text_ctrl, f"{os.path.basename(journal.file_path)} (recovered)")
+            discard_journal(journal.journal_id)
+        if failed:
+            wx.MessageBox("Could not recover:\n\n" + "\n".join(failed), "Recover Unsaved Changes",
+                          wx.OK | wx.ICON_ERROR)
+
+    def close_journals(self):
+        # Journals of tabs still unsaved stay on disk, to be offered next time.
+        if self.journal_writer is None:
+            return
+        for index in range(self.notebook.GetPageCount()):
+            journal = getattr(self.notebook.GetPage(index), 'journal', None)
+            if journal is not None:
+                journal.close()
+        self.journal_writer.stop()
 
     def on_undo(self, event):
-        if self.undo_stack:
-            action = self.undo_stack.pop()
-            text_ctrl = self.notebook.GetCurrentPage()
-            
-            if action[0] == 'insert':
-                text_ctrl.SetTargetStart(action[1])
-                text_ctrl.SetTargetEnd(action[1] + len(action[2]))
-                text_ctrl.ReplaceTarget("")
-            else:  # 'delete'
-                text_ctrl.SetTargetStart(action[1])
-                text_ctrl.SetTargetEnd(action[1])
-                text_ctrl.ReplaceTarget(action[2])
-            
-            self.redo_stack.append(action)
-            print(f"Debug: Undoing action: {action}")
+        text_ctrl = self.current_text_ctrl()
+        if text_ctrl is None or text_ctrl.GetReadOnly():
+            return
+        edits = text_ctrl.document.undo()
+        if edits:
+            text_ctrl.GotoPos(edits[-1].pos + utf8_length(edits[-1].inserted))
+            logger.debug("Undid %d actions", len(edits))
 
     def on_redo(self, event):
-        if self.redo_stack:
-            action = self.redo_stack.pop()
-            text_ctrl = self.notebook.GetCurrentPage()
-            
-            if action[0] == 'insert':
-                text_ctrl.SetTargetStart(action[1])
-                text_ctrl.SetTargetEnd(action[1])
-                text_ctrl.ReplaceTarget(action[2])
-            else:  # 'delete'
-                text_ctrl.SetTargetStart(action[1])
-                text_ctrl.SetTargetEnd(action[1] + len(action[2]))
-                text_ctrl.ReplaceTarget("")
-            
-            self.undo_stack.append(action)
-            print(f"Debug: Redoing action: {action}")
+        text_ctrl = self.current_text_ctrl()
+        if text_ctrl is None or text_ctrl.GetReadOnly():
+            return
+        edits = text_ctrl.document.redo()
+        if edits:
+            text_ctrl.GotoPos(edits[-1].pos + utf8_length(edits[-1].inserted))
+            logger.debug("Redid %d actions", len(edits))
 
     def on_key_down(self, event):
         if event.GetKeyCode() == ord('Z') and event.ControlDown():
             self.on_undo(event)
         elif event.GetKeyCode() == ord('Y') and event.ControlDown():
             self.on_redo(event)
+        elif event.GetKeyCode() == wx.WXK_ESCAPE and getattr(event.GetEventObject(), 'loader', None):
+            self.cancel_load(event.GetEventObject())
+        elif event.GetKeyCode() == wx.WXK_ESCAPE and getattr(event.GetEventObject(), 'replacer', None):
+            event.GetEventObject().replacer.cancel()
         else:
             event.Skip()
 
     def on_find(self, event):
         text_ctrl = self.notebook.GetCurrentPage()
-        find_data = wx.FindReplaceData()
+        find_data = wx.FindReplaceData(wx.FR_DOWN)
         dlg = wx.FindReplaceDialog(self, find_data, "Find")
         dlg.Bind(wx.EVT_FIND, lambda evt: self.do_find(evt, text_ctrl))
         dlg.Show(True)
 
+    def on_goto_line(self, event):
+        page = self.notebook.GetCurrentPage()
+        if page is None:
+            return
+        line_count = page.line_count() if isinstance(page, HugeFileView) else page.GetLineCount()
+        line = wx.GetNumberFromUser("Line number:", "", "Go to Line", 1, 1, line_count, self)
+        if line >= 1:
+            self.goto_line(page, line)
+
     def on_replace(self, event):
+        if isinstance(self.notebook.GetCurrentPage(), HugeFileView):
+            wx.MessageBox("Large files are opened read-only", "Replace", wx.OK | wx.ICON_INFORMATION)
+            return
         text_ctrl = self.notebook.GetCurrentPage()
-        find_data = wx.FindReplaceData()
+        find_data = wx.FindReplaceData(wx.FR_DOWN)
         dlg = wx.FindReplaceDialog(self, find_data, "Replace", wx.FR_REPLACEDIALOG)
         dlg.Bind(wx.EVT_FIND, lambda evt: self.do_find(evt, text_ctrl))
         dlg.Bind(wx.EVT_FIND_REPLACE, lambda evt: self.do_replace(evt, text_ctrl))
         dlg.Bind(wx.EVT_FIND_REPLACE_ALL, lambda evt: self.do_replace_all(evt, text_ctrl))
         dlg.Show(True)
 
-    def do_find(self, event, text_ctrl):
-        find_string = event.GetFindString()
-        flags = event.GetFlags()
-        start = text_ctrl.GetSelectionEnd()
-        end = text_ctrl.GetLength()
-        
-        text = text_ctrl.GetTextRange(start, end)
-        if not (flags & wx.FR_MATCHCASE):
-            text = text.lower()
-            find_string = find_string.lower()
-        
-        if flags & wx.FR_WHOLEWORD:
-            pattern = r'\b' + re.escape(find_string) + r'\b'
-        else:
-            pattern = re.escape(find_string)
-        
-        match = re.search(pattern, text)
-        if match:
-            text_ctrl.SetSelection(start + match.start(), start + match.end())
+    def on_find_next(self, event):
+        self.repeat_find(forward=True)
+
+    def on_find_previous(self, event):
+        self.repeat_find(forward=False)
+
+    def on_toggle_regex(self, event):
+        self.find_regex = event.IsChecked()
+
+    def on_find_in_files(self, event):
+        from ui.find_in_files_panel import FindInFilesDialog
+        from utils.find_in_files import FileSearch
+        page = self.notebook.GetCurrentPage()
+        file_path = getattr(page, 'file_path', '')
+        initial_dir = os.path.dirname(os.path.abspath(file_path)) if os.path.isfile(file_path) else os.getcwd()
+        dlg = FindInFilesDialog(self, initial_dir)
+        if dlg.ShowModal() == wx.ID_OK and dlg.query.GetValue():
+            query = dlg.query.GetValue()
+            options = (dlg.match_case.GetValue(), dlg.whole_word.GetValue(), dlg.regex.GetValue())
+            try:
+                compile_pattern(query, *options)
+            except re.error as e:
+                wx.MessageBox(f"Invalid regular expression:\n{e}", "Find in Files", wx.OK | wx.ICON_ERROR)
+            else:
+                panel = self.get_find_in_files_panel()
+                search = FileSearch(dlg.folder.GetPath(), query,
+                                    functools.partial(wx.CallAfter, panel.add_results),
+                                    functools.partial(wx.CallAfter, panel.search_done),
+                                    *options)
+                self.show_find_in_files_panel(True)
+                panel.start(search)
+        dlg.Destroy()
+
+    def timings_enabled(self):
+        return metrics.enabled
+
+    def on_toggle_timings(self, event):
+        metrics.enabled = event.IsChecked()
+        if metrics.enabled:
+            metrics.reset()
+
+    def on_timing_report(self, event):
+        import wx.lib.dialogs
+        report = metrics.report()
+        logger.info("Timing report:\n%s", report)
+        dlg = wx.lib.dialogs.ScrolledMessageDialog(self, report, "Timing Report", size=(700, 400))
+        dlg.ShowModal()
+        dlg.Destroy()
+
+    def get_find_in_files_panel(self):
+        if self.find_in_files_panel is None:
+            from ui.find_in_files_panel import FindInFilesPanel
+            self.find_in_files_panel = FindInFilesPanel(self.main_panel, self)
+            self.main_panel.GetSizer().Add(self.find_in_files_panel, 0,
+                                           wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 5)
+            self.find_in_files_panel.Hide()
+        return self.find_in_files_panel
+
+    def show_find_in_files_panel(self, show):
+        panel = self.get_find_in_files_panel()
+        panel.Show(show)
+        panel.GetParent().Layout()
+
+    def symbol_index(self, text_ctrl):
+        # The tab's SymbolIndex, or None while it's still being built on a
+        # worker thread, which this starts if need be.
+        if text_ctrl.symbols is not None or text_ctrl.symbol_indexer or text_ctrl.loader:
+            return text_ctrl.symbols
+        language = language_for(text_ctrl.file_path)
+        if language is None:
+            return None
+        text_ctrl.symbol_indexer = SymbolIndexer(
+            text_ctrl.GetTextRaw(), language,
+            functools.partial(self.on_symbols_built, text_ctrl, text_ctrl.edit_count))
+        text_ctrl.symbol_indexer.start()
+        return None
+
+    def on_symbols_built(self, text_ctrl, edit_count, indexer):
+        if not text_ctrl:
+            return
+        text_ctrl.symbol_indexer = None
+        if text_ctrl.edit_count != edit_count:
+            # Edited while it was built; the edits weren't tracked.
+            self.symbol_index(text_ctrl)
+            return
+        text_ctrl.symbols = indexer.index
+        if self.notebook.GetCurrentPage() is text_ctrl:
+            self.refresh_outline()
+
+    def update_symbols(self, text_ctrl, edit):
+        # Only the lines the edit spans are scanned again.
+        document = text_ctrl.document
+        first_line = document.line_from_offset(edit.pos)
+        lines = [document.get_line(line)
+                 for line in range(first_line, first_line + edit.inserted.count('\n') + 1)]
+        text_ctrl.symbols.update(first_line, edit.removed.count('\n') + 1, lines)
+        if self.notebook.GetCurrentPage() is text_ctrl:
+            self.refresh_outline()
+
+    def get_outline_panel(self):
+        if self.outline_panel is None:
+            from ui.outline import OutlinePanel
+            self.outline_panel = OutlinePanel(self.main_panel, self)
+            self.content_sizer.Add(self.outline_panel, 0, wx.EXPAND | wx.LEFT, 5)
+            self.outline_panel.Hide()
+        return self.outline_panel
+
+    def show_outline_panel(self, show):
+        panel = self.get_outline_panel()
+        panel.Show(show)
+        panel.GetParent().Layout()
+        if show:
+            self.refresh_outline()
+
+    def on_toggle_outline(self, event):
+        self.show_outline_panel(not (self.outline_panel and self.outline_panel.IsShown()))
+
+    def refresh_outline(self):
+        if self.outline_panel is not None and self.outline_panel.IsShown():
+            self.ui_updates.request('outline', self.update_outline)
+
+    def update_outline(self):
+        page = self.notebook.GetCurrentPage()
+        index = self.symbol_index(page) if isinstance(page, stc.StyledTextCtrl) else None
+        self.outline_panel.show_page(page, index)
+
+    def on_goto_symbol(self, event):
+        from ui.outline import GoToSymbolDialog
+        page = self.notebook.GetCurrentPage()
+        if not isinstance(page, stc.StyledTextCtrl):
+            return
+        index = self.symbol_index(page)
+        if index is None:
+            self.status_bar.SetStatusText("Indexing symbols..." if page.symbol_indexer else
+                                          "No symbols for this file type", 0)
+            return
+        dlg = GoToSymbolDialog(self, index)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.goto_line(page, dlg.selected_symbol().line + 1)
+        dlg.Destroy()
+
+    def on_goto_definition(self, event):
+        # Looks up the word at the caret in this tab's symbols, then in the
+        # other open tabs that have been indexed.
+        page = self.notebook.GetCurrentPage()
+        if not isinstance(page, stc.StyledTextCtrl):
+            return
+        pos = page.GetCurrentPos()
+        name = page.GetTextRange(page.WordStartPosition(pos, True), page.WordEndPosition(pos, True))
+        if not name:
+            return
+        index = self.symbol_index(page)
+        if index is None and page.symbol_indexer:
+            self.status_bar.SetStatusText("Indexing symbols...", 0)
+            return
+        pages = [page] + [self.notebook.GetPage(i) for i in range(self.notebook.GetPageCount())
+                          if self.notebook.GetPage(i) is not page]
+        for other in pages:
+            symbols = getattr(other, 'symbols', None)
+            definitions = symbols.find(name) if symbols is not None else []
+            if definitions:
+                if other is not page:
+                    self.notebook.SetSelection(self.notebook.FindPage(other))
+                self.goto_line(other, definitions[0].line + 1)
+                return
+        self.status_bar.SetStatusText(f"No definition of {name} found", 0)
+
+    def repeat_find(self, forward):
+        page = self.notebook.GetCurrentPage()
+        if self.last_find is None:
+            self.on_find(None)
+        elif page is not None:
+            find_string, match_case, whole_word = self.last_find
+            self.find_text(page, find_string, match_case, whole_word, forward)
+
+    def on_huge_file_found(self, view, found):
+        self.refresh_huge_file_status(view)
+        if not found:
+            wx.MessageBox("Text not found", "Find Result", wx.OK | wx.ICON_INFORMATION)
+
+    def get_matches(self, text_ctrl, find_string, match_case, whole_word):
+        # Compiled patterns are cached per query and flags, and each tab
+        # keeps the match list for its last query up to date as it's edited.
+        try:
+            pattern = compile_pattern(find_string, match_case, whole_word, self.find_regex)
+        except re.error as e:
+            wx.MessageBox(f"Invalid regular expression:\n{e}", "Find", wx.OK | wx.ICON_ERROR)
+            return None
+        matches = text_ctrl.matches
+        if matches is None or matches.pattern is not pattern:
+            incremental = not self.find_regex and '\n' not in find_string and '\r' not in find_string
+            matches = text_ctrl.matches = MatchList(pattern, incremental)
+        if not matches.complete:
+            # A view onto the control's own buffer, so nothing is copied.
+            matches.scan(text_ctrl.GetCharacterPointer())
+        return matches
+
+    def update_matches(self, text_ctrl, pos, removed, inserted):
+        lo = text_ctrl.PositionFromLine(text_ctrl.LineFromPosition(pos))
+        hi = text_ctrl.GetLineEndPosition(text_ctrl.LineFromPosition(pos + inserted))
+        text_ctrl.matches.update(pos, removed, inserted, lo, hi, text_ctrl.GetRangePointer(lo, hi - lo))
+
+    @metrics.timed('find_text')
+    def find_text(self, page, find_string, match_case, whole_word, forward=True):
+        self.last_find = (find_string, match_case, whole_word)
+        if isinstance(page, HugeFileView):
+            try:
+                page.find(find_string, match_case, whole_word, forward, self.find_regex,
+                          functools.partial(self.on_huge_file_found, page))
+            except re.error as e:
+                wx.MessageBox(f"Invalid regular expression:\n{e}", "Find", wx.OK | wx.ICON_ERROR)
+                return False
+            self.refresh_huge_file_status(page)
+            return True
+
+        matches = self.get_matches(page, find_string, match_case, whole_word)
+        if matches is None:
+            return False
+        if forward:
+            index, wrapped = matches.next_from(page.GetSelectionEnd())
         else:
+            index, wrapped = matches.previous_from(page.GetSelectionStart())
+        if index is None:
             wx.MessageBox("Text not found", "Find Result", wx.OK | wx.ICON_INFORMATION)
+            return False
+        start, end = matches.span(index)
+        page.SetSelection(start, end)
+        page.EnsureCaretVisible()
+        status = f"Match {index + 1} of {len(matches)}"
+        if wrapped:
+            status += " (search wrapped)"
+        self.status_bar.SetStatusText(status, 0)
+        return True
+
+    @metrics.timed('do_find')
+    def do_find(self, event, text_ctrl):
+        flags = event.GetFlags()
+        self.find_text(text_ctrl, event.GetFindString(), bool(flags & wx.FR_MATCHCASE),
+                       bool(flags & wx.FR_WHOLEWORD), bool(flags & wx.FR_DOWN))
 
+    @metrics.timed('do_replace')
     def do_replace(self, event, text_ctrl):
+        if text_ctrl.GetReadOnly():
+            return
         find_string = event.GetFindString()
         replace_string = event.GetReplaceString()
         flags = event.GetFlags()
+        match_case = bool(flags & wx.FR_MATCHCASE)
+        whole_word = bool(flags & wx.FR_WHOLEWORD)
         
-        if text_ctrl.GetSelectedText().lower() == find_string.lower() or not (flags & wx.FR_MATCHCASE):
-            text_ctrl.ReplaceSelection(replace_string)
+        # Only replace the selection if it is exactly one of the matches.
+        matches = self.get_matches(text_ctrl, find_string, match_case, whole_word)
+        if matches is None:
+            return
+        start, end = text_ctrl.GetSelection()
+        index, _ = matches.next_from(start)
+        if index is not None and matches.span(index) == (start, end):
+            if self.find_regex:
+                # Matched in place, so lookarounds and anchors see the text
+                # around the selection, as in ReplaceAll.
+                match = matches.pattern.match(text_ctrl.GetCharacterPointer(), start)
+                if match is None or match.end() != end:
+                    replace_string = None
+                else:
+                    replace_string = match.expand(replace_string.encode('utf-8')).decode(
+                        'utf-8', errors='replace')
+            if replace_string is not None:
+                text_ctrl.ReplaceSelection(replace_string)
         
-        self.do_find(event, text_ctrl)
+        self.find_text(text_ctrl, find_string, match_case, whole_word, True)
 
     def do_replace_all(self, event, text_ctrl):
-        find_string = event.GetFindString()
-        replace_string = event.GetReplaceString()
+        if text_ctrl.GetReadOnly():
+            wx.MessageBox("This tab is read-only", "Replace All Result", wx.OK | wx.ICON_INFORMATION)
+            return
         flags = event.GetFlags()
-        
-        text = text_ctrl.GetText()
-        if flags & wx.FR_WHOLEWORD:
-            pattern = r'\b' + re.escape(find_string) + r'\b'
-        else:
-            pattern = re.escape(find_string)
-        
-        if flags & wx.FR_MATCHCASE:
-            new_text, count = re.subn(pattern, replace_string, text)
-        else:
-            new_text, count = re.subn(pattern, replace_string, text, flags=re.IGNORECASE)
-        
-        if count > 0:
-            text_ctrl.SetText(new_text)
-            wx.MessageBox(f"Replaced {count} occurrences", "Replace All Result", wx.OK | wx.ICON_INFORMATION)
-        else:
+        matches = self.get_matches(text_ctrl, event.GetFindString(), bool(flags & wx.FR_MATCHCASE),
+                                   bool(flags & wx.FR_WHOLEWORD))
+        if matches is None:
+            return
+        if not len(matches):
             wx.MessageBox("No occurrences found", "Replace All Result", wx.OK | wx.ICON_INFORMATION)
+            return
+
+        # The job takes over the match offsets; they are stale once it runs.
+        text_ctrl.matches = None
+        job = ReplaceAll(text_ctrl, matches, event.GetReplaceString(), self.find_regex)
+        text_ctrl.replacer = job
+        text_ctrl.document.begin_transaction()
+        text_ctrl.SetReadOnly(True)
+        wx.CallAfter(self.run_replace_all, job)
+
+    def run_replace_all(self, job):
+        # One batch per call, yielding to the event loop in between so the
+        # window keeps painting and Esc can cancel.
+        text_ctrl = job.text_ctrl
+        if not text_ctrl:
+            return
+        if not job.done():
+            job.step()
+            self.status_bar.SetStatusText(
+                f"Replacing... {job.total - job.remaining} of {job.total} (Esc to cancel)", 0)
+            wx.CallAfter(self.run_replace_all, job)
+            return
+
+        text_ctrl.document.end_transaction()
+        text_ctrl.SetReadOnly(False)
+        text_ctrl.replacer = None
+        text_ctrl.SetFirstVisibleLine(job.first_visible_line)
+        if job.cancelled:
+            message = f"Replace All cancelled after {job.replaced} occurrences"
+        else:
+            message = f"Replaced {job.replaced} occurrences"
+        self.status_bar.SetStatusText(message, 0)
+        wx.MessageBox(message, "Replace All Result", wx.OK | wx.ICON_INFORMATION)
@@ -0,0 +1,144 @@
+import collections
+import concurrent.futures
+import difflib
+import glob
+import os
+import re
+import sys
+from utils.document import Document
+from utils.file_operations import (SNIFF_SIZE, detect_encoding, encode_chunks, read_file_chunks, sniff_file,
+                                   write_file_atomic)
+from utils.find_in_files import is_ascii_compatible, search_file
+from utils.search import compile_pattern
+
+# Find and Replace All over files from the command line, without wx.
+# Matching goes through the same compile_pattern and Document.replace_all
+# as the editor, and files are read and written with the same sniffing,
+# decoding and atomic save, so a batch run and the GUI agree on what
+# matches and on what ends up on disk.
+
+FILES_PER_TASK = 8
+
+# One file's outcome. matches is [(line, column, text)] when finding; when
+# replacing, count is the number of replacements and diff the unified diff
+# of a dry run. error is a message, or None.
+FileResult = collections.namedtuple('FileResult', ['file_path', 'matches', 'count', 'diff', 'error'])
+
+def expand_globs(patterns):
+    # Files matching any pattern, in order and once each. ** crosses
+    # directories; a plain path is taken as is.
+    seen = set()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]:
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                yield path
+
+def is_binary(file_path):
+    # The same test Find in Files uses to skip a file.
+    with open(file_path, 'rb') as file:
+        prefix = file.read(SNIFF_SIZE)
+    encoding, _ = detect_encoding(prefix, truncated=len(prefix) == SNIFF_SIZE)
+    return b'\x00' in prefix and is_ascii_compatible(encoding)
+
+def replace_in_file(file_path, query, replacement, match_case=False, whole_word=False, regex=False,
+                    dry_run=False):
+    # Returns (replacements made, unified diff if dry_run).
+    file_format = sniff_file(file_path)
+    text = "".join(chunk for _, chunk in read_file_chunks(file_path, file_format.encoding,
+                                                          bom=file_format.bom))
+    document = Document(text)
+    count = document.replace_all(query, replacement, match_case, whole_word, regex)
+    if not count:
+        return 0, None
+    if dry_run:
+        new_text = document.get_text()
+        diff = "".join(difflib.unified_diff(text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                                            file_path, file_path))
+        return count, diff
+    write_file_atomic(file_path, encode_chunks(document.get_bytes(), file_format.encoding, bom=file_format.bom))
+    return count, None
+
+def process_files(file_paths, query, replacement, options, dry_run):
+    # Worker entry point, for a batch of files.
+    results = []
+    for file_path in file_paths:
+        try:
+            if is_binary(file_path):
+                continue
+            if replacement is None:
+                matches = search_file(file_path, query, *options)
+                if matches:
+                    results.append(FileResult(file_path, matches, len(matches), None, None))
+            else:
+                count, diff = replace_in_file(file_path, query, replacement, *options, dry_run)
+                if count:
+                    results.append(FileResult(file_path, None, count, diff, None))
+        except (OSError, UnicodeError, LookupError, ValueError) as e:
+            results.append(FileResult(file_path, None, 0, None, str(e)))
+    return results
+
+def run_batch(file_paths, query, replacement=None, match_case=False, whole_word=False, regex=False,
+              dry_run=False, workers=None):
+    # Yields FileResults as each batch of files finishes, spreading the
+    # batches over a process pool. replacement=None only finds.
+    options = (match_case, whole_word, regex)
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        batch = []
+        for file_path in file_paths:
+            batch.append(file_path)
+            if len(batch) == FILES_PER_TASK:
+                pending.add(pool.submit(process_files, batch, query, replacement, options, dry_run))
+                batch = []
+            if len(pending) >= workers * 2:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        if batch:
+            pending.add(pool.submit(process_files, batch, query, replacement, options, dry_run))
+        for future in concurrent.futures.as_completed(pending):
+            yield from future.result()
+
+def run_cli(args, out=sys.stdout, err=sys.stderr):
+    # main.py's --find mode. Exit status: 0 if anything matched, 1 if
+    # nothing did, 2 on errors.
+    try:
+        compile_pattern(args.find, args.match_case, args.whole_word, args.regex)
+    except re.error as e:
+        print(f"Invalid regular expression: {e}", file=err)
+        return 2
+    file_paths = list(expand_globs(args.files))
+    if not file_paths:
+        print("No files match", file=err)
+        return 1
+
+    files = total = errors = 0
+    for result in run_batch(file_paths, args.find, args.replace, args.match_case, args.whole_word,
+                            args.regex, args.dry_run, args.workers):
+        if result.error is not None:
+            errors += 1
+            print(f"{result.file_path}: {result.error}", file=err)
+            continue
+        files += 1
+        total += result.count
+        if result.matches is not None:
+            for line, column, text in result.matches:
+                print(f"{result.file_path}:{line}:{column}: {text}", file=out)
+        elif result.diff is not None:
+            out.write(result.diff)
+        else:
+            print(f"{result.file_path}: {result.count} replaced", file=out)
+        out.flush()
+
+    if args.replace is None:
+        summary = f"{total} matches in {files} files"
+    elif args.dry_run:
+        summary = f"{total} replacements in {files} files (dry run, nothing written)"
+    else:
+        summary = f"{total} replacements in {files} files"
+    print(summary, file=err)
+    if errors:
+        return 2
+    return 0 if total else 1
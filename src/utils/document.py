@@ -0,0 +1,394 @@
+import bisect
+import collections
+import contextlib
+import itertools
+import random
+from array import array
+from utils.search import MatchList, compile_pattern
+from utils.undo import UndoHistory
+
+# One change to a document: at pos, `removed` was replaced by `inserted`.
+Edit = collections.namedtuple('Edit', ['pos', 'removed', 'inserted'])
+
+def utf8_length(text):
+    # Document and StyledTextCtrl positions count UTF-8 bytes, not characters.
+    return len(text.encode('utf-8'))
+
+def newline_offsets(data, base=0):
+    # Offsets (plus base) of every b'\n' in data, found by splitting rather
+    # than a byte-at-a-time loop.
+    parts = data.split(b'\n')
+    lengths = itertools.chain((base + len(parts[0]),), (len(part) + 1 for part in parts[1:-1]))
+    return array('Q', itertools.accumulate(lengths)) if len(parts) > 1 else array('Q')
+
+class _Piece:
+    # A treap node: one span of a buffer, plus the byte and newline totals
+    # of the subtree it roots.
+    __slots__ = ('buffer', 'start', 'length', 'newlines', 'priority', 'left', 'right', 'size', 'lines')
+
+    def __init__(self, buffer, start, length, newlines, priority):
+        self.buffer = buffer
+        self.start = start
+        self.length = length
+        self.newlines = newlines
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.size = length
+        self.lines = newlines
+
+def _update(node):
+    node.size = node.length
+    node.lines = node.newlines
+    if node.left is not None:
+        node.size += node.left.size
+        node.lines += node.left.lines
+    if node.right is not None:
+        node.size += node.right.size
+        node.lines += node.right.lines
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+class PieceTable:
+    # UTF-8 text as pieces of two buffers: the original contents, never
+    # modified, and an append-only buffer for everything inserted since.
+    # The pieces sit in a treap ordered by document position, each subtree
+    # knowing its byte and newline totals, so an edit, an offset-to-line
+    # lookup or a line-to-offset lookup is O(log pieces) whatever the size
+    # of the document. Both buffers keep the offsets of their newlines, so
+    # counting the newlines in a piece is a bisect rather than a scan.
+    def __init__(self, data=b'', newlines=None):
+        # newlines, if known, are the offsets of every b'\n' in data.
+        self.buffers = [bytes(data), bytearray()]
+        self.newlines = [newline_offsets(self.buffers[0]) if newlines is None else newlines, array('Q')]
+        self._random = random.Random(0)
+        self.root = self._piece(0, 0, len(data)) if data else None
+
+    def __len__(self):
+        return self.root.size if self.root is not None else 0
+
+    def _count_newlines(self, buffer, start, end):
+        offsets = self.newlines[buffer]
+        return bisect.bisect_left(offsets, end) - bisect.bisect_left(offsets, start)
+
+    def _piece(self, buffer, start, length):
+        return _Piece(buffer, start, length, self._count_newlines(buffer, start, start + length),
+                      self._random.random())
+
+    def _split(self, node, pos):
+        # Returns (first pos bytes, the rest), splitting a piece if needed.
+        if node is None:
+            return None, None
+        left_size = node.left.size if node.left is not None else 0
+        if pos <= left_size:
+            left, node.left = self._split(node.left, pos)
+            _update(node)
+            return left, node
+        pos -= left_size
+        if pos >= node.length:
+            node.right, right = self._split(node.right, pos - node.length)
+            _update(node)
+            return node, right
+        tail = self._piece(node.buffer, node.start + pos, node.length - pos)
+        right = _merge(tail, node.right)
+        node.length = pos
+        node.newlines -= tail.newlines
+        node.right = None
+        _update(node)
+        return node, right
+
+    def insert(self, pos, data):
+        if not data:
+            return
+        add = self.buffers[1]
+        start = len(add)
+        add.extend(data)
+        self.newlines[1].extend(newline_offsets(data, start))
+        newlines = self._count_newlines(1, start, start + len(data))
+
+        left, right = self._split(self.root, pos)
+        spine = []
+        node = left
+        while node is not None:
+            spine.append(node)
+            node = node.right
+        if spine and spine[-1].buffer == 1 and spine[-1].start + spine[-1].length == start:
+            # Typing: the text follows on from the last insert in both the
+            # document and the add buffer, so that piece just grows.
+            spine[-1].length += len(data)
+            spine[-1].newlines += newlines
+            for node in spine:
+                node.size += len(data)
+                node.lines += newlines
+        else:
+            left = _merge(left, _Piece(1, start, len(data), newlines, self._random.random()))
+        self.root = _merge(left, right)
+
+    def delete(self, pos, length):
+        # Removes length bytes at pos and returns them.
+        left, rest = self._split(self.root, pos)
+        middle, right = self._split(rest, length)
+        self.root = _merge(left, right)
+        return b''.join(self.buffers[node.buffer][node.start:node.start + node.length]
+                        for node in self._pieces(middle))
+
+    def _pieces(self, node):
+        stack = []
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node
+                node = node.right
+
+    def get_bytes(self, start=0, end=None):
+        end = len(self) if end is None else min(end, len(self))
+        chunks = []
+        self._collect(self.root, 0, start, end, chunks)
+        return b''.join(chunks)
+
+    def _collect(self, node, base, start, end, chunks):
+        # Appends the bytes of [start, end) within node's subtree, which
+        # begins at document offset base, skipping subtrees outside it.
+        if node is None or start >= end or base >= end or base + node.size <= start:
+            return
+        left_size = node.left.size if node.left is not None else 0
+        self._collect(node.left, base, start, end, chunks)
+        piece_base = base + left_size
+        lo = max(start, piece_base) - piece_base
+        hi = min(end, piece_base + node.length) - piece_base
+        if lo < hi:
+            chunks.append(self.buffers[node.buffer][node.start + lo:node.start + hi])
+        self._collect(node.right, piece_base + node.length, start, end, chunks)
+
+    def original_newlines(self):
+        # The newline offsets of the original buffer, while that is still
+        # the whole text; None once anything has been edited.
+        root = self.root
+        if root is None:
+            return self.newlines[0] if not self.buffers[0] else None
+        if (root.buffer == 0 and root.start == 0 and root.length == len(self.buffers[0])
+                and root.left is None and root.right is None):
+            return self.newlines[0]
+        return None
+
+    def line_count(self):
+        return (self.root.lines if self.root is not None else 0) + 1
+
+    def line_from_offset(self, pos):
+        line = 0
+        node = self.root
+        while node is not None:
+            left_size = node.left.size if node.left is not None else 0
+            if pos < left_size:
+                node = node.left
+                continue
+            if node.left is not None:
+                line += node.left.lines
+            pos -= left_size
+            if pos <= node.length:
+                return line + self._count_newlines(node.buffer, node.start, node.start + pos)
+            line += node.newlines
+            pos -= node.length
+            node = node.right
+        return line
+
+    def line_start(self, line):
+        if line <= 0:
+            return 0
+        if line >= self.line_count():
+            raise IndexError(line)
+        # Find the line-th newline and return the offset just past it.
+        base = 0
+        node = self.root
+        while node is not None:
+            left_lines = node.left.lines if node.left is not None else 0
+            if line <= left_lines:
+                node = node.left
+                continue
+            line -= left_lines
+            base += node.left.size if node.left is not None else 0
+            if line <= node.newlines:
+                offsets = self.newlines[node.buffer]
+                index = bisect.bisect_left(offsets, node.start) + line - 1
+                return base + offsets[index] - node.start + 1
+            line -= node.newlines
+            base += node.length
+            node = node.right
+        raise IndexError(line)
+
+class Document:
+    # The text of one tab, independent of wx: a piece table with undo and
+    # search, reporting every change as an Edit to its listeners. Positions
+    # are UTF-8 byte offsets, the same as StyledTextCtrl's, so a view can
+    # apply an Edit to its control as it stands.
+    def __init__(self, text='', history=None):
+        self.table = PieceTable(text.encode('utf-8') if isinstance(text, str) else text)
+        self.history = history if history is not None else UndoHistory(measure=utf8_length)
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.table)
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def reset(self, data, newlines=None):
+        # Takes new contents wholesale, e.g. once a file has loaded. This is
+        # not an edit: nothing is recorded and listeners aren't told.
+        self.table = PieceTable(data.encode('utf-8') if isinstance(data, str) else data, newlines)
+
+    def attach(self, table):
+        # Like reset, but the contents are read from table, anything with
+        # PieceTable's interface, instead of being copied in. A view that
+        # already holds the text can serve, as long as it applies every
+        # edit itself when told of it.
+        self.table = table
+
+    def original_newlines(self):
+        return self.table.original_newlines()
+
+    def get_bytes(self, start=0, end=None):
+        return self.table.get_bytes(start, end)
+
+    def get_text(self, start=0, end=None):
+        return self.table.get_bytes(start, end).decode('utf-8', errors='replace')
+
+    def line_count(self):
+        return self.table.line_count()
+
+    def line_from_offset(self, pos):
+        return self.table.line_from_offset(pos)
+
+    def line_start(self, line):
+        return self.table.line_start(line)
+
+    def line_end(self, line):
+        # Offset of the line's '\n', or the end of the document.
+        if line + 1 < self.line_count():
+            return self.table.line_start(line + 1) - 1
+        return len(self)
+
+    def get_line(self, line):
+        return self.get_text(self.line_start(line), self.line_end(line)).rstrip('\r')
+
+    def insert(self, pos, text):
+        self.replace(pos, 0, text)
+
+    def delete(self, pos, length):
+        return self.replace(pos, length, '')
+
+    def replace(self, pos, length, text):
+        # Returns the text that was removed.
+        removed = self._replace(pos, length, text)
+        self._record(pos, removed, text)
+        return removed
+
+    def replaced(self, pos, removed, text):
+        # An edit made in the view before the document heard of it. removed
+        # is the text the view replaced at pos, which a table reading from
+        # the view could no longer give.
+        self.table.delete(pos, utf8_length(removed))
+        self.table.insert(pos, text.encode('utf-8'))
+        self._notify(pos, removed, text)
+        self._record(pos, removed, text)
+
+    def _record(self, pos, removed, text):
+        if removed and text:
+            with self.history.group():
+                self.history.record('delete', pos, removed)
+                self.history.record('insert', pos, text)
+        else:
+            # Plain inserts and deletes go in on their own so typing can
+            # merge into chunks.
+            self.history.record('delete', pos, removed)
+            self.history.record('insert', pos, text)
+
+    def _replace(self, pos, length, text):
+        removed = self.table.delete(pos, length).decode('utf-8', errors='replace') if length else ''
+        self.table.insert(pos, text.encode('utf-8'))
+        self._notify(pos, removed, text)
+        return removed
+
+    def _notify(self, pos, removed, text):
+        if removed or text:
+            edit = Edit(pos, removed, text)
+            for listener in self.listeners:
+                listener(edit)
+
+    def begin_transaction(self):
+        self.history.begin_group()
+
+    def end_transaction(self):
+        self.history.end_group()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # Every edit made inside is undone and redone as one step.
+        with self.history.group():
+            yield self
+
+    def undo(self):
+        return self._apply(self.history.undo(), reverse=True)
+
+    def redo(self):
+        return self._apply(self.history.redo(), reverse=False)
+
+    def _apply(self, actions, reverse):
+        # Returns the edits made, in order, so a view can place the caret.
+        edits = []
+        for kind, pos, text in actions or ():
+            if (kind == 'insert') == reverse:
+                self._replace(pos, utf8_length(text), '')
+                edits.append(Edit(pos, text, ''))
+            else:
+                self._replace(pos, 0, text)
+                edits.append(Edit(pos, '', text))
+        return edits
+
+    def search(self, query, match_case=False, whole_word=False, regex=False):
+        # Raises re.error for an invalid regular expression.
+        matches = MatchList(compile_pattern(query, match_case, whole_word, regex))
+        matches.scan(self.get_bytes())
+        return matches
+
+    def find(self, query, pos=0, forward=True, match_case=False, whole_word=False, regex=False):
+        # Returns the (start, end) of the nearest match from pos, wrapping
+        # around the document, or None.
+        matches = self.search(query, match_case, whole_word, regex)
+        index, _ = matches.next_from(pos) if forward else matches.previous_from(pos)
+        return None if index is None else matches.span(index)
+
+    def replace_all(self, query, replacement, match_case=False, whole_word=False, regex=False):
+        # Replaces every match as one undo step and returns how many there
+        # were. Works from the end backwards so the offsets still to do stay
+        # valid, and expands regex templates before anything changes.
+        matches = self.search(query, match_case, whole_word, regex)
+        if regex:
+            buffer = self.get_bytes()
+            template = replacement.encode('utf-8')
+            replacements = [matches.pattern.match(buffer, start).expand(template).decode('utf-8', errors='replace')
+                            for start in matches.starts]
+        else:
+            replacements = [replacement] * len(matches)
+        with self.transaction():
+            for i in range(len(matches) - 1, -1, -1):
+                start, end = matches.span(i)
+                self.replace(start, end - start, replacements[i])
+        return len(matches)
@@ -1,22 +1,189 @@
-import wx
+import codecs
+import collections
+import os
+import stat
+import tempfile
 
-def get_file_path(action, initial_dir=None):
+READ_CHUNK_SIZE = 1024 * 1024
+WRITE_CHUNK_SIZE = 1024 * 1024
+SNIFF_SIZE = 64 * 1024
+
+FileFormat = collections.namedtuple('FileFormat', ['encoding', 'bom', 'eol'])
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one.
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+EOL_CHARS = {'CRLF': '\r\n', 'LF': '\n', 'CR': '\r'}
+
+# Bytes that are unassigned in cp1252; seeing one means the file is Latin-1.
+CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+def get_file_path(action, initial_dir=None, multiple=False):
+    # With multiple, opens take a list of paths, empty if cancelled.
+    # Imported here so the rest of this module works without a display,
+    # e.g. in Find in Files worker processes.
+    import wx
     style = wx.FD_OPEN if action == 'open' else wx.FD_SAVE
+    if multiple:
+        style |= wx.FD_MULTIPLE
     dialog = wx.FileDialog(None, "Open File" if action == 'open' else "Save File",
                            defaultDir=initial_dir or wx.GetHomeDir(),
                            style=style)
-    
+
     if dialog.ShowModal() == wx.ID_OK:
-        file_path = dialog.GetPath()
+        file_path = dialog.GetPaths() if multiple else dialog.GetPath()
         dialog.Destroy()
         return file_path
     dialog.Destroy()
-    return None
+    return [] if multiple else None
+
+def user_cache_dir():
+    # Per-user directory for caches that can be thrown away at any time.
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'matx')
+
+def default_eol():
+    return 'CRLF' if os.name == 'nt' else 'LF'
+
+def detect_encoding(prefix, truncated=False):
+    # Returns (encoding, has_bom) from the first few KB of a file.
+    # truncated means the prefix stops short of the end of the file.
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding, True
+
+    if b'\x00' in prefix:
+        sample = prefix[:len(prefix) - len(prefix) % 4]
+        quads = len(sample) // 4 or 1
+        if sample[1::4].count(0) == sample[2::4].count(0) == sample[3::4].count(0) == quads:
+            return 'utf-32-le', False
+        if sample[0::4].count(0) == sample[1::4].count(0) == sample[2::4].count(0) == quads:
+            return 'utf-32-be', False
+        pairs = len(prefix) // 2 or 1
+        even_zeros = prefix[0::2].count(0) / pairs
+        odd_zeros = prefix[1::2].count(0) / pairs
+        if odd_zeros > 0.3 and even_zeros < 0.05:
+            return 'utf-16-le', False
+        if even_zeros > 0.3 and odd_zeros < 0.05:
+            return 'utf-16-be', False
+
+    try:
+        # A truncated prefix may end in the middle of a character.
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=not truncated)
+        return 'utf-8', False
+    except UnicodeDecodeError:
+        pass
+    if any(byte in CP1252_UNDEFINED for byte in prefix):
+        return 'latin-1', False
+    return 'cp1252', False
+
+def detect_eol(text):
+    crlf = text.count('\r\n')
+    cr = text.count('\r') - crlf
+    lf = text.count('\n') - crlf
+    if not (crlf or cr or lf):
+        return default_eol()
+    if crlf >= lf and crlf >= cr:
+        return 'CRLF'
+    return 'LF' if lf >= cr else 'CR'
+
+def sniff_file(file_path, size=SNIFF_SIZE):
+    with open(file_path, 'rb') as file:
+        prefix = file.read(size)
+    encoding, bom = detect_encoding(prefix, truncated=len(prefix) == size)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(prefix)
+    return FileFormat(encoding, bom, detect_eol(text))
 
 def read_file(file_path):
-    with open(file_path, 'r') as file:
-        return file.read()
+    file_format = sniff_file(file_path)
+    with open(file_path, 'rb') as file:
+        text = file.read().decode(file_format.encoding, errors='replace')
+    return text[1:] if file_format.bom else text
+
+def read_file_chunks(file_path, encoding='utf-8', chunk_size=READ_CHUNK_SIZE, bom=False):
+    # Yields (bytes consumed, decoded text) pairs. The incremental decoder
+    # carries multi-byte sequences that straddle a chunk boundary over to the
+    # next chunk, so only one chunk is ever held in memory at a time.
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    with open(file_path, 'rb') as file:
+        while True:
+            data = file.read(chunk_size)
+            if not data:
+                break
+            text = decoder.decode(data)
+            if bom and text:
+                text = text[1:] if text[0] == '\ufeff' else text
+                bom = False
+            yield len(data), text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield 0, tail
+
+def decode_complete(data, encoding):
+    # For text still being written: decodes data up to its last whole
+    # character and returns (text, the bytes of a character cut off at the
+    # end), to go in front of whatever is written next.
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    text = decoder.decode(data)
+    return text, decoder.getstate()[0]
+
+def write_file(file_path, content, encoding='utf-8', bom=False):
+    write_file_atomic(file_path, [('\ufeff' + content if bom else content).encode(encoding)])
+
+def encode_chunks(data, encoding='utf-8', chunk_size=WRITE_CHUNK_SIZE, bom=False):
+    # Re-encodes a UTF-8 buffer (what StyledTextCtrl.GetTextRaw hands back)
+    # one chunk at a time, so saving never builds a second full-size copy.
+    view = memoryview(data)
+    if bom:
+        yield '\ufeff'.encode(encoding)
+    if codecs.lookup(encoding).name == 'utf-8':
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    encoder = codecs.getincrementalencoder(encoding)()
+    for start in range(0, len(view), chunk_size):
+        yield encoder.encode(decoder.decode(view[start:start + chunk_size]))
+    yield encoder.encode(decoder.decode(b'', final=True), final=True)
+
+def write_file_atomic(file_path, chunks):
+    # Write to a temp file next to the target, fsync it and rename it over
+    # the target, so a crash leaves either the old file or the new one.
+    file_path = os.path.abspath(file_path)
+    directory = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.",
+                                     suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(file_path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
 
-def write_file(file_path, content):
-    with open(file_path, 'w') as file:
-        file.write(content)
+def _fsync_directory(directory):
+    # Makes the rename itself durable. Windows can't open directories.
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,227 @@
+import collections
+import ctypes
+import ctypes.util
+import difflib
+import itertools
+import logging
+import os
+import queue
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# path changed on disk from old_stat to stat, both (mtime_ns, size).
+# appended holds the bytes added to the end when that is all that changed,
+# otherwise it is None.
+FileChange = collections.namedtuple('FileChange', ['path', 'old_stat', 'stat', 'appended'])
+
+# Replace length bytes at pos with text (UTF-8), which starts at line and
+# adds line_delta lines.
+Hunk = collections.namedtuple('Hunk', ['pos', 'length', 'text', 'line', 'line_delta'])
+
+def split_lines(data):
+    # Lines of UTF-8 bytes split the way StyledTextCtrl counts them, each
+    # keeping its b'\n'.
+    lines = data.split(b'\n')
+    last = lines.pop()
+    lines = [line + b'\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+def line_hunks(old, new):
+    # The changed lines between two versions of a text, in order. Applied
+    # from the last to the first, they turn old into new.
+    old_lines = split_lines(old)
+    new_lines = split_lines(new)
+    # Most reloads touch a few lines; matching the common ends first keeps
+    # SequenceMatcher to the part that actually differs.
+    limit = min(len(old_lines), len(new_lines))
+    start = 0
+    while start < limit and old_lines[start] == new_lines[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old_lines[-1 - end] == new_lines[-1 - end]:
+        end += 1
+    a = old_lines[start:len(old_lines) - end]
+    b = new_lines[start:len(new_lines) - end]
+    offsets = list(itertools.accumulate(map(len, a), initial=sum(map(len, old_lines[:start]))))
+
+    hunks = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b).get_opcodes():
+        if tag != 'equal':
+            hunks.append(Hunk(offsets[i1], offsets[i2] - offsets[i1], b''.join(b[j1:j2]),
+                              start + i1, (j2 - j1) - (i2 - i1)))
+    return hunks
+
+class _Inotify:
+    # The few inotify calls needed, through libc; Linux only.
+    MASK = 0x2 | 0x4 | 0x8 | 0x80 | 0x100   # MODIFY, ATTRIB, CLOSE_WRITE, MOVED_TO, CREATE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._rm_watch = libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+
+    def add_watch(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.directories[wd] = directory
+        return wd
+
+    def rm_watch(self, wd):
+        self.directories.pop(wd, None)
+        self._rm_watch(self.fd, wd)
+
+    def wait(self, timeout):
+        # Paths with events, waiting up to timeout seconds for the first.
+        paths = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return paths
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return paths
+        pos = 0
+        while pos + self.EVENT.size <= len(data):
+            wd, _, _, length = self.EVENT.unpack_from(data, pos)
+            name = data[pos + self.EVENT.size:pos + self.EVENT.size + length].rstrip(b'\0')
+            pos += self.EVENT.size + length
+            if wd in self.directories and name:
+                paths.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class FileWatcher(threading.Thread):
+    # Reports changes to watched files through on_change(FileChange), on
+    # this thread. With inotify, only the files named in events are
+    # stat-ed, plus a full pass now and then in case one was missed, e.g.
+    # on a network filesystem; without it every file is stat-ed each
+    # POLL_INTERVAL. A file that grew with its old end intact is reported
+    # with the bytes appended, so a log can be followed without rereading.
+    POLL_INTERVAL = 1.0
+    FULL_POLL_INTERVAL = 10.0
+    SETTLE_TIME = 0.1
+    TAIL_SAMPLE_SIZE = 4096
+    MAX_APPENDED = 16 * 1024 * 1024
+
+    def __init__(self, on_change, use_inotify=True):
+        super().__init__(daemon=True)
+        self.on_change = on_change
+        self.requests = queue.Queue()
+        self.stopped = threading.Event()
+        # path -> (stat, the last TAIL_SAMPLE_SIZE bytes); this thread only.
+        self.watched = {}
+        self.watches = {}
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info("inotify unavailable, polling for file changes: %s", e)
+
+    def watch(self, path, stat):
+        # stat is what the caller's copy of the file corresponds to; a
+        # difference already by the time it's checked is reported.
+        self.requests.put((os.path.abspath(path), stat))
+
+    def unwatch(self, path):
+        self.requests.put((os.path.abspath(path), None))
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        last_full_poll = time.monotonic()
+        try:
+            while not self.stopped.is_set():
+                self._handle_requests()
+                if self.inotify is None:
+                    self._check(list(self.watched))
+                    self.stopped.wait(self.POLL_INTERVAL)
+                    continue
+                paths = self.inotify.wait(self.POLL_INTERVAL)
+                if paths:
+                    # A file is often written in several goes; let it settle.
+                    self.stopped.wait(self.SETTLE_TIME)
+                    paths |= self.inotify.wait(0)
+                    self._check([path for path in paths if path in self.watched])
+                if time.monotonic() - last_full_poll >= self.FULL_POLL_INTERVAL:
+                    last_full_poll = time.monotonic()
+                    self._check(list(self.watched))
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+
+    def _handle_requests(self):
+        while True:
+            try:
+                path, stat = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            directory = os.path.dirname(path)
+            if stat is None:
+                self.watched.pop(path, None)
+                if self.inotify is not None and directory in self.watches and not any(
+                        os.path.dirname(other) == directory for other in self.watched):
+                    self.inotify.rm_watch(self.watches.pop(directory))
+                continue
+            self.watched[path] = (tuple(stat), self._sample(path, stat[1]))
+            if self.inotify is not None and directory not in self.watches:
+                try:
+                    self.watches[directory] = self.inotify.add_watch(directory)
+                except OSError as e:
+                    logger.warning("Not watching %s: %s", directory, e)
+            self._check([path])
+
+    def _sample(self, path, size):
+        try:
+            with open(path, 'rb') as file:
+                file.seek(max(0, size - self.TAIL_SAMPLE_SIZE))
+                return file.read(min(size, self.TAIL_SAMPLE_SIZE))
+        except OSError:
+            return None
+
+    def _check(self, paths):
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue    # gone for now; it may be written again
+            stat = (st.st_mtime_ns, st.st_size)
+            old_stat, sample = self.watched[path]
+            if stat == old_stat:
+                continue
+            appended = None
+            try:
+                appended = self._appended(path, old_stat[1], stat[1], sample)
+            except OSError:
+                pass
+            if appended is not None:
+                sample = (sample + appended)[-self.TAIL_SAMPLE_SIZE:]
+            else:
+                sample = self._sample(path, stat[1])
+            self.watched[path] = (stat, sample)
+            self.on_change(FileChange(path, old_stat, stat, appended))
+
+    def _appended(self, path, old_size, size, sample):
+        # The new bytes if the file only grew, going by its old last few KB.
+        if sample is None or size <= old_size or size - old_size > self.MAX_APPENDED:
+            return None
+        with open(path, 'rb') as file:
+            file.seek(old_size - len(sample))
+            if file.read(len(sample)) != sample:
+                return None
+            appended = file.read(size - old_size)
+        return appended if len(appended) == size - old_size else None
@@ -0,0 +1,185 @@
+import concurrent.futures
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import threading
+from utils.file_operations import SNIFF_SIZE, detect_encoding
+from utils.instrumentation import metrics
+from utils.search import compile_pattern
+
+DEFAULT_IGNORES = [
+    '.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', '.tox', '.mypy_cache',
+    '*.pyc', '*.pyo', '*.so', '*.dll', '*.exe', '*.o', '*.a', '*.class', '*.jar', '*.zip', '*.gz',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.ico', '*.pdf',
+]
+MMAP_THRESHOLD = 1024 * 1024
+FILES_PER_TASK = 64
+MAX_RESULTS_PER_FILE = 1000
+MAX_LINE_LENGTH = 300
+
+def load_ignore_patterns(root):
+    # Default ignores plus the simple name patterns from a top-level
+    # .gitignore. Negations and anchored paths are not supported.
+    patterns = list(DEFAULT_IGNORES)
+    try:
+        with open(os.path.join(root, '.gitignore'), encoding='utf-8', errors='replace') as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith(('#', '!')):
+                    patterns.append(line.strip('/'))
+    except OSError:
+        pass
+    return patterns
+
+def is_ignored(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+def walk_files(root, patterns):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if not is_ignored(name, patterns))
+        for name in sorted(filenames):
+            if not is_ignored(name, patterns):
+                yield os.path.join(dirpath, name)
+
+def is_ascii_compatible(encoding):
+    return not encoding.startswith(('utf-16', 'utf-32'))
+
+def search_file(file_path, query, match_case=False, whole_word=False, regex=False):
+    # Returns [(line number, column, line text)] for one file, both
+    # 1-based, or [] for binary, empty and unreadable files.
+    with open(file_path, 'rb') as file:
+        prefix = file.read(SNIFF_SIZE)
+        if not prefix:
+            return []
+        encoding, _ = detect_encoding(prefix, truncated=len(prefix) == SNIFF_SIZE)
+        if is_ascii_compatible(encoding):
+            if b'\x00' in prefix:
+                return []
+            pattern = compile_pattern(query, match_case, whole_word, regex, encoding)
+            if os.fstat(file.fileno()).st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return _search_bytes(data, pattern, encoding)
+            return _search_bytes(prefix + file.read(), pattern, encoding)
+        text = (prefix + file.read()).decode(encoding, errors='replace')
+        return _search_text(text, compile_pattern(query, match_case, whole_word, regex, None))
+
+def _search_bytes(data, pattern, encoding):
+    results = []
+    line_number = 1
+    counted_to = 0
+    for match in pattern.finditer(data):
+        start = match.start()
+        line_number += data[counted_to:start].count(b'\n')
+        counted_to = start
+        line_start = data.rfind(b'\n', 0, start) + 1
+        line_end = data.find(b'\n', start)
+        if line_end == -1:
+            line_end = len(data)
+        line_end = min(line_end, line_start + MAX_LINE_LENGTH * 4)
+        column = len(data[line_start:start].decode(encoding, errors='replace')) + 1
+        line = data[line_start:line_end].decode(encoding, errors='replace').rstrip('\r')
+        results.append((line_number, column, line[:MAX_LINE_LENGTH]))
+        if len(results) >= MAX_RESULTS_PER_FILE:
+            break
+    return results
+
+def _search_text(text, pattern):
+    results = []
+    line_number = 1
+    counted_to = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        line_number += text.count('\n', counted_to, start)
+        counted_to = start
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        line = text[line_start:min(line_end, line_start + MAX_LINE_LENGTH)].rstrip('\r')
+        results.append((line_number, start - line_start + 1, line))
+        if len(results) >= MAX_RESULTS_PER_FILE:
+            break
+    return results
+
+def search_files(file_paths, query, match_case=False, whole_word=False, regex=False):
+    # Worker entry point: one task searches a batch of files, which keeps
+    # the per-task pickling overhead low on trees with many small files.
+    found = []
+    for file_path in file_paths:
+        try:
+            results = search_file(file_path, query, match_case, whole_word, regex)
+        except (OSError, ValueError):
+            continue
+        if results:
+            found.append((file_path, results))
+    return found
+
+class FileSearch(threading.Thread):
+    # Walks root and fans batches of files out to a process pool, handing
+    # each file's results to on_results as soon as its batch finishes.
+    # Both callbacks run on this thread.
+    def __init__(self, root, query, on_results, on_done, match_case=False, whole_word=False,
+                 regex=False, workers=None):
+        super().__init__(daemon=True)
+        self.root = root
+        self.query = query
+        self.options = (match_case, whole_word, regex)
+        self.on_results = on_results
+        self.on_done = on_done
+        self.workers = workers or os.cpu_count() or 1
+        self.cancelled = threading.Event()
+        self.files_searched = 0
+        self.matches = 0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @metrics.timed('find_in_files')
+    def run(self):
+        error = None
+        try:
+            # Spawn rather than fork: forking a process with GUI threads
+            # running is not safe.
+            context = multiprocessing.get_context('spawn')
+            with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+                self._search(pool)
+        except (OSError, concurrent.futures.process.BrokenProcessPool) as e:
+            error = e
+        self.on_done(self, error)
+
+    def _search(self, pool):
+        pending = set()
+        batch = []
+        patterns = load_ignore_patterns(self.root)
+        for file_path in walk_files(self.root, patterns):
+            if self.cancelled.is_set():
+                break
+            batch.append(file_path)
+            if len(batch) == FILES_PER_TASK:
+                pending.add(self._submit(pool, batch))
+                batch = []
+            if len(pending) >= self.workers * 2:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                self._deliver(done)
+        if batch and not self.cancelled.is_set():
+            pending.add(self._submit(pool, batch))
+
+        for future in concurrent.futures.as_completed(pending):
+            if self.cancelled.is_set():
+                pool.shutdown(wait=False, cancel_futures=True)
+                return
+            self._deliver([future])
+
+    def _submit(self, pool, batch):
+        self.files_searched += len(batch)
+        return pool.submit(search_files, batch, self.query, *self.options)
+
+    def _deliver(self, futures):
+        for future in futures:
+            if future.cancelled() or self.cancelled.is_set():
+                continue
+            for file_path, results in future.result():
+                self.matches += len(results)
+                self.on_results(self, file_path, results)
@@ -0,0 +1,147 @@
+import atexit
+import collections
+import contextlib
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+
+PROFILE_ENV = 'MATX_PROFILE'
+LOG_LEVEL_ENV = 'MATX_LOG_LEVEL'
+
+def configure_from_environment():
+    # Called once by the GUI process. Logs warnings and up unless
+    # MATX_LOG_LEVEL says otherwise; with MATX_PROFILE set, timings are
+    # recorded from startup and the report is printed on exit.
+    level = os.environ.get(LOG_LEVEL_ENV, 'WARNING').upper()
+    logging.basicConfig(level=getattr(logging, level, logging.WARNING),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if metrics.enabled:
+        atexit.register(metrics.dump)
+
+class Histogram:
+    # Latencies bucketed by powers of two microseconds: bucket i holds
+    # samples under 2**i us. Fixed size, so recording never allocates.
+    BUCKETS = 32
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of samples.
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+class Instrumentation:
+    # Per-event timings and counters for the handlers that run on every
+    # keystroke, caret move or file operation. Disabled, a timed call
+    # costs one attribute check; enable it with MATX_PROFILE=1 or from the
+    # Tools menu. Workers report from their own threads, hence the lock.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = collections.Counter()
+        self.histograms = collections.defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.histograms[name].add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def report(self):
+        with self._lock:
+            histograms = sorted(self.histograms.items(), key=lambda item: -item[1].total)
+            counters = sorted(self.counters.items())
+        lines = [f"{'event':<28}{'calls':>9}{'total ms':>11}{'mean us':>10}"
+                 f"{'p50 us':>9}{'p99 us':>9}{'max us':>10}"]
+        for name, histogram in histograms:
+            lines.append(f"{name:<28}{histogram.count:>9}{histogram.total * 1e3:>11.1f}"
+                         f"{histogram.total / histogram.count * 1e6:>10.0f}"
+                         f"{histogram.percentile(0.5) * 1e6:>9.0f}"
+                         f"{histogram.percentile(0.99) * 1e6:>9.0f}"
+                         f"{histogram.max * 1e6:>10.0f}")
+        if counters:
+            lines.append("")
+            lines.extend(f"{name:<28}{value:>9}" for name, value in counters)
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        print(self.report(), file=file or sys.stderr)
+
+class StartupPhases:
+    # Marks the end of each startup phase. Marking is one perf_counter
+    # call, so it's always on; main.py --profile-startup prints the report.
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def total(self):
+        return self.marks[-1][1] - self.start if self.marks else 0.0
+
+    def report(self):
+        lines = [f"{'phase':<24}{'ms':>9}{'total ms':>11}"]
+        previous = self.start
+        for name, when in self.marks:
+            lines.append(f"{name:<24}{(when - previous) * 1e3:>9.1f}{(when - self.start) * 1e3:>11.1f}")
+            previous = when
+        return "\n".join(lines)
+
+metrics = Instrumentation(enabled=bool(os.environ.get(PROFILE_ENV)))
+startup = StartupPhases()
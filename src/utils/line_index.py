@@ -0,0 +1,81 @@
+import array
+import bisect
+import itertools
+import mmap
+import operator
+import os
+
+INDEX_BLOCK_SIZE = 8 * 1024 * 1024
+
+class LineIndex:
+    # Read-only view of a file through mmap plus the byte offset at which
+    # every line starts. Offsets live in a flat array of unsigned 64-bit
+    # ints, so the index costs 8 bytes per line and nothing per character.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.size = os.path.getsize(file_path)
+        self._file = open(file_path, 'rb')
+        if self.size:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = b''
+        self.offsets = array.array('Q', [0])
+        self.indexed = 0
+        self.complete = False
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    def build(self, cancelled=None, progress=None, block_size=INDEX_BLOCK_SIZE):
+        # Splitting a block and accumulating the piece lengths keeps the
+        # per-line work inside C instead of a Python loop over find().
+        data = self.data
+        offsets = self.offsets
+        pos = self.indexed
+        while pos < self.size:
+            if cancelled is not None and cancelled():
+                return False
+            end = min(pos + block_size, self.size)
+            pieces = data[pos:end].split(b'\n')
+            pieces.pop()
+            offsets.extend(map(operator.add,
+                               itertools.accumulate(map(len, pieces)),
+                               itertools.count(pos + 1)))
+            pos = self.indexed = end
+            if progress is not None:
+                progress(self)
+        self.complete = True
+        return True
+
+    def use_offsets(self, offsets):
+        # Takes the offsets of a build of the same, unchanged file.
+        self.offsets = offsets
+        self.indexed = self.size
+        self.complete = True
+
+    def line_count(self):
+        return len(self.offsets)
+
+    def line_start(self, line):
+        return self.offsets[line]
+
+    def line_end(self, line):
+        # End of the line's content, excluding its line break.
+        if line + 1 < len(self.offsets):
+            end = self.offsets[line + 1] - 1
+            if end > self.offsets[line] and self.data[end - 1:end] == b'\r':
+                end -= 1
+            return end
+        return self.indexed if not self.complete else self.size
+
+    def line_from_offset(self, offset):
+        return bisect.bisect_right(self.offsets, offset) - 1
+
+    def read_line(self, line, max_bytes=None):
+        start = self.line_start(line)
+        end = self.line_end(line)
+        if max_bytes is not None and end - start > max_bytes:
+            return self.data[start:start + max_bytes], True
+        return self.data[start:end], False
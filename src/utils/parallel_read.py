@@ -0,0 +1,70 @@
+import collections
+import concurrent.futures
+import threading
+from utils.file_operations import read_file_chunks, sniff_file
+from utils.instrumentation import metrics
+from utils.session import file_stat
+
+# A file read in full for a new tab: its text as UTF-8 and the stat and
+# format it was read with. entry is its file cache entry if that still
+# matches the file, error the exception if it couldn't be read.
+ReadFile = collections.namedtuple('ReadFile', ['file_path', 'stat', 'file_format', 'data', 'entry', 'error'])
+
+@metrics.timed('file.read')
+def read_file_data(file_path, file_cache=None):
+    entry = file_cache.get(file_path) if file_cache is not None else None
+    try:
+        stat = file_stat(file_path)
+        if entry and entry.stat != stat:
+            entry = None
+        file_format = entry.file_format if entry else sniff_file(file_path)
+        data = "".join(text for _, text in read_file_chunks(file_path, file_format.encoding,
+                                                            bom=file_format.bom)).encode('utf-8')
+    except (OSError, LookupError) as e:
+        return ReadFile(file_path, None, None, None, None, e)
+    metrics.count('file.load.bytes', stat[1])
+    return ReadFile(file_path, stat, file_format, data, entry, None)
+
+class ParallelReader:
+    # Reads and decodes files on a thread pool and passes each ReadFile to
+    # on_ready, on a worker thread, as soon as it's done, so opening many
+    # files takes about as long as the slowest rather than their sum. A
+    # file isn't started while MAX_PENDING finished ones are still waiting
+    # for done(), so a busy consumer holds the reading back instead of
+    # letting decoded files pile up in memory.
+    MAX_WORKERS = 8
+    MAX_PENDING = 8
+
+    def __init__(self, file_paths, on_ready, file_cache=None):
+        self.file_paths = list(file_paths)
+        self.on_ready = on_ready
+        self.file_cache = file_cache
+        # Files not yet taken; only changed by done().
+        self.remaining = len(self.file_paths)
+        self.cancelled = threading.Event()
+        self._pending = threading.Semaphore(self.MAX_PENDING)
+
+    def start(self):
+        pool = concurrent.futures.ThreadPoolExecutor(max(1, min(self.MAX_WORKERS, len(self.file_paths))),
+                                                     thread_name_prefix='read')
+        for file_path in self.file_paths:
+            pool.submit(self._read, file_path)
+        pool.shutdown(wait=False)
+
+    def done(self):
+        # Called by the consumer once it has taken a ReadFile, from one
+        # thread only.
+        self.remaining -= 1
+        self._pending.release()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _read(self, file_path):
+        while not self._pending.acquire(timeout=0.1):
+            if self.cancelled.is_set():
+                return
+        if self.cancelled.is_set():
+            self._pending.release()
+            return
+        self.on_ready(read_file_data(file_path, self.file_cache))
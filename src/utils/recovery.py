@@ -0,0 +1,235 @@
+import collections
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from utils.document import PieceTable, utf8_length
+from utils.file_operations import read_file_chunks, user_cache_dir, write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+# A journal left behind by an editor that didn't get to save its changes.
+Recoverable = collections.namedtuple('Recoverable', ['journal_id', 'generation', 'file_path'])
+
+# Each edited tab has a journal in the recovery directory, in generations:
+#
+#   <id>.<generation>.snapshot   the text as UTF-8, if the base is a snapshot
+#   <id>.<generation>.journal    a JSON header line naming the base, then one
+#                                [pos, removed bytes, inserted text] line per
+#                                edit made to it
+#
+# The first generation's base is the file on disk while the tab still
+# matched it, so the first edit costs a line rather than a copy of the file.
+# Once a generation's journal outgrows the text, the text is written as the
+# next generation's snapshot and the old files are removed, so what's
+# written stays proportional to what was typed.
+
+def recovery_dir():
+    return os.path.join(user_cache_dir(), 'recovery')
+
+class JournalWriter(threading.Thread):
+    # Runs journal writes queued from the GUI thread, in order, and fsyncs
+    # whatever was written each time the queue runs dry.
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.tasks = queue.Queue()
+        self.dirty = set()
+
+    def submit(self, func, *args):
+        self.tasks.put((func, args))
+
+    def stop(self):
+        # Finishes the writes already queued.
+        self.tasks.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self._sync()
+                return
+            func, args = task
+            try:
+                func(*args)
+            except OSError as e:
+                logger.warning("Recovery journal write failed: %s", e)
+            if self.tasks.empty():
+                self._sync()
+
+    def _sync(self):
+        for journal in self.dirty:
+            try:
+                journal.sync()
+            except OSError as e:
+                logger.warning("Recovery journal sync failed: %s", e)
+        self.dirty.clear()
+
+class RecoveryJournal:
+    # The journal of one tab. Called from the GUI thread; everything that
+    # touches the disk is handed to the writer.
+    COMPACT_MIN_BYTES = 1024 * 1024
+
+    def __init__(self, writer, file_path, snapshot=None, file_stat=None, encoding='utf-8', bom=False,
+                 directory=None):
+        # Starts from snapshot, the text as UTF-8, or if that's None from
+        # the file as it is on disk with the given (mtime_ns, size) stat.
+        self.writer = writer
+        self.file_path = file_path
+        self.directory = directory or recovery_dir()
+        self.journal_id = uuid.uuid4().hex
+        self.generation = 0
+        self.size = 0
+        self.file = None
+        if snapshot is None:
+            base = {'kind': 'file', 'stat': list(file_stat), 'encoding': encoding, 'bom': bom}
+        else:
+            base = {'kind': 'snapshot'}
+        writer.submit(self._start, 0, base, snapshot)
+
+    def _path(self, generation, kind):
+        return os.path.join(self.directory, f"{self.journal_id}.{generation}.{kind}")
+
+    def record(self, edit, document):
+        # document is the text after the edit, in case it's time to compact.
+        line = json.dumps([edit.pos, utf8_length(edit.removed), edit.inserted],
+                          ensure_ascii=False).encode('utf-8') + b'\n'
+        self.size += len(line)
+        self.writer.submit(self._append, line)
+        if self.size > max(self.COMPACT_MIN_BYTES, len(document)):
+            self.compact(document)
+
+    def compact(self, document):
+        self.generation += 1
+        self.size = 0
+        self.writer.submit(self._start, self.generation, {'kind': 'snapshot'}, document.get_bytes())
+
+    def close(self, discard=False):
+        # Keeps the files for recovery unless discard is set.
+        self.writer.submit(self._close, discard)
+
+    # The rest runs on the writer thread.
+
+    def _start(self, generation, base, snapshot):
+        # If anything here fails, edits keep going to the previous
+        # generation, which is still complete.
+        os.makedirs(self.directory, exist_ok=True)
+        if snapshot is not None:
+            write_file_atomic(self._path(generation, 'snapshot'), [snapshot])
+        header = {'version': JOURNAL_VERSION, 'file_path': self.file_path, 'pid': os.getpid(), 'base': base}
+        file = open(self._path(generation, 'journal'), 'wb')
+        file.write(json.dumps(header).encode('utf-8') + b'\n')
+        file.flush()
+        os.fsync(file.fileno())
+        previous, self.file = self.file, file
+        if previous is not None:
+            previous.close()
+            self._remove(generation - 1)
+
+    def _append(self, line):
+        if self.file is not None:
+            self.file.write(line)
+            self.writer.dirty.add(self)
+
+    def sync(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _close(self, discard):
+        self.writer.dirty.discard(self)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if discard:
+            discard_journal(self.journal_id, self.directory)
+
+    def _remove(self, generation):
+        for kind in ('journal', 'snapshot'):
+            try:
+                os.unlink(self._path(generation, kind))
+            except FileNotFoundError:
+                pass
+
+def _process_alive(pid):
+    # Journals of an editor that's still running aren't recoverable. Only
+    # checked on POSIX; os.kill would terminate the process on Windows.
+    if os.name != 'posix' or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+def find_recoverable(directory=None):
+    directory = directory or recovery_dir()
+    latest = {}
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    for name in names:
+        parts = name.split('.')
+        if len(parts) == 3 and parts[2] == 'journal' and parts[1].isdigit():
+            latest[parts[0]] = max(latest.get(parts[0], -1), int(parts[1]))
+
+    found = []
+    for journal_id, generation in latest.items():
+        try:
+            with open(os.path.join(directory, f"{journal_id}.{generation}.journal"), 'rb') as file:
+                header = json.loads(file.readline())
+            if header['version'] != JOURNAL_VERSION or _process_alive(header['pid']):
+                continue
+            found.append(Recoverable(journal_id, generation, header['file_path']))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    return sorted(found, key=lambda recoverable: recoverable.file_path)
+
+def replay(recoverable, directory=None):
+    # Returns the text as it was after the last edit that reached the disk.
+    # Raises OSError, or ValueError if the base file has changed since.
+    directory = directory or recovery_dir()
+    prefix = os.path.join(directory, f"{recoverable.journal_id}.{recoverable.generation}")
+    with open(prefix + '.journal', 'rb') as file:
+        header = json.loads(file.readline())
+        base = header['base']
+        if base['kind'] == 'snapshot':
+            with open(prefix + '.snapshot', 'rb') as snapshot:
+                data = snapshot.read()
+        else:
+            file_path = header['file_path']
+            stat = os.stat(file_path)
+            if [stat.st_mtime_ns, stat.st_size] != base['stat']:
+                raise ValueError(f"{file_path} has changed on disk since the changes were made")
+            data = ''.join(text for _, text in read_file_chunks(file_path, base['encoding'],
+                                                                bom=base['bom'])).encode('utf-8')
+        table = PieceTable(data)
+        for line in file:
+            try:
+                pos, removed, inserted = json.loads(line)
+            except ValueError:
+                break    # the last edit was cut off part way
+            if removed:
+                table.delete(pos, removed)
+            table.insert(pos, inserted.encode('utf-8'))
+    return table.get_bytes().decode('utf-8', errors='replace')
+
+def discard_journal(journal_id, directory=None):
+    directory = directory or recovery_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(journal_id + '.'):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
@@ -0,0 +1,312 @@
+import bisect
+import codecs
+import functools
+import itertools
+import re
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(query, match_case=False, whole_word=False, regex=False, encoding='utf-8'):
+    # Patterns are compiled to bytes so they can run straight over a
+    # document buffer (StyledTextCtrl.GetCharacterPointer, an mmap) without
+    # decoding it. Pass encoding=None to get a str pattern instead.
+    flags = re.MULTILINE
+    if not match_case:
+        flags |= re.IGNORECASE
+    if encoding is None:
+        source = query if regex else re.escape(query)
+        if whole_word:
+            source = r'\b(?:' + source + r')\b'
+        return re.compile(source, flags)
+
+    if regex:
+        source = _regex_source(query, match_case, encoding)
+    else:
+        source = _literal_source(query, match_case, encoding)
+    if whole_word:
+        boundary = _word_syntax(encoding)['b']
+        source = boundary + b'(?:' + source + b')' + boundary
+    return re.compile(source, flags)
+
+def _literal_char(char, match_case, encoding):
+    # IGNORECASE on a bytes pattern only folds ASCII, so non-ASCII letters
+    # get an explicit alternation of their case variants.
+    if match_case or char.isascii():
+        return re.escape(char.encode(encoding))
+    variants = sorted({re.escape(variant.encode(encoding))
+                       for variant in (char, char.lower(), char.upper())})
+    return variants[0] if len(variants) == 1 else b'(?:' + b'|'.join(variants) + b')'
+
+def _literal_source(query, match_case, encoding):
+    return b''.join(_literal_char(char, match_case, encoding) for char in query)
+
+def _regex_source(query, match_case, encoding):
+    # The query as a bytes pattern that keeps the meaning it has as a str
+    # pattern outside sets: \w, \W, \b and \B know the encoding's word
+    # characters, and a non-ASCII character is grouped, so a quantifier
+    # after it repeats all of its bytes, with its other cases unless
+    # match_case. Sets are copied as they are.
+    syntax = _word_syntax(encoding)
+    parts = []
+    in_set = False
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char == '\\' and i + 1 < len(query):
+            escaped = query[i + 1]
+            i += 2
+            if not in_set and escaped in syntax:
+                parts.append(syntax[escaped])
+            elif not in_set and not escaped.isascii():
+                parts.append(b'(?:' + _literal_char(escaped, match_case, encoding) + b')')
+            else:
+                parts.append(('\\' + escaped).encode(encoding))
+            continue
+        if char == '[' and not in_set:
+            # A ']' straight after the opening '[' or '[^' is part of the set.
+            end = i + 1
+            if query.startswith('^', end):
+                end += 1
+            if query.startswith(']', end):
+                end += 1
+            parts.append(query[i:end].encode(encoding))
+            in_set = True
+            i = end
+            continue
+        if char == ']':
+            in_set = False
+        if in_set or char.isascii():
+            parts.append(char.encode(encoding))
+        else:
+            parts.append(b'(?:' + _literal_char(char, match_case, encoding) + b')')
+        i += 1
+    return b''.join(parts)
+
+def _byte_class(values):
+    # A set matching each of the sorted byte values, as ranges.
+    ranges = []
+    for value in values:
+        if ranges and ranges[-1][1] == value - 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return b'[' + b''.join(b'\\x%02x' % low if low == high else b'\\x%02x-\\x%02x' % (low, high)
+                          for low, high in ranges) + b']'
+
+def _sequences_source(sequences):
+    # A pattern matching any of sequences, byte strings of one length,
+    # built as a trie with the bytes that lead to the same rest merged into
+    # one set.
+    if not next(iter(sequences)):
+        return b''
+    rests = {}
+    for sequence in sequences:
+        rests.setdefault(sequence[0], set()).add(sequence[1:])
+    firsts = {}
+    for first, rest in sorted(rests.items()):
+        firsts.setdefault(_sequences_source(rest), []).append(first)
+    parts = [_byte_class(values) + rest for rest, values in firsts.items()]
+    return parts[0] if len(parts) == 1 else b'(?:' + b'|'.join(parts) + b')'
+
+@functools.lru_cache(maxsize=None)
+def _word_sequences(encoding):
+    # Patterns matching one non-ASCII word character (a letter or digit of
+    # any script, as \w in a str pattern) of encoding, one per length in
+    # bytes. For UTF-8, every character beyond the BMP is taken to be a
+    # word character rather than tabulating a million more. Multibyte
+    # encodings other than UTF-8 only get the ASCII ones.
+    name = codecs.lookup(encoding).name
+    if name in ('utf-8', 'utf-8-sig'):
+        chars = ''.join(map(chr, itertools.chain(range(0x80, 0xD800), range(0xE000, 0x10000))))
+        by_length = {}
+        for char in re.findall(r'\w', chars):
+            sequence = char.encode('utf-8')
+            by_length.setdefault(len(sequence), set()).add(sequence)
+        sources = [_sequences_source(by_length[length]) for length in sorted(by_length)]
+        return sources + [rb'[\xf0-\xf4][\x80-\xbf][\x80-\xbf][\x80-\xbf]']
+    high = bytes(range(0x80, 0x100)).decode(encoding, errors='replace')
+    if len(high) != 0x80:
+        return []
+    values = [value for value, char in enumerate(high, 0x80) if char.isalnum()]
+    return [_byte_class(values)] if values else []
+
+@functools.lru_cache(maxsize=None)
+def _word_syntax(encoding):
+    # Stand-ins for \w, \W, \b and \B in a bytes pattern over text in
+    # encoding, where the built-in ones only know ASCII.
+    sequences = [rb'[0-9A-Za-z_]'] + _word_sequences(encoding)
+    word = b'(?:' + b'|'.join(sequences) + b')'
+    # A lookbehind has to be a fixed width, so there is one per length.
+    after_word = b'(?:' + b'|'.join(b'(?<=' + sequence + b')' for sequence in sequences) + b')'
+    not_after_word = b''.join(b'(?<!' + sequence + b')' for sequence in sequences)
+    before_word = b'(?=' + word + b')'
+    not_before_word = b'(?!' + word + b')'
+    if codecs.lookup(encoding).name in ('utf-8', 'utf-8-sig'):
+        char = rb'(?:[\xc2-\xdf][\x80-\xbf]|[\xe0-\xef][\x80-\xbf]{2}|[\xf0-\xf4][\x80-\xbf]{3}|[\x00-\xff])'
+    else:
+        char = rb'[\x00-\xff]'
+    return {
+        'w': word,
+        'W': b'(?:' + not_before_word + char + b')',
+        'b': b'(?:' + after_word + not_before_word + b'|' + not_after_word + before_word + b')',
+        'B': b'(?:' + after_word + before_word + b'|' + not_after_word + not_before_word + b')',
+    }
+
+SEARCH_BLOCK_SIZE = 4 * 1024 * 1024
+
+def max_match_length(query, regex):
+    # How far a match can reach past the start of a block into the next,
+    # for block_search's overlap: a literal is at most four bytes a
+    # character, while a regex has no bound.
+    return 0 if regex else 4 * len(query)
+
+def _block_end(data, start, upper, block_size):
+    # About block_size on from start, just after a line break if there's one
+    # within another block, so that a match within a line never straddles
+    # two blocks.
+    end = start + block_size
+    if end >= upper:
+        return upper
+    newline = data.find(b'\n', end, min(upper, end + block_size))
+    return newline + 1 if newline != -1 else end
+
+def _block_start(data, end, lower, block_size):
+    start = end - block_size
+    if start <= lower:
+        return lower
+    newline = data.rfind(b'\n', max(lower, start - block_size), start)
+    return newline + 1 if newline != -1 else start
+
+def _confirmed(pattern, data, match, end):
+    # A match running up to the end of a block may have been cut short,
+    # or be an anchor or \b that only matched because the block ended there;
+    # matching again at its start against all of data settles it.
+    if match.end() < end or end >= len(data):
+        return match
+    return pattern.match(data, match.start())
+
+def block_search(pattern, data, lower, upper, forward=True, overlap=0, cancelled=None,
+                 block_size=SEARCH_BLOCK_SIZE):
+    # The first match starting in [lower, upper), or with forward=False the
+    # last, searched a block at a time so cancelled() is checked between
+    # blocks and a search starting near the end it's after doesn't scan the
+    # rest of data. Blocks end at line breaks where they can and overlap by
+    # overlap bytes otherwise, so only a regex match spanning lines can be
+    # missed at a block edge. Returns None if there is none or it was
+    # cancelled.
+    block_size = max(block_size, 2 * overlap)
+    if forward:
+        start = lower
+        while start < upper:
+            if cancelled is not None and cancelled():
+                return None
+            end = _block_end(data, start, upper, block_size)
+            pos = start
+            while pos <= end:
+                match = pattern.search(data, pos, end)
+                if match is None:
+                    break
+                confirmed = _confirmed(pattern, data, match, end)
+                if confirmed is not None:
+                    return confirmed
+                pos = match.start() + 1
+            if end == upper:
+                break
+            start = max(start + 1, end - overlap)
+        return None
+
+    end = upper
+    while end > lower:
+        if cancelled is not None and cancelled():
+            return None
+        start = _block_start(data, end, lower, block_size)
+        last = None
+        for match in pattern.finditer(data, start, end):
+            match = _confirmed(pattern, data, match, end)
+            if match is not None:
+                last = match
+        if last is not None:
+            return last
+        if start == lower:
+            break
+        end = min(end - 1, start + overlap)
+    return None
+
+class MatchList:
+    # Every match of one pattern in one document, as sorted start/end
+    # offsets. After the first scan, edits only rescan the lines they
+    # touched and shift the matches after them. Stepping to the next or
+    # previous match from the current one doesn't search at all.
+    def __init__(self, pattern, incremental=True):
+        self.pattern = pattern
+        self.incremental = incremental
+        self.starts = []
+        self.ends = []
+        self.current = -1
+        self.complete = False
+
+    def __len__(self):
+        return len(self.starts)
+
+    def invalidate(self):
+        self.starts = []
+        self.ends = []
+        self.current = -1
+        self.complete = False
+
+    def _find(self, buffer, base=0):
+        starts = []
+        ends = []
+        for match in self.pattern.finditer(buffer):
+            if match.end() > match.start():
+                starts.append(match.start() + base)
+                ends.append(match.end() + base)
+        return starts, ends
+
+    def scan(self, buffer):
+        self.starts, self.ends = self._find(buffer)
+        self.current = -1
+        self.complete = True
+
+    def update(self, pos, removed, inserted, lo, hi, region):
+        # An edit at pos replaced `removed` units with `inserted` units.
+        # [lo, hi) is the edited span widened to whole lines, in post-edit
+        # offsets, and region holds the document contents of that span.
+        if not self.complete:
+            return
+        if not self.incremental:
+            self.invalidate()
+            return
+        delta = inserted - removed
+        first = bisect.bisect_right(self.ends, lo)
+        last = bisect.bisect_left(self.starts, hi - delta)
+        starts, ends = self._find(region, lo)
+        self.starts[first:] = starts + [start + delta for start in self.starts[last:]]
+        self.ends[first:] = ends + [end + delta for end in self.ends[last:]]
+        self.current = -1
+
+    def span(self, index):
+        return self.starts[index], self.ends[index]
+
+    def next_from(self, pos):
+        # Returns (index, wrapped) of the first match at or after pos.
+        if not self.starts:
+            return None, False
+        if 0 <= self.current < len(self.starts) and self.ends[self.current] == pos:
+            index = self.current + 1
+        else:
+            index = bisect.bisect_left(self.starts, pos)
+        wrapped = index >= len(self.starts)
+        self.current = 0 if wrapped else index
+        return self.current, wrapped
+
+    def previous_from(self, pos):
+        # Returns (index, wrapped) of the last match ending at or before pos.
+        if not self.starts:
+            return None, False
+        if 0 <= self.current < len(self.starts) and self.starts[self.current] == pos:
+            index = self.current - 1
+        else:
+            index = bisect.bisect_right(self.ends, pos) - 1
+        wrapped = index < 0
+        self.current = len(self.starts) - 1 if wrapped else index
+        return self.current, wrapped
@@ -0,0 +1,119 @@
+import collections
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from array import array
+from utils.file_operations import FileFormat, user_cache_dir, write_file
+
+SESSION_VERSION = 1
+
+# Where one tab was left: the selection and the scroll position.
+TabState = collections.namedtuple('TabState', ['file_path', 'anchor', 'caret', 'first_line', 'x_offset'])
+
+# What was worked out about a file the last time it was opened, valid while
+# its (mtime_ns, size) stat still matches. offsets, an array('Q'), are the
+# newline offsets of the UTF-8 text for a tab, or the line start offsets
+# for the large file viewer; checkpoints are the highlighter's
+# (line, state stack) pairs.
+CacheEntry = collections.namedtuple('CacheEntry', ['stat', 'file_format', 'offsets', 'lexer', 'checkpoints'])
+
+def session_path():
+    return os.path.join(user_cache_dir(), 'session.json')
+
+def file_stat(file_path):
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+def save_session(tabs, selected, path=None):
+    path = path or session_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {'version': SESSION_VERSION, 'selected': selected, 'tabs': [tab._asdict() for tab in tabs]}
+    write_file(path, json.dumps(data, indent=1))
+
+def load_session(path=None):
+    # Returns ([TabState], selected index or None). A missing or unreadable
+    # session is an empty one.
+    try:
+        with open(path or session_path(), encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('version') != SESSION_VERSION:
+            return [], None
+        tabs = [TabState(**tab) for tab in data['tabs']]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return [], None
+    selected = data.get('selected')
+    return tabs, selected if isinstance(selected, int) and 0 <= selected < len(tabs) else None
+
+class FileCache:
+    # One entry per file, named by a hash of its path: a JSON header line
+    # followed by the offsets as raw 64-bit ints. Reading an entry back is
+    # a stat and one read, far cheaper than sniffing and indexing the file.
+    MAX_ENTRIES = 500
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(user_cache_dir(), 'files')
+
+    def _entry_path(self, file_path):
+        key = os.path.abspath(file_path).encode('utf-8', errors='surrogateescape')
+        return os.path.join(self.directory, hashlib.sha1(key).hexdigest())
+
+    def get(self, file_path):
+        try:
+            stat = file_stat(file_path)
+            with open(self._entry_path(file_path), 'rb') as file:
+                header = json.loads(file.readline())
+                if (header['path'] != os.path.abspath(file_path) or
+                        tuple(header['stat']) != stat):
+                    return None
+                offsets = array('Q')
+                offsets.frombytes(file.read())
+            if len(offsets) != header['count']:
+                return None
+            if header['byteorder'] != sys.byteorder:
+                offsets.byteswap()
+            return CacheEntry(stat, FileFormat(*header['file_format']), offsets, header['lexer'],
+                              [(line, tuple(stack)) for line, stack in header['checkpoints']])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, file_path, entry):
+        header = {
+            'path': os.path.abspath(file_path),
+            'stat': list(entry.stat),
+            'file_format': list(entry.file_format),
+            'lexer': entry.lexer,
+            'checkpoints': [(line, list(stack)) for line, stack in entry.checkpoints],
+            'count': len(entry.offsets),
+            'byteorder': sys.byteorder,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        # Renamed into place so a reader never sees half an entry; no fsync,
+        # losing an entry only costs a slower open.
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(json.dumps(header).encode('utf-8') + b'\n')
+                file.write(entry.offsets.tobytes())
+            os.replace(temp_path, self._entry_path(file_path))
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def prune(self, keep=None):
+        # Drops all but the keep most recently written entries.
+        keep = self.MAX_ENTRIES if keep is None else keep
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+        except OSError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+        for entry in entries[keep:]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,128 @@
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+
+# One request per connection: a JSON object on one line, e.g.
+#   {"open": ["/abs/path/a.py", "/abs/path/b.txt"]}
+# answered with b"ok\n" once it has been handed to the editor. An empty
+# list just asks the running editor to come to the front.
+MAX_REQUEST_SIZE = 1024 * 1024
+
+def is_supported():
+    return hasattr(socket, 'AF_UNIX') and hasattr(os, 'getuid')
+
+def socket_path():
+    # In the per-user runtime directory where there is one, which only the
+    # user can read; otherwise in a directory of the user's own in the temp
+    # directory. A socket straight in the shared temp directory could be
+    # bound first by another user, who would then be sent this user's
+    # paths. Raises OSError if the directory can't be trusted.
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, 'matx.sock')
+    return os.path.join(_private_dir(tempfile.gettempdir()), 'matx.sock')
+
+def _private_dir(parent):
+    path = os.path.join(parent, f'matx-{os.getuid()}')
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    # Someone else may have made it first, or made it a symlink.
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise OSError(f"{path} is not a directory only this user can use")
+    return path
+
+def forward_paths(paths, path=None, timeout=2.0):
+    # Asks a running editor to open paths. Returns False when there's no
+    # editor listening, in which case the caller should start one.
+    request = json.dumps({'open': [os.path.abspath(p) for p in paths]}).encode('utf-8') + b'\n'
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(path or socket_path())
+            client.sendall(request)
+            return _read_line(client) == b'ok'
+    except (OSError, ValueError):
+        return False
+
+def is_listening(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(1.0)
+            client.connect(path)
+            return True
+    except OSError:
+        return False
+
+def _read_line(connection):
+    data = b''
+    while b'\n' not in data and len(data) < MAX_REQUEST_SIZE:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data.split(b'\n', 1)[0]
+
+class InstanceServer(threading.Thread):
+    # Listens for forward_paths requests and passes each list of paths to
+    # on_open, on this thread; the GUI wraps it in wx.CallAfter. Creating
+    # one raises OSError if another editor is already listening.
+    def __init__(self, on_open, path=None):
+        super().__init__(daemon=True)
+        self.on_open = on_open
+        self.path = path or socket_path()
+        self.listener = self._listen()
+
+    def _listen(self):
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                listener.bind(self.path)
+            except OSError:
+                # A socket file left by an editor that crashed can be
+                # replaced; one with an editor behind it can't.
+                if is_listening(self.path):
+                    raise
+                os.unlink(self.path)
+                listener.bind(self.path)
+            os.chmod(self.path, 0o600)
+            listener.listen(8)
+        except OSError:
+            listener.close()
+            raise
+        return listener
+
+    def run(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return    # closed
+            with connection:
+                try:
+                    connection.settimeout(2.0)
+                    request = json.loads(_read_line(connection))
+                    paths = [str(p) for p in request.get('open', [])]
+                except (OSError, ValueError, AttributeError, TypeError):
+                    continue
+                self.on_open(paths)
+                try:
+                    connection.sendall(b'ok\n')
+                except OSError:
+                    pass
+
+    def close(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
@@ -0,0 +1,188 @@
+import bisect
+import itertools
+import os
+import re
+
+# Definitions are found a line at a time, so an edit only needs the lines
+# it touched scanned again. Each pattern gives the symbol's name and either
+# its indent or, for headings, its level, from which its depth in the
+# outline is worked out.
+_C_FUNCTION = re.compile(
+    r'^(?P<indent>[ \t]*)(?!(?:return|else|if|for|while|switch|case|do|goto|throw|delete|new)\b)'
+    r'(?:(?:[\w:<>,]+[ \t*&]+)+|(?=\w+::))'
+    r'(?P<name>~?[A-Za-z_]\w*(?:::~?\w+)*|operator[^\s(]+)[ \t]*\([^;]*\)[\w \t]*\{?[ \t]*(?://.*)?$')
+_C_TYPE = re.compile(
+    r'^(?P<indent>[ \t]*)(?:template[ \t]*<[^>]*>[ \t]*)?(?:typedef[ \t]+)?'
+    r'(?P<kind>class|struct|union|enum|namespace)[ \t]+(?:class[ \t]+)?(?:\w+[ \t]+)*?'
+    r'(?P<name>[A-Za-z_]\w*)[ \t]*(?::[^;]*)?\{?[ \t]*$')
+
+LANGUAGES = {
+    'python': [
+        (re.compile(r'^(?P<indent>[ \t]*)class[ \t]+(?P<name>\w+)'), 'class'),
+        (re.compile(r'^(?P<indent>[ \t]*)(?:async[ \t]+)?def[ \t]+(?P<name>\w+)'), 'function'),
+    ],
+    'c': [
+        (_C_TYPE, None),
+        (_C_FUNCTION, 'function'),
+    ],
+    'javascript': [
+        (re.compile(r'^(?P<indent>[ \t]*)(?:export[ \t]+)?(?:default[ \t]+)?(?:abstract[ \t]+)?class[ \t]+'
+                    r'(?P<name>[\w$]+)'), 'class'),
+        (re.compile(r'^(?P<indent>[ \t]*)(?:export[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?function\*?[ \t]*'
+                    r'(?P<name>[\w$]+)'), 'function'),
+    ],
+    'markdown': [
+        (re.compile(r'^(?P<level>#{1,6})[ \t]+(?P<name>.*?)[ \t#]*$'), 'heading'),
+    ],
+}
+
+EXTENSIONS = {
+    '.py': 'python', '.pyw': 'python', '.pyi': 'python',
+    '.c': 'c', '.h': 'c', '.cc': 'c', '.cpp': 'c', '.cxx': 'c', '.hh': 'c', '.hpp': 'c', '.hxx': 'c',
+    '.js': 'javascript', '.mjs': 'javascript', '.jsx': 'javascript', '.ts': 'javascript', '.tsx': 'javascript',
+    '.md': 'markdown', '.markdown': 'markdown',
+}
+
+# Where a search can start matching inside a name: after a separator, or
+# at a capital following a lower-case letter or digit.
+_WORD_START = re.compile(r'(?<=[_:\s.\-$])[^_:\s.\-$]|(?<=[a-z0-9])[A-Z]')
+
+def language_for(file_path):
+    return EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+class Symbol:
+    __slots__ = ('name', 'kind', 'line', 'depth', 'serial')
+
+    def __init__(self, name, kind, line, depth, serial=0):
+        self.name = name
+        self.kind = kind
+        self.line = line
+        self.depth = depth
+        self.serial = serial
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.kind!r}, {self.line}, {self.depth})"
+
+def scan_lines(language, lines, first_line=0):
+    # Symbols defined in lines, the text of lines first_line on.
+    patterns = LANGUAGES[language]
+    symbols = []
+    for line, text in enumerate(lines, first_line):
+        text = text.rstrip('\r\n')
+        for pattern, kind in patterns:
+            match = pattern.match(text)
+            if match is None or not match.group('name'):
+                continue
+            groups = match.groupdict()
+            if 'level' in groups:
+                depth = len(groups['level']) - 1
+            else:
+                depth = len(groups['indent'].expandtabs(4)) // 4
+            symbols.append(Symbol(match.group('name'), kind or groups['kind'], line, depth))
+            break
+    return symbols
+
+class SymbolIndex:
+    # The definitions in one document, kept by line for the outline and by
+    # name for lookups. Names are held in a sorted list of lower-cased keys,
+    # one for the whole name and one from each word start inside it, so a
+    # prefix of any word in a name is found with a bisection rather than a
+    # scan; names has just the whole names, so those can be found first.
+    # Line numbers shift in place when an edit adds or removes lines.
+    def __init__(self, language):
+        self.language = language
+        self.symbols = []
+        self.keys = []
+        self.names = []
+        self.serials = itertools.count()
+
+    def build(self, lines):
+        self.symbols = []
+        self.keys = []
+        self.names = []
+        self._add(scan_lines(self.language, lines), 0)
+
+    def update(self, first_line, old_line_count, lines):
+        # old_line_count lines from first_line have been replaced by lines,
+        # the text of the lines there now.
+        start = self._index_of_line(first_line)
+        end = self._index_of_line(first_line + old_line_count)
+        for symbol in self.symbols[start:end]:
+            for key in self._keys(symbol.name):
+                del self.keys[bisect.bisect_left(self.keys, (key, symbol.serial))]
+            del self.names[bisect.bisect_left(self.names, (symbol.name.lower(), symbol.serial))]
+        del self.symbols[start:end]
+        delta = len(lines) - old_line_count
+        if delta:
+            for symbol in self.symbols[start:]:
+                symbol.line += delta
+        self._add(scan_lines(self.language, lines, first_line), start)
+
+    def _add(self, symbols, index):
+        self.symbols[index:index] = symbols
+        keys = []
+        for symbol in symbols:
+            symbol.serial = next(self.serials)
+            keys.extend((key, symbol.serial, symbol) for key in self._keys(symbol.name))
+        self._insert(self.keys, keys)
+        self._insert(self.names, [(symbol.name.lower(), symbol.serial, symbol) for symbol in symbols])
+
+    def _insert(self, keys, new_keys):
+        if len(new_keys) < 16:
+            for key in new_keys:
+                bisect.insort(keys, key)
+        else:
+            # Sorting merges a long run in one pass where inserting each
+            # would move the list once per key.
+            keys.extend(new_keys)
+            keys.sort(key=lambda key: key[:2])
+
+    def _index_of_line(self, line):
+        # Index of the first symbol at or after line.
+        low, high = 0, len(self.symbols)
+        while low < high:
+            middle = (low + high) // 2
+            if self.symbols[middle].line < line:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _keys(self, name):
+        lower = name.lower()
+        keys = {lower}
+        keys.update(lower[match.start():] for match in _WORD_START.finditer(name))
+        return keys
+
+    def symbol_at(self, line):
+        # The last symbol defined at or before line.
+        index = self._index_of_line(line + 1)
+        return self.symbols[index - 1] if index else None
+
+    def search(self, query, limit=100):
+        # Symbols with a word starting with query, ignoring case; those
+        # whose name starts with it come first.
+        query = query.lower()
+        found = {}
+        # Whole names first, so that a flood of matches inside names can't
+        # use up the limit before them.
+        for keys in (self.names, self.keys):
+            for index in range(bisect.bisect_left(keys, (query,)), len(keys)):
+                key, serial, symbol = keys[index]
+                if not key.startswith(query) or len(found) >= limit:
+                    break
+                found[serial] = symbol
+        return sorted(found.values(), key=lambda symbol: (not symbol.name.lower().startswith(query),
+                                                          len(symbol.name), symbol.line))
+
+    def find(self, name):
+        # Symbols named exactly name, or qualified names ending in it.
+        key = name.lower()
+        found = []
+        for index in range(bisect.bisect_left(self.keys, (key,)), len(self.keys)):
+            other_key, _, symbol = self.keys[index]
+            if other_key != key:
+                break
+            if symbol.name == name or symbol.name.endswith('::' + name):
+                found.append(symbol)
+        return sorted(found, key=lambda symbol: symbol.line)
@@ -0,0 +1,133 @@
+import collections
+import contextlib
+import sys
+
+# Rough per-step bookkeeping cost on top of the text itself.
+STEP_OVERHEAD = 128
+
+class UndoStep:
+    __slots__ = ('actions', 'size', 'typing')
+
+    def __init__(self, actions, typing=False):
+        self.actions = actions
+        self.typing = typing
+        self.size = STEP_OVERHEAD + sum(sys.getsizeof(text) for _, _, text in actions)
+
+class UndoHistory:
+    # Undo/redo for a single document. Actions are ('insert' | 'delete',
+    # position, text) tuples; each undo step holds one or more of them.
+    # Single-character edits next to each other are merged into one step,
+    # and the whole history is capped by memory rather than step count, so
+    # old steps fall off the front of the deque in O(1).
+    # measure gives the length of a text in the caller's position units,
+    # e.g. UTF-8 bytes for a StyledTextCtrl.
+    def __init__(self, max_bytes=4 * 1024 * 1024, chunk_size=12, measure=len):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.measure = measure
+        self.undo_stack = collections.deque()
+        self.redo_stack = collections.deque()
+        self.size = 0
+        self.recording = True
+        self._group = None
+        self._group_depth = 0
+
+    def record(self, kind, pos, text):
+        if not self.recording or not text:
+            return
+        self._clear_redo()
+        if self._group is not None:
+            self._group.append((kind, pos, text))
+            return
+        if self._coalesce(kind, pos, text):
+            return
+        self._push(UndoStep([(kind, pos, text)], typing=len(text) == 1 and text not in '\r\n'))
+
+    def _coalesce(self, kind, pos, text):
+        if len(text) != 1 or text in '\r\n' or not self.undo_stack:
+            return False
+        step = self.undo_stack[-1]
+        if not step.typing:
+            return False
+        last_kind, last_pos, last_text = step.actions[-1]
+        if last_kind != kind or len(last_text) >= self.chunk_size:
+            return False
+        if kind == 'insert' and pos == last_pos + self.measure(last_text):
+            merged = (kind, last_pos, last_text + text)
+        elif kind == 'delete' and pos == last_pos:
+            merged = (kind, last_pos, last_text + text)    # forward delete
+        elif kind == 'delete' and pos + self.measure(text) == last_pos:
+            merged = (kind, pos, text + last_text)         # backspace
+        else:
+            return False
+        self.size -= step.size
+        step.actions[-1] = merged
+        step.size = STEP_OVERHEAD + sys.getsizeof(merged[2])
+        self.size += step.size
+        return True
+
+    def _push(self, step):
+        self.undo_stack.append(step)
+        self.size += step.size
+        while self.size > self.max_bytes and len(self.undo_stack) > 1:
+            self.size -= self.undo_stack.popleft().size
+
+    def _clear_redo(self):
+        for step in self.redo_stack:
+            self.size -= step.size
+        self.redo_stack.clear()
+
+    def begin_group(self):
+        if self._group_depth == 0:
+            self._group = []
+        self._group_depth += 1
+
+    def end_group(self):
+        self._group_depth -= 1
+        if self._group_depth == 0:
+            actions, self._group = self._group, None
+            if actions:
+                self._push(UndoStep(actions))
+
+    @contextlib.contextmanager
+    def group(self):
+        self.begin_group()
+        try:
+            yield self
+        finally:
+            self.end_group()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def _seal(self):
+        # Typing after an undo or redo starts a new step rather than growing
+        # whichever step happens to be on top now.
+        if self.undo_stack:
+            self.undo_stack[-1].typing = False
+
+    def undo(self):
+        # Returns the actions to revert, newest first, or None.
+        if not self.undo_stack:
+            return None
+        step = self.undo_stack.pop()
+        self.redo_stack.append(step)
+        self._seal()
+        return list(reversed(step.actions))
+
+    def redo(self):
+        # Returns the actions to reapply, oldest first, or None.
+        if not self.redo_stack:
+            return None
+        step = self.redo_stack.pop()
+        self.undo_stack.append(step)
+        self._seal()
+        return list(step.actions)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
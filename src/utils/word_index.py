@@ -0,0 +1,80 @@
+import bisect
+import collections
+import keyword
+import re
+
+MIN_WORD_LENGTH = 3
+
+# Identifiers: a letter or underscore, then word characters. Shorter words
+# aren't worth completing and would churn the index on every keystroke.
+WORD = re.compile(r'[^\W\d]\w{%d,}' % (MIN_WORD_LENGTH - 1))
+
+def count_words(text):
+    return collections.Counter(WORD.findall(text))
+
+class WordIndex:
+    # The words of every open tab, for completion. counts holds how many
+    # times each word occurs across the tabs, so a word stays while any tab
+    # still uses it; words holds the distinct words sorted, so completing a
+    # prefix is a bisection and a walk over the matches however many
+    # tokens the tabs hold. Keywords seed it and are always offered.
+    BULK_SIZE = 64
+
+    def __init__(self, seed=keyword.kwlist):
+        self.counts = {}
+        self.words = []
+        self.update(collections.Counter(word for word in seed if WORD.fullmatch(word)))
+
+    def update(self, deltas):
+        # deltas maps words to how many more (or fewer, if negative) times
+        # they now occur.
+        added = []
+        removed = []
+        for word, delta in deltas.items():
+            if not delta:
+                continue
+            count = self.counts.get(word, 0) + delta
+            if count > 0:
+                if word not in self.counts:
+                    added.append(word)
+                self.counts[word] = count
+            elif word in self.counts:
+                del self.counts[word]
+                removed.append(word)
+        # A tab's worth of words is merged with one sort or filter instead
+        # of moving the list once per word.
+        if len(removed) > self.BULK_SIZE:
+            removed = set(removed)
+            self.words = [word for word in self.words if word not in removed]
+        else:
+            for word in removed:
+                del self.words[bisect.bisect_left(self.words, word)]
+        if len(added) > self.BULK_SIZE:
+            self.words.extend(added)
+            self.words.sort()
+        else:
+            for word in added:
+                bisect.insort(self.words, word)
+
+    def add_text(self, text):
+        self.update(count_words(text))
+
+    def remove_text(self, text):
+        self.update({word: -count for word, count in count_words(text).items()})
+
+    def replace_text(self, old, new):
+        # Only the words whose counts differ are touched.
+        deltas = count_words(new)
+        deltas.subtract(count_words(old))
+        self.update(deltas)
+
+    def complete(self, prefix, limit=100):
+        # Sorted words starting with prefix, other than prefix itself.
+        found = []
+        for index in range(bisect.bisect_left(self.words, prefix), len(self.words)):
+            word = self.words[index]
+            if not word.startswith(prefix) or len(found) >= limit:
+                break
+            if word != prefix:
+                found.append(word)
+        return found
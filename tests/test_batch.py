@@ -0,0 +1,75 @@
+import io
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from src.utils.batch import expand_globs, process_files, replace_in_file, run_batch, run_cli
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, 'sub'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def read(self, path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    def test_expand_globs(self):
+        a = self.write('a.py', b"")
+        b = self.write(os.path.join('sub', 'b.py'), b"")
+        self.write('c.txt', b"")
+        pattern = os.path.join(self.directory, '**', '*.py')
+        self.assertEqual(list(expand_globs([pattern, a])), [a, b])
+        self.assertEqual(list(expand_globs([os.path.join(self.directory, 'missing.py')])), [])
+
+    def test_replace_keeps_encoding(self):
+        path = self.write('notes.txt', "﻿Café café\r\n".encode('utf-16-le'))
+        self.assertEqual(replace_in_file(path, "café", "tea", dry_run=True)[0], 2)
+        self.assertEqual(self.read(path), "﻿Café café\r\n".encode('utf-16-le'))
+
+        self.assertEqual(replace_in_file(path, "café", "tea", match_case=True), (1, None))
+        self.assertEqual(self.read(path), "﻿Café tea\r\n".encode('utf-16-le'))
+
+    def test_dry_run_diff(self):
+        path = self.write('a.py', b"foo = food\nbar\n")
+        count, diff = replace_in_file(path, "foo", "baz", whole_word=True, dry_run=True)
+        self.assertEqual(count, 1)
+        self.assertIn("-foo = food\n+baz = food\n", diff)
+        self.assertEqual(self.read(path), b"foo = food\nbar\n")
+
+    def test_binary_files_are_skipped(self):
+        text = self.write('a.txt', b"find me\n")
+        binary = self.write('a.bin', b"find me\x00\x01")
+        results = process_files([text, binary], "find", "x", (False, False, False), False)
+        self.assertEqual([result.file_path for result in results], [text])
+        self.assertEqual(self.read(binary), b"find me\x00\x01")
+
+    def test_run_batch(self):
+        paths = [self.write(f'{i}.txt', b"x\nneedle\n" if i % 3 == 0 else b"x\n") for i in range(20)]
+        results = list(run_batch(paths, "needle", workers=2))
+        self.assertEqual(sorted(result.file_path for result in results), sorted(paths[::3]))
+        self.assertTrue(all(result.matches[0][:2] == (2, 1) for result in results))
+
+    def test_run_cli(self):
+        path = self.write('a.py', b"foo\n")
+        args = types.SimpleNamespace(find="foo", replace="bar", match_case=False, whole_word=False, regex=False,
+                                     dry_run=False, workers=1, files=[path])
+        out, err = io.StringIO(), io.StringIO()
+        self.assertEqual(run_cli(args, out, err), 0)
+        self.assertEqual(self.read(path), b"bar\n")
+        self.assertEqual(run_cli(args, out, err), 1)
+        args.find, args.regex = "(", True
+        self.assertEqual(run_cli(args, out, err), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from src.ui.control_text import ControlText
+from src.utils.document import Document, utf8_length
+
+class FakeTextCtrl:
+    # Just enough of StyledTextCtrl for ControlText, over a byte buffer.
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.syncing = False
+
+    def GetLength(self):
+        return len(self.data)
+
+    def GetRangePointer(self, start, length):
+        return memoryview(self.data)[start:start + length]
+
+    def GetLineCount(self):
+        return self.data.count(b'\n') + 1
+
+    def LineFromPosition(self, pos):
+        return self.data.count(b'\n', 0, pos)
+
+    def PositionFromLine(self, line):
+        pos = 0
+        for _ in range(line):
+            pos = self.data.index(b'\n', pos) + 1
+        return pos
+
+    def apply(self, edit):
+        # What the editor's document listener does to the control, for
+        # edits that weren't made in it.
+        if self.syncing:
+            return
+        end = edit.pos + utf8_length(edit.removed)
+        self.data[edit.pos:end] = edit.inserted.encode('utf-8')
+
+    def type(self, document, pos, text):
+        self.data[pos:pos] = text.encode('utf-8')
+        self.syncing = True
+        document.replaced(pos, '', text)
+        self.syncing = False
+
+    def backspace(self, document, pos, length):
+        removed = bytes(self.data[pos:pos + length]).decode('utf-8')
+        del self.data[pos:pos + length]
+        self.syncing = True
+        document.replaced(pos, removed, '')
+        self.syncing = False
+
+class TestControlText(unittest.TestCase):
+    def setUp(self):
+        self.control = FakeTextCtrl("first line\nsecond ünïcode line\nthird".encode('utf-8'))
+        self.document = Document()
+        self.document.attach(ControlText(self.control))
+        self.document.subscribe(self.control.apply)
+
+    def test_reads_from_the_control(self):
+        self.assertEqual(len(self.document), len(self.control.data))
+        self.assertEqual(self.document.line_count(), 3)
+        self.assertEqual(self.document.get_line(1), "second ünïcode line")
+        self.assertEqual(self.document.line_from_offset(len(self.control.data)), 2)
+        self.assertEqual(self.document.get_bytes(), bytes(self.control.data))
+
+    def test_typing_and_undo(self):
+        original = bytes(self.control.data)
+        self.control.type(self.document, 5, " ✓")
+        self.control.backspace(self.document, 0, 1)
+        edited = bytes(self.control.data)
+        self.assertEqual(self.document.get_text(0, 13), "irst ✓ line")
+        while self.document.undo():
+            pass
+        self.assertEqual(bytes(self.control.data), original)
+        while self.document.redo():
+            pass
+        self.assertEqual(bytes(self.control.data), edited)
+
+    def test_replace_all_goes_through_the_control(self):
+        self.assertEqual(self.document.replace_all("line", "row"), 2)
+        self.assertEqual(bytes(self.control.data).decode('utf-8'), "first row\nsecond ünïcode row\nthird")
+        self.document.undo()
+        self.assertEqual(self.document.get_line(0), "first line")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import random
+import unittest
+from src.utils.document import Document, Edit, PieceTable
+
+class TestPieceTable(unittest.TestCase):
+    def test_random_edits_match_bytes(self):
+        rng = random.Random(1)
+        expected = bytearray(b"first line\nsecond line\n\nlast")
+        table = PieceTable(bytes(expected))
+        for _ in range(500):
+            pos = rng.randrange(len(expected) + 1)
+            if expected and rng.random() < 0.4:
+                length = rng.randrange(min(8, len(expected) - pos) + 1)
+                self.assertEqual(table.delete(pos, length), bytes(expected[pos:pos + length]))
+                del expected[pos:pos + length]
+            else:
+                data = rng.choice([b"x", b"ab", b"\n", b"one\ntwo", b"\xc3\xa9"])
+                table.insert(pos, data)
+                expected[pos:pos] = data
+        self.assertEqual(table.get_bytes(), bytes(expected))
+        self.assertEqual(table.get_bytes(5, 40), bytes(expected[5:40]))
+
+        starts = [0] + [i + 1 for i, byte in enumerate(expected) if byte == ord('\n')]
+        self.assertEqual(table.line_count(), len(starts))
+        for line, start in enumerate(starts):
+            self.assertEqual(table.line_start(line), start)
+            self.assertEqual(table.line_from_offset(start), line)
+
+    def test_original_newlines(self):
+        table = PieceTable(b"one\ntwo\n")
+        self.assertEqual(list(table.original_newlines()), [3, 7])
+        reused = PieceTable(b"one\ntwo\n", table.original_newlines())
+        self.assertEqual(reused.line_start(2), 8)
+        reused.insert(0, b"x")
+        self.assertIsNone(reused.original_newlines())
+
+    def test_typing_grows_one_piece(self):
+        table = PieceTable(b"abc")
+        for i, char in enumerate(b"hello"):
+            table.insert(3 + i, bytes([char]))
+        self.assertEqual(table.get_bytes(), b"abchello")
+        self.assertEqual(len(list(table._pieces(table.root))), 2)
+
+class TestDocument(unittest.TestCase):
+    def test_edits_are_reported_and_undone(self):
+        document = Document("Initial")
+        edits = []
+        document.subscribe(edits.append)
+        document.insert(7, " text")
+        self.assertEqual(edits, [Edit(7, '', " text")])
+
+        self.assertEqual(document.undo(), [Edit(7, " text", '')])
+        self.assertEqual(document.get_text(), "Initial")
+        document.redo()
+        self.assertEqual(document.get_text(), "Initial text")
+
+    def test_typing_is_undone_in_chunks(self):
+        document = Document("")
+        for i, char in enumerate("hello"):
+            document.insert(i, char)
+        document.undo()
+        self.assertEqual(document.get_text(), "")
+
+        document = Document("hello")
+        for pos in range(5, 0, -1):
+            document.delete(pos - 1, 1)
+        document.undo()
+        self.assertEqual(document.get_text(), "hello")
+
+    def test_find_and_replace(self):
+        document = Document("Find and replace this text")
+        self.assertEqual(document.find("this"), (17, 21))
+        document.replace(17, 4, "that")
+        self.assertEqual(document.get_text(), "Find and replace that text")
+
+    def test_replace_all_is_one_undo_step(self):
+        document = Document("cat café\ncat\n")
+        self.assertEqual(document.replace_all(r"c(a)t", r"d\1g", regex=True), 2)
+        self.assertEqual(document.get_text(), "dag café\ndag\n")
+        self.assertEqual(document.replace_all("CAFÉ", "bar"), 1)
+        self.assertEqual(document.get_line(0), "dag bar")
+        document.undo()
+        document.undo()
+        self.assertEqual(document.get_text(), "cat café\ncat\n")
+
+    def test_line_mapping(self):
+        document = Document("a\r\nbé\nc")
+        self.assertEqual(document.line_count(), 3)
+        self.assertEqual(document.get_line(0), "a")
+        self.assertEqual(document.line_start(2), 7)
+        self.assertEqual(document.line_end(1), 6)
+        self.assertEqual(document.line_from_offset(6), 1)
+
+if __name__ == '__main__':
+    unittest.main()
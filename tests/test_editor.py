@@ -30,7 +30,7 @@ class TestEditor(unittest.TestCase):
 
         new_content = "Updated test content"
         self.editor.ui.notebook.GetCurrentPage().SetText(new_content)
-        self.editor.save_file()
+        self.editor.save_file().join()
 
         saved_content = read_file(temp_file_path)
         self.assertEqual(saved_content, new_content)
@@ -0,0 +1,105 @@
+import unittest
+from src.utils.file_operations import (decode_complete, detect_encoding, detect_eol, encode_chunks,
+                                       read_file_chunks, sniff_file, write_file_atomic)
+import os
+import tempfile
+
+class TestFileOperations(unittest.TestCase):
+    def setUp(self):
+        fd, self.temp_file_path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.temp_file_path)
+
+    def test_read_file_chunks_splits_multibyte_characters(self):
+        content = "héllo wörld ✓\n" * 50
+        with open(self.temp_file_path, 'wb') as temp_file:
+            temp_file.write(content.encode('utf-8'))
+
+        chunks = list(read_file_chunks(self.temp_file_path, chunk_size=7))
+
+        self.assertEqual("".join(text for _, text in chunks), content)
+        self.assertEqual(sum(size for size, _ in chunks), len(content.encode('utf-8')))
+
+    def test_read_file_chunks_empty_file(self):
+        self.assertEqual(list(read_file_chunks(self.temp_file_path)), [])
+
+    def test_decode_complete_holds_back_split_characters(self):
+        data = "log ✓ line\n".encode('utf-8')
+        self.assertEqual(decode_complete(data[:5], 'utf-8'), ("log ", b'\xe2'))
+        self.assertEqual(decode_complete(b'\xe2' + data[5:], 'utf-8'), ("✓ line\n", b''))
+        self.assertEqual(decode_complete("ab".encode('utf-16-le')[:3], 'utf-16-le'), ("a", b'b'))
+        self.assertEqual(decode_complete(b'\xff ok', 'utf-8'), ("\ufffd ok", b''))
+
+    def test_encode_chunks_reencodes_across_boundaries(self):
+        content = "naïve café ✓\r\n" * 20
+        data = content.encode('utf-8')
+
+        encoded = b"".join(encode_chunks(data, 'utf-16-le', chunk_size=5))
+        self.assertEqual(encoded.decode('utf-16-le'), content)
+
+        passthrough = b"".join(encode_chunks(data, 'UTF8', chunk_size=5))
+        self.assertEqual(passthrough, data)
+
+    def test_write_file_atomic_replaces_target(self):
+        with open(self.temp_file_path, 'wb') as temp_file:
+            temp_file.write(b"old content")
+
+        write_file_atomic(self.temp_file_path, [b"new ", b"content"])
+
+        with open(self.temp_file_path, 'rb') as temp_file:
+            self.assertEqual(temp_file.read(), b"new content")
+
+    def test_write_file_atomic_keeps_target_on_failure(self):
+        with open(self.temp_file_path, 'wb') as temp_file:
+            temp_file.write(b"old content")
+
+        def chunks():
+            yield b"partial"
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            write_file_atomic(self.temp_file_path, chunks())
+
+        with open(self.temp_file_path, 'rb') as temp_file:
+            self.assertEqual(temp_file.read(), b"old content")
+        directory = os.path.dirname(self.temp_file_path)
+        prefix = "." + os.path.basename(self.temp_file_path) + "."
+        self.assertFalse([name for name in os.listdir(directory) if name.startswith(prefix)])
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(b"plain ascii"), ('utf-8', False))
+        self.assertEqual(detect_encoding("café".encode('utf-8')), ('utf-8', False))
+        self.assertEqual(detect_encoding("café".encode('utf-8')[:-1], truncated=True), ('utf-8', False))
+        self.assertEqual(detect_encoding("café".encode('cp1252')), ('cp1252', False))
+        self.assertEqual(detect_encoding(b"caf\xe9 \x81"), ('latin-1', False))
+        self.assertEqual(detect_encoding("text".encode('utf-16-le')), ('utf-16-le', False))
+        self.assertEqual(detect_encoding("text".encode('utf-16-be')), ('utf-16-be', False))
+        self.assertEqual(detect_encoding("text".encode('utf-32-le')), ('utf-32-le', False))
+        self.assertEqual(detect_encoding("text".encode('utf-16')), ('utf-16-le', True))
+        self.assertEqual(detect_encoding("text".encode('utf-8-sig')), ('utf-8', True))
+
+    def test_detect_eol(self):
+        self.assertEqual(detect_eol("a\r\nb\r\nc\n"), 'CRLF')
+        self.assertEqual(detect_eol("a\nb\n"), 'LF')
+        self.assertEqual(detect_eol("a\rb\r"), 'CR')
+
+    def test_bom_round_trip(self):
+        content = "first\r\nsecond ✓\r\n"
+        with open(self.temp_file_path, 'wb') as temp_file:
+            temp_file.write(content.encode('utf-16'))
+
+        file_format = sniff_file(self.temp_file_path)
+        self.assertEqual(file_format, ('utf-16-le', True, 'CRLF'))
+        text = "".join(chunk for _, chunk in read_file_chunks(
+            self.temp_file_path, file_format.encoding, chunk_size=3, bom=file_format.bom))
+        self.assertEqual(text, content)
+
+        write_file_atomic(self.temp_file_path, encode_chunks(text.encode('utf-8'), file_format.encoding,
+                                                             bom=file_format.bom))
+        with open(self.temp_file_path, 'rb') as temp_file:
+            self.assertEqual(temp_file.read(), content.encode('utf-16'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import queue
+import random
+import shutil
+import tempfile
+import unittest
+from src.utils.file_watcher import FileWatcher, line_hunks, split_lines
+
+def apply_hunks(data, hunks):
+    data = bytearray(data)
+    for hunk in reversed(hunks):
+        data[hunk.pos:hunk.pos + hunk.length] = hunk.text
+    return bytes(data)
+
+class TestLineHunks(unittest.TestCase):
+    def test_split_lines(self):
+        self.assertEqual(split_lines(b"a\r\nb\n\nc"), [b"a\r\n", b"b\n", b"\n", b"c"])
+        self.assertEqual(split_lines(b"a\n"), [b"a\n"])
+        self.assertEqual(split_lines(b""), [])
+
+    def test_hunks_rebuild_new_text(self):
+        rng = random.Random(3)
+        old_lines = [f"line {i} ✓\n".encode('utf-8') for i in range(300)]
+        for _ in range(50):
+            new_lines = list(old_lines)
+            for _ in range(rng.randint(1, 5)):
+                i = rng.randrange(len(new_lines))
+                choice = rng.random()
+                if choice < 0.3:
+                    del new_lines[i]
+                elif choice < 0.6:
+                    new_lines.insert(i, b"inserted\n")
+                else:
+                    new_lines[i] = b"changed\n"
+            old, new = b"".join(old_lines), b"".join(new_lines)
+            hunks = line_hunks(old, new)
+            self.assertEqual(apply_hunks(old, hunks), new)
+            self.assertEqual(sum(hunk.line_delta for hunk in hunks), len(new_lines) - len(old_lines))
+
+    def test_only_changed_lines(self):
+        old = b"one\ntwo\nthree\nfour"
+        [hunk] = line_hunks(old, b"one\n2\nthree\nfour")
+        self.assertEqual((hunk.pos, hunk.length, hunk.text, hunk.line, hunk.line_delta), (4, 4, b"2\n", 1, 0))
+        self.assertEqual(line_hunks(old, old), [])
+
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'app.log')
+        with open(self.path, 'wb') as file:
+            file.write(b"started\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def watch(self, use_inotify):
+        changes = queue.Queue()
+        watcher = FileWatcher(changes.put, use_inotify)
+        watcher.POLL_INTERVAL = 0.05
+        watcher.SETTLE_TIME = 0.01
+        st = os.stat(self.path)
+        watcher.watch(self.path, (st.st_mtime_ns, st.st_size))
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        return changes
+
+    def check_changes(self, use_inotify):
+        changes = self.watch(use_inotify)
+        with open(self.path, 'ab') as file:
+            file.write(b"request 1\n")
+        change = changes.get(timeout=5)
+        self.assertEqual(change.appended, b"request 1\n")
+        self.assertEqual(change.stat[1], os.path.getsize(self.path))
+
+        with open(self.path, 'wb') as file:
+            file.write(b"rotated\n")
+        change = changes.get(timeout=5)
+        self.assertIsNone(change.appended)
+
+    def test_polling(self):
+        self.check_changes(use_inotify=False)
+
+    def test_inotify(self):
+        self.check_changes(use_inotify=True)
+
+    def test_change_before_watch_is_reported(self):
+        changes = queue.Queue()
+        watcher = FileWatcher(changes.put, use_inotify=False)
+        watcher.POLL_INTERVAL = 0.05
+        watcher.watch(self.path, (0, 0))
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        self.assertEqual(changes.get(timeout=5).path, self.path)
+
+if __name__ == '__main__':
+    unittest.main()
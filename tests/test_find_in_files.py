@@ -0,0 +1,67 @@
+import unittest
+import threading
+from src.utils.find_in_files import FileSearch, load_ignore_patterns, search_file, walk_files
+import os
+import tempfile
+
+class TestFindInFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, relative_path, data):
+        file_path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file:
+            file.write(data)
+        return file_path
+
+    def test_search_file_reports_lines_and_columns(self):
+        file_path = self.write("a.txt", "first\r\nsecond needle\r\nnéedle NEEDLE\r\n".encode('utf-8'))
+        self.assertEqual(search_file(file_path, "needle"),
+                         [(2, 8, "second needle"), (3, 8, "néedle NEEDLE")])
+        self.assertEqual(search_file(file_path, "needle", match_case=True), [(2, 8, "second needle")])
+
+    def test_search_file_uses_detected_encoding(self):
+        latin1 = self.write("latin1.txt", "café\n".encode('latin-1'))
+        utf16 = self.write("utf16.txt", "one\ncafé two\n".encode('utf-16'))
+        self.assertEqual(search_file(latin1, "café"), [(1, 1, "café")])
+        self.assertEqual(search_file(utf16, "café"), [(2, 1, "café two")])
+
+    def test_binary_and_ignored_files_are_skipped(self):
+        binary = self.write("data.bin", b"needle\x00\x01\x02\x03\x00\x00\xff")
+        self.write(".git/config", b"needle")
+        self.write("build/out.txt", b"needle")
+        self.write(".gitignore", b"build/\n")
+        kept = self.write("src/main.py", b"needle")
+
+        self.assertEqual(search_file(binary, "needle"), [])
+        self.assertEqual(list(walk_files(self.root, load_ignore_patterns(self.root))),
+                         [os.path.join(self.root, ".gitignore"), binary, kept])
+
+    def test_file_search_streams_results(self):
+        for i in range(10):
+            self.write(f"dir{i % 3}/file{i}.txt", b"x\nneedle\n" if i % 2 else b"nothing\n")
+        found = {}
+        finished = threading.Event()
+
+        def on_results(search, file_path, results):
+            found[os.path.basename(file_path)] = results
+
+        def on_done(search, error):
+            self.assertIsNone(error)
+            finished.set()
+
+        search = FileSearch(self.root, "needle", on_results, on_done, workers=2)
+        search.start()
+        self.assertTrue(finished.wait(60))
+
+        self.assertEqual(sorted(found), sorted(f"file{i}.txt" for i in range(1, 10, 2)))
+        self.assertEqual(found["file1.txt"], [(2, 1, "needle")])
+        self.assertEqual(search.matches, 5)
+
+if __name__ == '__main__':
+    unittest.main()
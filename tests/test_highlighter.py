@@ -0,0 +1,141 @@
+import unittest
+from pygments.lexers import PythonLexer
+from src.ui.highlighter import PygmentsHighlighter, STYLE_DEFAULT, create_highlighter, style_for
+
+SOURCE = '''import os
+
+class Example:
+    """A docstring
+    spanning lines."""
+
+    def method(self, value=42):
+        # comment with ünïcode
+        return f"{value!r} {os.sep}"
+''' * 20
+
+def full_runs(text):
+    highlighter = PygmentsHighlighter(PythonLexer(stripnl=False, ensurenl=False))
+    spans = [(index, index + len(value), style_for(token))
+             for index, token, value in highlighter.lexer.get_tokens_unprocessed(text)]
+    return highlighter._runs(text, 0, len(text), spans, text.isascii())
+
+class FakeTextCtrl:
+    # Just enough of StyledTextCtrl for style_lines, over ASCII text.
+    def __init__(self, text):
+        self.text = text
+        self.end_styled = 0
+        self.starts = [0] + [i + 1 for i, char in enumerate(text) if char == '\n']
+        self.styled_from = None
+        self.styles = []
+
+    def GetLineCount(self):
+        return len(self.starts)
+
+    def GetLength(self):
+        return len(self.text)
+
+    def GetEndStyled(self):
+        return self.end_styled
+
+    def LineFromPosition(self, pos):
+        return max(i for i, start in enumerate(self.starts) if start <= pos)
+
+    def PositionFromLine(self, line):
+        return self.starts[line] if line < len(self.starts) else len(self.text)
+
+    def GetTextRange(self, start, end):
+        return self.text[start:end]
+
+    def StartStyling(self, pos):
+        self.styled_from = pos
+
+    def SetStyling(self, length, style):
+        self.styles.extend([style] * length)
+
+def expand(runs):
+    styles = []
+    for length, style in runs:
+        styles.extend([style] * length)
+    return styles
+
+class TestHighlighter(unittest.TestCase):
+    def test_create_highlighter(self):
+        self.assertEqual(create_highlighter("example.py").name, "Python")
+        self.assertIsNone(create_highlighter("notes.unknown-extension"))
+        self.assertIsNone(create_highlighter("notes.txt"))
+
+    def test_non_incremental_lexers_start_near_the_unstyled_text(self):
+        highlighter = create_highlighter("data.json")
+        self.assertFalse(highlighter.incremental)
+        text = '{"key": [1, "two", null]}\n' * 1000
+        start_line = 600
+        text_ctrl = FakeTextCtrl(text)
+        text_ctrl.end_styled = text_ctrl.PositionFromLine(start_line)
+        lexed = []
+        lexer = highlighter.lexer
+        original = lexer.get_tokens_unprocessed
+        lexer.get_tokens_unprocessed = lambda chunk: (lexed.append(chunk), original(chunk))[1]
+        highlighter.style_lines(text_ctrl, start_line + 10)
+
+        self.assertEqual(lexed[0].count('\n'), highlighter.CONTEXT_LINES + 10 + highlighter.MARGIN_LINES)
+        self.assertEqual(text_ctrl.styled_from, text_ctrl.PositionFromLine(start_line))
+        line = len(text.splitlines(keepends=True)[0])
+        self.assertEqual(len(text_ctrl.styles), (10 + highlighter.MARGIN_LINES) * line)
+        self.assertEqual(text_ctrl.styles[:line], text_ctrl.styles[line:2 * line])
+
+    def test_style_for_uses_closest_ancestor(self):
+        from pygments.token import Keyword, Text
+        self.assertEqual(style_for(Keyword.Namespace), style_for(Keyword))
+        self.assertEqual(style_for(Text), STYLE_DEFAULT)
+
+    def test_line_lexing_matches_full_lex(self):
+        highlighter = create_highlighter("example.py")
+        self.assertTrue(highlighter.incremental)
+        line_count = SOURCE.count('\n')
+        runs = highlighter._lex_lines(SOURCE, 0, line_count, ('root',), False)
+        self.assertEqual(expand(runs), expand(full_runs(SOURCE)))
+
+    def test_resume_from_checkpoint(self):
+        highlighter = create_highlighter("example.py")
+        lines = SOURCE.splitlines(keepends=True)
+        highlighter._lex_lines(SOURCE, 0, len(lines), ('root',), False)
+        # Line 4 is inside the docstring, so it has no checkpoint of its own.
+        self.assertNotIn(4, highlighter.lines)
+        index = max(i for i, line in enumerate(highlighter.lines) if line <= 50)
+        line, stack = highlighter.lines[index], highlighter.stacks[index]
+        self.assertGreater(line, 0)
+        tail = ''.join(lines[line:])
+
+        highlighter.cache.clear()
+        runs = highlighter._lex_lines(tail, line, len(lines), stack, False)
+        expected = expand(full_runs(SOURCE))[len(''.join(lines[:line]).encode('utf-8')):]
+        self.assertEqual(expand(runs), expected)
+
+    def test_invalidate_keeps_earlier_checkpoints(self):
+        highlighter = create_highlighter("example.py")
+        highlighter._lex_lines(SOURCE, 0, SOURCE.count('\n'), ('root',), False)
+        highlighter.invalidate(30)
+        self.assertEqual(highlighter.lines[0], 0)
+        self.assertTrue(all(line <= 30 for line in highlighter.lines))
+
+    def test_saved_checkpoints_resume_lexing(self):
+        highlighter = create_highlighter("example.py")
+        highlighter.SAVED_CHECKPOINT_SPACING = 20
+        highlighter._lex_lines(SOURCE, 0, SOURCE.count('\n'), ('root',), False)
+        saved = highlighter.saved_checkpoints()
+        self.assertEqual(saved[0], (0, ('root',)))
+        self.assertTrue(all(b[0] - a[0] >= 20 for a, b in zip(saved, saved[1:])))
+
+        restored = create_highlighter("example.py")
+        restored.restore_checkpoints(saved)
+        line, stack = restored.restored_lines[-1], restored.restored_stacks[-1]
+        lines = SOURCE.splitlines(keepends=True)
+        runs = restored._lex_lines(''.join(lines[line:]), line, len(lines), stack, False)
+        expected = expand(full_runs(SOURCE))[len(''.join(lines[:line]).encode('utf-8')):]
+        self.assertEqual(expand(runs), expected)
+
+        restored.invalidate(line - 1)
+        self.assertNotIn(line, restored.restored_lines)
+
+if __name__ == '__main__':
+    unittest.main()
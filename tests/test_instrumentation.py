@@ -0,0 +1,61 @@
+import unittest
+from src.utils.instrumentation import Histogram, Instrumentation, StartupPhases
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        metrics = Instrumentation()
+
+        @metrics.timed('handler')
+        def handler(value):
+            return value * 2
+
+        self.assertEqual(handler(21), 42)
+        metrics.count('bytes', 10)
+        with metrics.timer('block'):
+            pass
+        self.assertEqual(len(metrics.histograms), 0)
+        self.assertEqual(len(metrics.counters), 0)
+
+    def test_enabled_records_timings_and_counters(self):
+        metrics = Instrumentation(enabled=True)
+
+        @metrics.timed('handler')
+        def handler():
+            raise ValueError
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                handler()
+        metrics.count('bytes', 10)
+        metrics.count('bytes', 5)
+
+        self.assertEqual(metrics.histograms['handler'].count, 3)
+        self.assertEqual(metrics.counters['bytes'], 15)
+        report = metrics.report()
+        self.assertIn('handler', report)
+        self.assertIn('bytes', report)
+
+        metrics.reset()
+        self.assertEqual(len(metrics.histograms), 0)
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.add(0.000010)
+        histogram.add(0.5)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertLessEqual(histogram.percentile(0.5), 0.000016)
+        self.assertEqual(histogram.percentile(1.0), 0.5)
+        self.assertEqual(histogram.max, 0.5)
+
+    def test_startup_phases(self):
+        phases = StartupPhases(start=0.0)
+        phases.marks = [("imports", 0.05), ("main window", 0.125)]
+        self.assertEqual(phases.total(), 0.125)
+        report = phases.report().splitlines()
+        self.assertIn("imports", report[1])
+        self.assertIn("75.0", report[2])
+
+if __name__ == '__main__':
+    unittest.main()
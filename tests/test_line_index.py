@@ -0,0 +1,41 @@
+import unittest
+from src.utils.line_index import LineIndex
+import os
+import tempfile
+
+class TestLineIndex(unittest.TestCase):
+    def make_index(self, data):
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            temp_file.write(data)
+        self.addCleanup(os.unlink, temp_file.name)
+        index = LineIndex(temp_file.name)
+        self.addCleanup(index.close)
+        return index
+
+    def test_build_across_blocks(self):
+        lines = [b"line %d" % i for i in range(1000)]
+        index = self.make_index(b"\n".join(lines))
+        self.assertTrue(index.build(block_size=64))
+
+        self.assertEqual(index.line_count(), 1000)
+        self.assertEqual(index.read_line(0), (b"line 0", False))
+        self.assertEqual(index.read_line(999), (b"line 999", False))
+        self.assertEqual(index.line_from_offset(index.line_start(500) + 3), 500)
+
+    def test_crlf_and_truncation(self):
+        index = self.make_index(b"first\r\nsecond line\r\n")
+        index.build()
+
+        self.assertEqual(index.line_count(), 3)
+        self.assertEqual(index.read_line(0), (b"first", False))
+        self.assertEqual(index.read_line(1, max_bytes=6), (b"second", True))
+        self.assertEqual(index.read_line(2), (b"", False))
+
+    def test_empty_file(self):
+        index = self.make_index(b"")
+        index.build()
+        self.assertEqual(index.line_count(), 1)
+        self.assertEqual(index.read_line(0), (b"", False))
+
+if __name__ == '__main__':
+    unittest.main()
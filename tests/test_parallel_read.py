@@ -0,0 +1,59 @@
+import os
+import queue
+import shutil
+import tempfile
+import unittest
+from src.utils.parallel_read import ParallelReader, read_file_data
+
+class TestParallelRead(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_read_file_data(self):
+        path = self.write('a.txt', "﻿naïve\r\n".encode('utf-16-le'))
+        read = read_file_data(path)
+        self.assertEqual(read.data, "naïve\r\n".encode('utf-8'))
+        self.assertEqual((read.file_format.encoding, read.file_format.bom), ('utf-16-le', True))
+        self.assertEqual(read.stat[1], os.path.getsize(path))
+        self.assertIsNone(read.error)
+
+        missing = read_file_data(os.path.join(self.directory, 'missing.txt'))
+        self.assertIsInstance(missing.error, OSError)
+
+    def test_every_file_is_delivered(self):
+        paths = [self.write(f'{i}.txt', f"file {i}\n".encode()) for i in range(30)]
+        ready = queue.Queue()
+        reader = ParallelReader(paths, ready.put)
+        reader.start()
+        results = {}
+        for _ in paths:
+            read = ready.get(timeout=5)
+            results[read.file_path] = read.data
+            reader.done()
+        self.assertEqual(results, {path: f"file {i}\n".encode() for i, path in enumerate(paths)})
+        self.assertEqual(reader.remaining, 0)
+
+    def test_pending_files_are_bounded(self):
+        paths = [self.write(f'{i}.txt', b"x") for i in range(ParallelReader.MAX_PENDING + 5)]
+        ready = queue.Queue()
+        reader = ParallelReader(paths, ready.put)
+        self.addCleanup(reader.cancel)
+        reader.start()
+        for _ in range(ParallelReader.MAX_PENDING):
+            ready.get(timeout=5)
+        with self.assertRaises(queue.Empty):
+            ready.get(timeout=0.3)
+        reader.done()
+        ready.get(timeout=5)
+
+if __name__ == '__main__':
+    unittest.main()
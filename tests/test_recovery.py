@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.utils.document import Document
+from src.utils.recovery import JournalWriter, RecoveryJournal, find_recoverable, replay
+from src.utils.session import file_stat
+
+class TestRecovery(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journals = os.path.join(self.directory, 'recovery')
+        self.writer = JournalWriter()
+        self.writer.start()
+
+    def tearDown(self):
+        if self.writer.is_alive():
+            self.writer.stop()
+        shutil.rmtree(self.directory)
+
+    def test_replay_from_snapshot(self):
+        document = Document("héllo\nworld\n")
+        journal = RecoveryJournal(self.writer, "Untitled", snapshot=document.get_bytes(),
+                                  directory=self.journals)
+        document.subscribe(lambda edit: journal.record(edit, document))
+        document.insert(0, "# ")
+        document.replace(3, 6, "✓ there")
+        document.undo()
+        document.delete(len(document) - 6, 6)
+        self.writer.stop()
+
+        [recoverable] = find_recoverable(self.journals)
+        self.assertEqual(recoverable.file_path, "Untitled")
+        self.assertEqual(replay(recoverable, self.journals), document.get_text())
+
+    def test_replay_from_file(self):
+        file_path = os.path.join(self.directory, 'notes.txt')
+        with open(file_path, 'wb') as file:
+            file.write("naïve\r\n".encode('cp1252'))
+        document = Document("naïve\r\n")
+        journal = RecoveryJournal(self.writer, file_path, file_stat=file_stat(file_path),
+                                  encoding='cp1252', directory=self.journals)
+        document.subscribe(lambda edit: journal.record(edit, document))
+        document.insert(len(document), "more")
+        self.writer.stop()
+
+        [recoverable] = find_recoverable(self.journals)
+        self.assertEqual(replay(recoverable, self.journals), "naïve\r\nmore")
+
+        with open(file_path, 'ab') as file:
+            file.write(b"changed")
+        with self.assertRaises(ValueError):
+            replay(recoverable, self.journals)
+
+    def test_compaction_starts_new_generation(self):
+        RecoveryJournal.COMPACT_MIN_BYTES, saved = 64, RecoveryJournal.COMPACT_MIN_BYTES
+        self.addCleanup(setattr, RecoveryJournal, 'COMPACT_MIN_BYTES', saved)
+        document = Document("")
+        journal = RecoveryJournal(self.writer, "Untitled", snapshot=b"", directory=self.journals)
+        document.subscribe(lambda edit: journal.record(edit, document))
+        for i in range(40):
+            document.insert(i, "x")
+        self.writer.stop()
+
+        self.assertGreater(journal.generation, 0)
+        names = os.listdir(self.journals)
+        self.assertTrue(all(name.split('.')[1] == str(journal.generation) for name in names))
+        [recoverable] = find_recoverable(self.journals)
+        self.assertEqual(replay(recoverable, self.journals), "x" * 40)
+
+    def test_torn_last_edit_is_ignored(self):
+        document = Document("abc")
+        journal = RecoveryJournal(self.writer, "Untitled", snapshot=document.get_bytes(),
+                                  directory=self.journals)
+        document.subscribe(lambda edit: journal.record(edit, document))
+        document.insert(3, "d")
+        self.writer.stop()
+        with open(os.path.join(self.journals, f"{journal.journal_id}.0.journal"), 'ab') as file:
+            file.write(b'[4, 0, "e')
+
+        [recoverable] = find_recoverable(self.journals)
+        self.assertEqual(replay(recoverable, self.journals), "abcd")
+
+    def test_discard_on_close(self):
+        journal = RecoveryJournal(self.writer, "Untitled", snapshot=b"abc", directory=self.journals)
+        journal.close(discard=True)
+        self.writer.stop()
+        self.assertEqual(find_recoverable(self.journals), [])
+        self.assertEqual(os.listdir(self.journals), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from src.utils.search import MatchList, block_search, compile_pattern, max_match_length
+
+class TestSearch(unittest.TestCase):
+    def test_compile_pattern_is_cached(self):
+        self.assertIs(compile_pattern("needle", True), compile_pattern("needle", True))
+        self.assertIsNot(compile_pattern("needle", True), compile_pattern("needle", False))
+
+    def test_case_insensitive_non_ascii(self):
+        pattern = compile_pattern("café")
+        self.assertTrue(pattern.search("CAFÉ au lait".encode('utf-8')))
+        self.assertFalse(compile_pattern("café", True).search("CAFÉ".encode('utf-8')))
+
+    def test_whole_word_and_regex(self):
+        data = b"cat concat cat_ cats"
+        self.assertEqual([m.span() for m in compile_pattern("cat", whole_word=True).finditer(data)],
+                         [(0, 3)])
+        self.assertEqual([m.group() for m in compile_pattern(r"con\w+", regex=True).finditer(data)],
+                         [b"concat"])
+
+    def test_non_ascii_words(self):
+        data = "un élan vif, xélan ÉLAN —élan élans".encode('utf-8')
+        self.assertEqual([m.span() for m in compile_pattern("élan", whole_word=True).finditer(data)],
+                         [(3, 8), (21, 26), (30, 35)])
+        pattern = compile_pattern(r"\bn\w+é\b", regex=True)
+        self.assertEqual([m.group() for m in pattern.finditer("naïveté naïvetés".encode('utf-8'))],
+                         ["naïveté".encode('utf-8')])
+        pattern = compile_pattern("é+", regex=True)
+        self.assertEqual(pattern.search("xÉÉ".encode('utf-8')).group(), "ÉÉ".encode('utf-8'))
+        pattern = compile_pattern("élan", whole_word=True, encoding='latin-1')
+        self.assertEqual([m.span() for m in pattern.finditer("un élan xélan".encode('latin-1'))], [(3, 7)])
+
+    def test_block_search_across_block_edges(self):
+        data = b"xx foobar aaaaaaaa\nfoo .. foo\nline aaa\n" * 3
+        # Backwards, matches that could overlap each other ("a+" in "aaa")
+        # depend on where the search starts, so only the others are checked.
+        for query, regex, whole_word, backward in [
+                ("a+", True, False, False), ("foo\\b", True, False, True), ("^.*foo$", True, False, True),
+                ("foo", False, True, True), ("aaaa", False, False, False), ("foo\n", False, False, True)]:
+            pattern = compile_pattern(query, True, whole_word, regex)
+            expected = [m.span() for m in pattern.finditer(data) if m.end() > m.start()]
+            overlap = max_match_length(query, regex)
+            # A regex is only searched a line at a time, which needs blocks
+            # big enough to reach the end of a line.
+            for block_size in (32, 64) if regex else (3, 5, 8, 64):
+                found = []
+                pos = 0
+                while True:
+                    match = block_search(pattern, data, pos, len(data), overlap=overlap, block_size=block_size)
+                    if match is None:
+                        break
+                    found.append(match.span())
+                    pos = match.end()
+                self.assertEqual(found, expected, (query, block_size))
+                if not backward:
+                    continue
+                found = []
+                pos = len(data)
+                while True:
+                    match = block_search(pattern, data, 0, pos, forward=False, overlap=overlap,
+                                         block_size=block_size)
+                    if match is None:
+                        break
+                    found.append(match.span())
+                    pos = match.start()
+                self.assertEqual(found[::-1], expected, (query, block_size))
+
+    def test_block_search_checks_matches_at_block_ends(self):
+        # "foo" ends the first block, where \b would match without the
+        # "bar" after it.
+        pattern = compile_pattern(r"foo\b", regex=True)
+        self.assertEqual(block_search(pattern, b"foobar\nfoo\n", 0, 11, block_size=3).span(), (7, 10))
+        pattern = compile_pattern(r"a+", regex=True)
+        self.assertEqual(block_search(pattern, b"xaaaaaa", 0, 7, block_size=3).span(), (1, 7))
+
+    def test_block_search_cancelled(self):
+        pattern = compile_pattern("needle")
+        self.assertIsNone(block_search(pattern, b"needle", 0, 6, cancelled=lambda: True))
+
+    def test_next_and_previous_wrap(self):
+        matches = MatchList(compile_pattern("ab"))
+        matches.scan(b"ab ab ab")
+
+        self.assertEqual(matches.next_from(0), (0, False))
+        self.assertEqual(matches.next_from(2), (1, False))
+        self.assertEqual(matches.next_from(5), (2, False))
+        self.assertEqual(matches.next_from(8), (0, True))
+        self.assertEqual(matches.previous_from(0), (2, True))
+        self.assertEqual(matches.previous_from(6), (1, False))
+
+    def test_update_after_edit(self):
+        text = b"foo bar\nbaz foo\nfoo"
+        matches = MatchList(compile_pattern("foo"))
+        matches.scan(text)
+        self.assertEqual(len(matches), 3)
+
+        # Insert "foo " at the start of line 2: "baz foo" -> "foo baz foo"
+        new_text = text[:8] + b"foo " + text[8:]
+        lo, hi = 8, new_text.index(b"\n", 8)
+        matches.update(8, 0, 4, lo, hi, new_text[lo:hi])
+
+        expected = MatchList(compile_pattern("foo"))
+        expected.scan(new_text)
+        self.assertEqual((matches.starts, matches.ends), (expected.starts, expected.ends))
+
+        # Delete "bar" on line 1.
+        newer_text = new_text[:4] + new_text[7:]
+        lo, hi = 0, newer_text.index(b"\n")
+        matches.update(4, 3, 0, lo, hi, newer_text[lo:hi])
+
+        expected.scan(newer_text)
+        self.assertEqual((matches.starts, matches.ends), (expected.starts, expected.ends))
+
+    def test_regex_lists_invalidate_on_edit(self):
+        matches = MatchList(compile_pattern("a+", regex=True), incremental=False)
+        matches.scan(b"aa")
+        matches.update(0, 0, 1, 0, 3, b"aaa")
+        self.assertFalse(matches.complete)
+
+if __name__ == '__main__':
+    unittest.main()
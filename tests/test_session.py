@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+from src.utils.file_operations import FileFormat
+from src.utils.session import CacheEntry, FileCache, TabState, file_stat, load_session, save_session
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, 'example.py')
+        with open(self.file_path, 'wb') as file:
+            file.write(b"import os\nprint(os.sep)\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_session_round_trip(self):
+        path = os.path.join(self.directory, 'session', 'session.json')
+        tabs = [TabState(self.file_path, 3, 7, 120, 0), TabState('/other.txt', 0, 0, 0, 0)]
+        save_session(tabs, 1, path)
+        self.assertEqual(load_session(path), (tabs, 1))
+
+    def test_unreadable_session_is_empty(self):
+        path = os.path.join(self.directory, 'session.json')
+        self.assertEqual(load_session(path), ([], None))
+        with open(path, 'w') as file:
+            file.write('{"version": 1, "tabs": [{"file_path": 1}]}')
+        self.assertEqual(load_session(path), ([], None))
+
+    def test_cache_entry_round_trip(self):
+        cache = FileCache(os.path.join(self.directory, 'cache'))
+        entry = CacheEntry(file_stat(self.file_path), FileFormat('utf-8', False, 'LF'),
+                           array('Q', [9, 23]), 'Python', [(0, ('root',)), (200, ('root', 'dqs'))])
+        cache.put(self.file_path, entry)
+        self.assertEqual(cache.get(self.file_path), entry)
+
+    def test_cache_entry_dropped_when_file_changes(self):
+        cache = FileCache(os.path.join(self.directory, 'cache'))
+        cache.put(self.file_path, CacheEntry(file_stat(self.file_path), FileFormat('utf-8', False, 'LF'),
+                                             array('Q', [9, 23]), None, []))
+        with open(self.file_path, 'ab') as file:
+            file.write(b"more\n")
+        self.assertIsNone(cache.get(self.file_path))
+
+    def test_prune_keeps_newest(self):
+        cache = FileCache(os.path.join(self.directory, 'cache'))
+        entry = CacheEntry(file_stat(self.file_path), FileFormat('utf-8', False, 'LF'), array('Q'), None, [])
+        for name in ('a', 'b', 'c'):
+            cache.put(os.path.join(self.directory, name), entry)
+        os.utime(cache._entry_path(os.path.join(self.directory, 'a')), ns=(0, 0))
+        cache.prune(keep=2)
+        self.assertEqual(len(os.listdir(cache.directory)), 2)
+        self.assertFalse(os.path.exists(cache._entry_path(os.path.join(self.directory, 'a'))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from src.utils.single_instance import InstanceServer, _private_dir, forward_paths, is_supported
+
+@unittest.skipUnless(is_supported(), "needs Unix domain sockets")
+class TestSingleInstance(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'matx.sock')
+        self.opened = []
+        self.received = threading.Event()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def on_open(self, paths):
+        self.opened.append(paths)
+        self.received.set()
+
+    def test_forward_without_server(self):
+        self.assertFalse(forward_paths(["a.txt"], self.path))
+
+    def test_forward_to_server(self):
+        server = InstanceServer(self.on_open, self.path)
+        server.start()
+        try:
+            self.assertTrue(forward_paths(["a.txt", "/tmp/b.py"], self.path))
+            self.assertTrue(self.received.wait(2))
+            self.assertEqual(self.opened, [[os.path.abspath("a.txt"), "/tmp/b.py"]])
+            with self.assertRaises(OSError):
+                InstanceServer(self.on_open, self.path)
+        finally:
+            server.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_raw_client_and_bad_request(self):
+        server = InstanceServer(self.on_open, self.path)
+        server.start()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(self.path)
+                client.sendall(b'not json\n')
+                self.assertEqual(client.recv(16), b'')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(self.path)
+                client.sendall(b'{"open": []}\n')
+                self.assertEqual(client.recv(16), b'ok\n')
+            self.assertEqual(self.opened, [[]])
+        finally:
+            server.close()
+
+    def test_stale_socket_is_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        server = InstanceServer(self.on_open, self.path)
+        server.start()
+        try:
+            self.assertTrue(forward_paths([], self.path))
+        finally:
+            server.close()
+
+    def test_private_dir(self):
+        path = _private_dir(self.temp_dir.name)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+        self.assertEqual(_private_dir(self.temp_dir.name), path)
+        # One others can get into is refused rather than used.
+        os.chmod(path, 0o755)
+        with self.assertRaises(OSError):
+            _private_dir(self.temp_dir.name)
+        os.rmdir(path)
+        os.symlink(self.temp_dir.name, path)
+        with self.assertRaises(OSError):
+            _private_dir(self.temp_dir.name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import random
+import unittest
+from src.utils.symbols import SymbolIndex, language_for, scan_lines
+
+PYTHON = """\
+import os
+
+class Editor:
+    def __init__(self):
+        pass
+
+    async def open_file(self, path):
+        def inner():
+            pass
+
+def main():
+    Editor()
+"""
+
+def outline(symbols):
+    return [(symbol.name, symbol.kind, symbol.line, symbol.depth) for symbol in symbols]
+
+class TestSymbols(unittest.TestCase):
+    def test_python(self):
+        self.assertEqual(outline(scan_lines('python', PYTHON.split('\n'))), [
+            ('Editor', 'class', 2, 0),
+            ('__init__', 'function', 3, 1),
+            ('open_file', 'function', 6, 1),
+            ('inner', 'function', 7, 2),
+            ('main', 'function', 10, 0),
+        ])
+
+    def test_c(self):
+        lines = [
+            "namespace detail {",
+            "class Parser : public Base {",
+            "struct Token;",
+            "static int count_lines(const char *text, size_t n)",
+            "    if (ready) {",
+            "} else if (done) {",
+            "Parser::~Parser() {",
+            "    return make(x)",
+            "std::vector<int> Parser::parse() const {",
+        ]
+        self.assertEqual([(symbol.name, symbol.kind) for symbol in scan_lines('c', lines)], [
+            ('detail', 'namespace'),
+            ('Parser', 'class'),
+            ('count_lines', 'function'),
+            ('Parser::~Parser', 'function'),
+            ('Parser::parse', 'function'),
+        ])
+
+    def test_markdown(self):
+        self.assertEqual(outline(scan_lines('markdown', ["# Title", "text", "## Usage ##", "#hashtag"])),
+                         [('Title', 'heading', 0, 0), ('Usage', 'heading', 2, 1)])
+
+    def test_language_for(self):
+        self.assertEqual(language_for("src/ui/wx_ui.py"), 'python')
+        self.assertEqual(language_for("README.MD"), 'markdown')
+        self.assertIsNone(language_for("notes.txt"))
+
+    def test_search(self):
+        index = SymbolIndex('python')
+        index.build(["def get_file_path():", "def file_operations():", "class FileCache:", "def profile():"])
+        self.assertEqual([symbol.name for symbol in index.search("file")],
+                         ['FileCache', 'file_operations', 'get_file_path'])
+        self.assertEqual([symbol.name for symbol in index.search("cache")], ['FileCache'])
+        self.assertEqual(index.search("ile"), [])
+        self.assertEqual([symbol.line for symbol in index.find("profile")], [3])
+
+    def test_search_keeps_whole_names_within_the_limit(self):
+        index = SymbolIndex('python')
+        index.build([f"def get_file{i}():" for i in range(150)] + ["def file_path():"])
+        self.assertEqual(index.search("file")[0].name, 'file_path')
+        self.assertEqual(len(index.search("file")), 100)
+
+    def test_incremental_update_matches_rebuild(self):
+        rng = random.Random(5)
+        choices = ["def f{}():", "    def method{}(self):", "class C{}:", "    x = {}", ""]
+        lines = [rng.choice(choices).format(i) for i in range(200)]
+        index = SymbolIndex('python')
+        index.build(lines)
+        for i in range(300):
+            first = rng.randrange(len(lines))
+            old_count = rng.randint(1, min(4, len(lines) - first))
+            new_lines = [rng.choice(choices).format(1000 + i * 10 + j) for j in range(rng.randint(1, 4))]
+            lines[first:first + old_count] = new_lines
+            index.update(first, old_count, new_lines)
+
+            expected = SymbolIndex('python')
+            expected.build(lines)
+            self.assertEqual(outline(index.symbols), outline(expected.symbols))
+            self.assertEqual([key[:1] + (key[2].name, key[2].line) for key in index.keys],
+                             [key[:1] + (key[2].name, key[2].line) for key in expected.keys])
+            self.assertEqual([key[:1] + (key[2].line,) for key in index.names],
+                             [key[:1] + (key[2].line,) for key in expected.names])
+
+if __name__ == '__main__':
+    unittest.main()
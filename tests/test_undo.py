@@ -0,0 +1,68 @@
+import unittest
+from src.utils.undo import UndoHistory
+
+class TestUndoHistory(unittest.TestCase):
+    def test_typing_is_coalesced(self):
+        history = UndoHistory()
+        for pos, char in enumerate("hello"):
+            history.record('insert', pos, char)
+
+        self.assertEqual(history.undo(), [('insert', 0, 'hello')])
+        self.assertFalse(history.can_undo())
+        self.assertEqual(history.redo(), [('insert', 0, 'hello')])
+
+    def test_chunks_are_bounded_and_paste_is_separate(self):
+        history = UndoHistory(chunk_size=3)
+        for pos, char in enumerate("abcd"):
+            history.record('insert', pos, char)
+        history.record('insert', 4, "pasted")
+
+        self.assertEqual(history.undo(), [('insert', 4, 'pasted')])
+        self.assertEqual(history.undo(), [('insert', 3, 'd')])
+        self.assertEqual(history.undo(), [('insert', 0, 'abc')])
+
+    def test_backspace_is_coalesced(self):
+        history = UndoHistory()
+        history.record('delete', 4, "o")
+        history.record('delete', 3, "l")
+        history.record('delete', 2, "l")
+
+        self.assertEqual(history.undo(), [('delete', 2, 'llo')])
+
+    def test_measure_is_used_for_adjacency(self):
+        history = UndoHistory(measure=lambda text: len(text.encode('utf-8')))
+        history.record('insert', 0, "é")
+        history.record('insert', 2, "t")
+
+        self.assertEqual(history.undo(), [('insert', 0, 'ét')])
+
+    def test_group_undoes_in_one_step(self):
+        history = UndoHistory()
+        with history.group():
+            history.record('delete', 0, "old")
+            history.record('insert', 0, "new")
+
+        self.assertEqual(history.undo(), [('insert', 0, 'new'), ('delete', 0, 'old')])
+        self.assertFalse(history.can_undo())
+
+    def test_history_is_bounded_by_bytes(self):
+        history = UndoHistory(max_bytes=4096)
+        for i in range(100):
+            history.record('insert', i * 100, "x" * 100)
+
+        self.assertLessEqual(history.size, 4096)
+        self.assertGreater(len(history.undo_stack), 1)
+        self.assertEqual(history.undo(), [('insert', 9900, "x" * 100)])
+
+    def test_new_edit_clears_redo(self):
+        history = UndoHistory()
+        history.record('insert', 0, "one")
+        history.undo()
+        history.record('insert', 0, "two")
+
+        self.assertFalse(history.can_redo())
+        self.assertEqual(history.undo(), [('insert', 0, 'two')])
+        self.assertFalse(history.can_undo())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import collections
+import random
+import unittest
+from src.utils.word_index import WordIndex, count_words
+
+class TestWordIndex(unittest.TestCase):
+    def test_count_words(self):
+        self.assertEqual(count_words("def load_file(path): return load_file(_x, 3rd, naïve)"),
+                         collections.Counter({'load_file': 2, 'def': 1, 'path': 1, 'return': 1, 'naïve': 1}))
+
+    def test_seeded_with_keywords(self):
+        index = WordIndex()
+        self.assertEqual(index.complete("imp"), ['import'])
+        self.assertNotIn('if', index.words)
+
+    def test_complete(self):
+        index = WordIndex(seed=[])
+        index.add_text("file_path file_format filter files fil")
+        self.assertEqual(index.complete("fil"), ['file_format', 'file_path', 'files', 'filter'])
+        self.assertEqual(index.complete("file_", limit=1), ['file_format'])
+        self.assertEqual(index.complete("xyz"), [])
+
+    def test_words_stay_while_any_tab_uses_them(self):
+        index = WordIndex(seed=[])
+        index.add_text("shared only_first")
+        index.add_text("shared")
+        index.remove_text("shared only_first")
+        self.assertEqual(index.words, ['shared'])
+        index.replace_text("shared", "renamed")
+        self.assertEqual(index.words, ['renamed'])
+        self.assertEqual(index.counts, {'renamed': 1})
+
+    def test_bulk_and_single_updates_agree(self):
+        rng = random.Random(2)
+        vocabulary = [f"word{i}" for i in range(500)]
+        texts = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 300))) for _ in range(30)]
+        index = WordIndex(seed=[])
+        for text in texts:
+            index.add_text(text)
+        for text in texts[::2]:
+            index.remove_text(text)
+        expected = collections.Counter()
+        for text in texts[1::2]:
+            expected.update(count_words(text))
+        self.assertEqual(index.counts, dict(expected))
+        self.assertEqual(index.words, sorted(expected))
+
+if __name__ == '__main__':
+    unittest.main()